@@ -5,7 +5,8 @@ from django.contrib import messages
 from django.urls import path
 from django.shortcuts import render
 from django.utils.html import format_html
-from .models import User, Student, Warden, Security, GatePass, ParentVerification, Notification
+from .models import User, Student, Warden, Security, GatePass, ParentVerification, Notification, BroadcastNotification, DigestEvent, OutboxMessage, ExportJob
+from .notifications import notify_status_change
 import tempfile
 import os
 
@@ -182,7 +183,7 @@ class GatePassAdmin(admin.ModelAdmin):
     """GatePass Admin"""
     
     list_display = ('student', 'outing_date', 'outing_time', 'status', 'created_at')
-    list_filter = ('status', 'outing_date', 'student__user__gender')
+    list_filter = ('status', 'outing_date', 'student_gender')
     search_fields = ('student__student_name', 'student__hall_ticket_no')
     readonly_fields = ('created_at', 'updated_at')
     actions = ['delete_selected_safe']
@@ -191,6 +192,12 @@ class GatePassAdmin(admin.ModelAdmin):
     show_full_result_count = False  # Don't count all items (performance)
     change_list_template = 'admin/gatepass/gatepass_changelist.html'
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Status edited by hand: tell the same people the dashboards would
+        if change and 'status' in form.changed_data:
+            notify_status_change(obj)
+    
     fieldsets = (
         ('Student Information', {
             'fields': ('student',)
@@ -334,7 +341,7 @@ class GatePassAdmin(admin.ModelAdmin):
 class ParentVerificationAdmin(admin.ModelAdmin):
     """Parent Verification Admin"""
     
-    list_display = ('gatepass', 'parent_mobile', 'is_verified', 'verified_at', 'created_at')
+    list_display = ('gatepass', 'parent_mobile', 'is_verified', 'verified_at', 'created_at', 'expires_at')
     list_filter = ('is_verified', 'created_at')
     search_fields = ('gatepass__student__student_name', 'parent_mobile')
 
@@ -346,4 +353,44 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ('user', 'gatepass', 'notification_type', 'is_read', 'created_at')
     list_filter = ('notification_type', 'is_read', 'created_at')
     search_fields = ('user__username', 'message')
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    readonly_fields = ('created_at',)
+
+@admin.register(BroadcastNotification)
+class BroadcastNotificationAdmin(admin.ModelAdmin):
+    """Broadcast Notification Admin"""
+    
+    list_display = ('role', 'gender', 'gatepass', 'notification_type', 'created_at')
+    list_filter = ('role', 'gender', 'notification_type', 'created_at')
+    search_fields = ('message',)
+    readonly_fields = ('created_at',)
+
+
+@admin.register(DigestEvent)
+class DigestEventAdmin(admin.ModelAdmin):
+    """Notifications waiting for the next digest"""
+
+    list_display = ('user', 'role', 'gender', 'gatepass', 'notification_type', 'created_at')
+    list_filter = ('role', 'notification_type', 'created_at')
+    search_fields = ('message',)
+    readonly_fields = ('created_at',)
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """Outbox Message Admin"""
+    
+    list_display = ('channel', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'channel')
+    search_fields = ('recipient', 'subject')
+    # The body of a pending registration email holds the initial password
+    exclude = ('body',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    """Spreadsheet exports built by the export worker"""
+
+    list_display = ('filename', 'kind', 'status', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status', 'created_at')
+    readonly_fields = ('cache_key', 'created_at', 'started_at', 'finished_at')
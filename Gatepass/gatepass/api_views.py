@@ -5,8 +5,13 @@ from rest_framework import status, permissions
 from rest_framework.authtoken.models import Token
 from rest_framework.generics import ListCreateAPIView, get_object_or_404
 
-from .models import GatePass, Student
-from .serializers import GatePassSerializer, UserSerializer
+from .models import GatePass, Student, normalize_gender
+from .serializers import GatePassSerializer, UserSerializer, NotificationItemSerializer, MarkAllReadSerializer
+from .stats import status_counts
+from .search import search_gatepasses
+from .notifications import (
+    notify_status_change, bell, inbox_page, read_watermark, mark_read, mark_all_read, unread_count,
+)
 
 
 class LoginAPIView(APIView):
@@ -24,43 +29,52 @@ class LoginAPIView(APIView):
         return Response({'token': token.key, 'user': user_data})
 
 
+def gatepasses_for_user(user):
+    """Gatepasses visible to an API user, scoped by role (and gender for wardens)"""
+    if hasattr(user, 'student_profile'):
+        # student's own gatepasses
+        return GatePass.objects.filter(student=user.student_profile)
+    elif user.role == 'warden':
+        warden_gender = normalize_gender(user.gender)
+        if warden_gender:
+            # CRITICAL: Gender-based filtering - wardens see ONLY requests from students matching their gender
+            # Male wardens see ONLY male student requests, Female wardens see ONLY female student requests
+            # Students without gender set will NOT appear (their student_gender is NULL)
+            return GatePass.objects.filter(student_gender=warden_gender)
+        else:
+            # If warden gender is not set, return empty queryset (safety measure)
+            return GatePass.objects.none()
+    # security/superadmin: return all gatepasses
+    return GatePass.objects.all()
+
+
 class GatePassListCreateAPIView(ListCreateAPIView):
     serializer_class = GatePassSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        if hasattr(user, 'student_profile'):
-            # student's own gatepasses
-            return GatePass.objects.filter(student=user.student_profile).order_by('-created_at')
-        elif user.role == 'warden':
-            if user.gender:
-                # CRITICAL: Gender-based filtering - wardens see ONLY requests from students matching their gender
-                # Male wardens see ONLY male student requests, Female wardens see ONLY female student requests
-                # Students without gender set will NOT appear
-                return GatePass.objects.filter(
-                    student__user__gender__iexact=user.gender
-                ).exclude(
-                    student__user__gender__isnull=True
-                ).exclude(
-                    student__user__gender=''
-                ).order_by('-created_at')
-            else:
-                # If warden gender is not set, return empty queryset (safety measure)
-                return GatePass.objects.none()
-        # security/superadmin: return all gatepasses
-        return GatePass.objects.all().order_by('-created_at')
+        queryset = gatepasses_for_user(self.request.user).select_related(
+            'student', 'student__user'
+        ).order_by('-created_at')
+        return search_gatepasses(queryset, self.request.query_params.get('search'))
 
     def perform_create(self, serializer):
         # expect student_id in payload (PrimaryKey of Student)
         serializer.save()
 
 
+class GatePassStatsAPIView(APIView):
+    """Status counts for the gatepasses visible to the current user (one query)"""
+
+    def get(self, request, *args, **kwargs):
+        return Response(status_counts(gatepasses_for_user(request.user)))
+
+
 class WardenApproveAPIView(APIView):
     def post(self, request, pk, *args, **kwargs):
         user = request.user
         if user.role != 'warden':
             return Response({'detail': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
-        gp = get_object_or_404(GatePass, pk=pk)
+        gp = get_object_or_404(GatePass.objects.select_related('student', 'student__user'), pk=pk)
         
         # CRITICAL: Enforce gender matching - prevent cross-gender approvals via API
         # Male wardens can ONLY approve male student requests
@@ -81,6 +95,7 @@ class WardenApproveAPIView(APIView):
         gp.status = 'warden_approved'
         gp.warden_approval = user
         gp.save()
+        notify_status_change(gp)
         return Response({'detail': 'Warden approval recorded'})
 
 
@@ -89,8 +104,43 @@ class SecurityApproveAPIView(APIView):
         user = request.user
         if user.role != 'security':
             return Response({'detail': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
-        gp = get_object_or_404(GatePass, pk=pk)
+        gp = get_object_or_404(GatePass.objects.select_related('student', 'student__user'), pk=pk)
         gp.status = 'security_approved'
         gp.security_approval = user
         gp.save()
+        notify_status_change(gp)
         return Response({'detail': 'Security approval recorded'})
+
+
+class NotificationInboxAPIView(APIView):
+    """The current user's notification history, newest first, one cursor page at a time"""
+
+    def get(self, request, *args, **kwargs):
+        try:
+            items, next_cursor = inbox_page(request.user, request.query_params.get('cursor'))
+        except ValueError:
+            return Response({'detail': 'Invalid cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': NotificationItemSerializer(items, many=True).data,
+            'next_cursor': next_cursor,
+            'unread': bell(request.user)['unread'],
+            'watermark': read_watermark(request.user),
+        })
+
+
+class NotificationReadAPIView(APIView):
+    def post(self, request, kind, pk, *args, **kwargs):
+        if not mark_read(request.user, kind, pk):
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        # Counted directly: the bell cache is only invalidated once the read commits
+        return Response({'unread': unread_count(request.user)})
+
+
+class NotificationReadAllAPIView(APIView):
+    """Mark everything up to the watermark from the inbox response read (everything when omitted)"""
+
+    def post(self, request, *args, **kwargs):
+        serializer = MarkAllReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        mark_all_read(request.user, **serializer.validated_data)
+        return Response({'unread': unread_count(request.user)})
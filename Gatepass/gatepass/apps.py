@@ -38,9 +38,20 @@ def _create_superuser_from_env():
         pass
 
 
+def _ensure_search_index(sender, using='default', **kwargs):
+    from .search import ensure_search_index
+    ensure_search_index(using)
+
+
 class GatepassConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gatepass'
 
     def ready(self):
+        # Registers the delete handlers that keep status counters current
+        from . import counters  # noqa: F401
+        # Registers the handlers that move the export data version
+        from . import export_jobs  # noqa: F401
+        from django.db.models.signals import post_migrate
+        post_migrate.connect(_ensure_search_index, sender=self)
         _create_superuser_from_env()
@@ -1,10 +1,25 @@
-from .models import Notification
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .notifications import bell, live_token
 
 
 def notifications_context(request):
-    """Add notifications to global template context"""
+    """Add the notification bell (latest notifications, unread count) and live update settings to global template context"""
     if request.user.is_authenticated:
-        notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:12]
-        return {'notifications': notifications}
-    return {'notifications': []}
-
+        # Lazy and cached per user: pages that never render the bell, and most
+        # that do, run no notification queries
+        user = request.user
+        # Read the live token before the bell so a change made in between is
+        # picked up by the first live update rather than lost
+        token = live_token(user)
+        entry = SimpleLazyObject(lambda: bell(user))
+        return {
+            'notifications': SimpleLazyObject(lambda: entry['latest']),
+            'unread_notifications_count': SimpleLazyObject(lambda: entry['unread']),
+            'live_token': token,
+            'live_transport': settings.LIVE_UPDATES_TRANSPORT,
+            # Seconds between polls: long polls wait on the server instead
+            'live_poll_interval': 1 if settings.LIVE_UPDATES_TRANSPORT == 'longpoll' else settings.LIVE_POLL_INTERVAL_SECONDS,
+        }
+    return {'notifications': [], 'unread_notifications_count': 0}
@@ -0,0 +1,259 @@
+"""
+Materialized gatepass status counters.
+
+GatePassStatusCounter (per student gender and status),
+StudentStatusCounter (per student and status) and DailyOutingRollup (per
+outing date, student gender and status) are adjusted inside the same
+transaction as every GatePass insert, status change and delete, so header
+statistics and reports read a handful of counter rows instead of counting
+the whole history. ``reconcile_gatepass_counters`` rebuilds the status
+counters from scratch and ``backfill_outing_rollups`` the daily rollup.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import versions
+from .models import GatePass, GatePassStatusCounter, StudentStatusCounter, DailyOutingRollup
+
+
+def _bump(model, delta, **lookup):
+    """Add ``delta`` to one counter row, creating it on first use"""
+    if model.objects.filter(**lookup).update(count=F('count') + delta) or delta < 0:
+        # A missing row on decrement is drift (or a student being deleted
+        # together with its counters); reconcile_gatepass_counters and
+        # backfill_outing_rollups fix it
+        return
+    # get_or_create copes with a concurrent first insert of the same row
+    counter, created = model.objects.get_or_create(defaults={'count': delta}, **lookup)
+    if not created:
+        model.objects.filter(pk=counter.pk).update(count=F('count') + delta)
+
+
+def _apply_status(key, delta):
+    gender, student_id, status, _ = key
+    _bump(GatePassStatusCounter, delta, gender=gender, status=status)
+    if student_id:
+        _bump(StudentStatusCounter, delta, student_id=student_id, status=status)
+
+
+def _apply_rollup(key, delta):
+    gender, _, status, day = key
+    if day:
+        _bump(DailyOutingRollup, delta, day=day, gender=gender, status=status)
+
+
+def stored_key(gatepass):
+    """
+    Counter bucket of the row as it is stored in the database (None if
+    missing), read with SELECT ... FOR UPDATE: call it inside the transaction
+    that changes the row. Another request that loaded the same gatepass
+    waits here until this one commits, then sees its bucket, so two
+    concurrent status changes never both leave the original bucket.
+    """
+    row = GatePass.objects.select_for_update().filter(pk=gatepass.pk).values_list(
+        'student_gender', 'student_id', 'status', 'outing_date'
+    ).first()
+    if row is None:
+        return None
+    return (row[0] or '', row[1], row[2], row[3])
+
+
+def _move(apply, old_key, new_key):
+    if old_key is not None:
+        apply(old_key, -1)
+    if new_key is not None:
+        apply(new_key, 1)
+
+
+def record_change(old_key, new_key):
+    """Move one gatepass between counter buckets (either key may be None)"""
+    if old_key == new_key:
+        return
+    if old_key is None or new_key is None or old_key[:3] != new_key[:3]:
+        _move(_apply_status, old_key, new_key)
+        # Tell live dashboards once the change is visible to other connections
+        transaction.on_commit(lambda: versions.bump(versions.GATEPASS_STATUS_VERSION))
+    # A new outing date alone only moves the daily rollup
+    _move(_apply_rollup, old_key, new_key)
+
+
+def move_gender(queryset, gender):
+    """Set student_gender on a gatepass queryset and move its per-gender counts and rollups"""
+    with transaction.atomic():
+        moved = list(
+            queryset.order_by().values('student_gender', 'status', 'outing_date').annotate(n=Count('id'))
+        )
+        queryset.update(student_gender=gender)
+        by_status = {}
+        for row in moved:
+            key = (row['student_gender'] or '', row['status'])
+            by_status[key] = by_status.get(key, 0) + row['n']
+            _bump(DailyOutingRollup, -row['n'], day=row['outing_date'], gender=key[0], status=row['status'])
+            _bump(DailyOutingRollup, row['n'], day=row['outing_date'], gender=gender or '', status=row['status'])
+        for (old_gender, status), n in by_status.items():
+            _bump(GatePassStatusCounter, -n, gender=old_gender, status=status)
+            _bump(GatePassStatusCounter, n, gender=gender or '', status=status)
+
+
+@receiver(pre_delete, sender=GatePass)
+def _gatepass_deleting(sender, instance, **kwargs):
+    # Runs inside the delete's transaction; None when already deleted elsewhere
+    instance._stored_key = stored_key(instance)
+
+
+@receiver(post_delete, sender=GatePass)
+def _gatepass_deleted(sender, instance, **kwargs):
+    record_change(instance._stored_key, None)
+
+
+def _as_status_counts(rows):
+    """Shape (status, count) rows like stats.status_counts()"""
+    counts = {status: 0 for status, _ in GatePass.STATUS_CHOICES}
+    for status, count in rows:
+        counts[status] = counts.get(status, 0) + (count or 0)
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def counted_status_counts(gender=None):
+    """Status counts of all gatepasses, or of one student gender, from the counters"""
+    counters = GatePassStatusCounter.objects.all()
+    if gender is not None:
+        counters = counters.filter(gender=gender)
+    return _as_status_counts(counters.values('status').annotate(n=Sum('count')).values_list('status', 'n'))
+
+
+def counted_student_status_counts(student):
+    """Status counts of one student's gatepasses from the counters"""
+    return _as_status_counts(
+        StudentStatusCounter.objects.filter(student=student).values_list('status', 'count')
+    )
+
+
+def daily_outing_trends(days=30, today=None):
+    """
+    Gatepasses per outing date over the last ``days`` days (today included),
+    oldest first, from the daily rollup (one grouped query). Each row holds
+    the day, the total, one key per status and 'M' / 'F' counts.
+    """
+    today = today or timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    aggregates = {'total': Sum('count')}
+    for status, _ in GatePass.STATUS_CHOICES:
+        aggregates[status] = Sum('count', filter=Q(status=status), default=0)
+    for gender in ('M', 'F'):
+        aggregates[gender] = Sum('count', filter=Q(gender=gender), default=0)
+    rows = {
+        row['day']: row
+        for row in DailyOutingRollup.objects.filter(day__gte=start, day__lte=today)
+        .values('day').annotate(**aggregates)
+    }
+    empty = dict.fromkeys(aggregates, 0)
+    return [
+        rows.get(day, {**empty, 'day': day})
+        for day in (start + timedelta(days=offset) for offset in range(days))
+    ]
+
+
+def expected_counters():
+    """Counter values computed from the GatePass table"""
+    by_gender = {
+        (row['student_gender'] or '', row['status']): row['n']
+        for row in GatePass.objects.order_by().values('student_gender', 'status').annotate(n=Count('id'))
+    }
+    by_student = {
+        (row['student_id'], row['status']): row['n']
+        for row in GatePass.objects.order_by().values('student_id', 'status').annotate(n=Count('id'))
+    }
+    return by_gender, by_student
+
+
+def rebuild_counters(dry_run=False):
+    """
+    Recompute both counter tables from GatePass.
+
+    Returns a list of (table, key, stored, expected) tuples for every counter
+    that had drifted; with ``dry_run`` nothing is rewritten. Runs in one transaction; rows written by requests that
+    commit while it runs are picked up by the next reconcile.
+    """
+    with transaction.atomic():
+        by_gender, by_student = expected_counters()
+        stored_gender = {
+            (c.gender, c.status): c.count for c in GatePassStatusCounter.objects.all()
+        }
+        stored_student = {
+            (c.student_id, c.status): c.count for c in StudentStatusCounter.objects.all()
+        }
+
+        drift = []
+        for table, stored, expected in (
+            ('gender', stored_gender, by_gender),
+            ('student', stored_student, by_student),
+        ):
+            for key in sorted(set(stored) | set(expected), key=str):
+                if stored.get(key, 0) != expected.get(key, 0):
+                    drift.append((table, key, stored.get(key, 0), expected.get(key, 0)))
+
+        if drift and not dry_run:
+            GatePassStatusCounter.objects.all().delete()
+            StudentStatusCounter.objects.all().delete()
+            GatePassStatusCounter.objects.bulk_create(
+                GatePassStatusCounter(gender=gender, status=status, count=n)
+                for (gender, status), n in by_gender.items()
+            )
+            StudentStatusCounter.objects.bulk_create(
+                StudentStatusCounter(student_id=student_id, status=status, count=n)
+                for (student_id, status), n in by_student.items()
+            )
+    return drift
+
+
+def expected_rollups(start=None, end=None):
+    """Daily rollup values computed from the GatePass table, optionally for outing dates in [start, end]"""
+    gatepasses = GatePass.objects.order_by()
+    if start:
+        gatepasses = gatepasses.filter(outing_date__gte=start)
+    if end:
+        gatepasses = gatepasses.filter(outing_date__lte=end)
+    return {
+        (row['outing_date'], row['student_gender'] or '', row['status']): row['n']
+        for row in gatepasses.values('outing_date', 'student_gender', 'status').annotate(n=Count('id'))
+    }
+
+
+def rebuild_rollups(start=None, end=None, dry_run=False):
+    """
+    Recompute the daily rollup from GatePass, for every outing date or only
+    those between ``start`` and ``end`` (inclusive).
+
+    Returns a list of (key, stored, expected) tuples for every rollup row that
+    had drifted, keys being (day, gender, status); with ``dry_run`` nothing is
+    rewritten. Runs in one transaction, like rebuild_counters.
+    """
+    with transaction.atomic():
+        expected = expected_rollups(start, end)
+        rollups = DailyOutingRollup.objects.all()
+        if start:
+            rollups = rollups.filter(day__gte=start)
+        if end:
+            rollups = rollups.filter(day__lte=end)
+        stored = {(r.day, r.gender, r.status): r.count for r in rollups}
+
+        drift = [
+            (key, stored.get(key, 0), expected.get(key, 0))
+            for key in sorted(set(stored) | set(expected))
+            if stored.get(key, 0) != expected.get(key, 0)
+        ]
+
+        if drift and not dry_run:
+            rollups.delete()
+            DailyOutingRollup.objects.bulk_create(
+                DailyOutingRollup(day=day, gender=gender, status=status, count=n)
+                for (day, gender, status), n in expected.items()
+            )
+    return drift
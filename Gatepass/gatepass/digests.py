@@ -0,0 +1,113 @@
+"""
+Notification digests.
+
+Notification types listed in NOTIFICATION_DIGEST_TYPES for a role are
+staged as DigestEvent rows when they happen (see ``notifications``). The
+``send_notification_digests`` job turns each window's events into one
+summary row per recipient and type, with one grouped query, and queues one
+email per recipient listing all of their summaries.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from .models import User, Notification, BroadcastNotification, DigestEvent, normalize_gender
+from .notifications import invalidate_roles, invalidate_users
+from .outbox import enqueue_email
+
+DIGEST_JOB = 'notification_digest'
+
+# Events younger than this are left for the next window, so a request
+# transaction still in flight when the job runs cannot lose its event
+SETTLE_SECONDS = 60
+
+TYPE_NAMES = dict(Notification.NOTIFICATION_TYPES)
+
+
+def digest_groups(cutoff):
+    """One row per recipient and type for the events before ``cutoff`` (a single grouped query)"""
+    return list(
+        DigestEvent.objects.filter(created_at__lt=cutoff)
+        .values('user_id', 'role', 'gender', 'notification_type')
+        .annotate(count=Count('id'), first_at=Min('created_at'), last_at=Max('created_at'))
+        .order_by('user_id', 'role', 'gender', 'notification_type')
+    )
+
+
+def summary(group):
+    """Text of one digest line, e.g. "12 overdue return notifications between ..." """
+    first = timezone.localtime(group['first_at']).strftime('%d %b %H:%M')
+    last = timezone.localtime(group['last_at']).strftime('%d %b %H:%M')
+    noun = 'notification' if group['count'] == 1 else 'notifications'
+    return f"{group['count']} {TYPE_NAMES[group['notification_type']].lower()} {noun} between {first} and {last}"
+
+
+def _recipients(groups):
+    """Every user the digest groups reach, as dicts with an email address (one query)"""
+    user_ids = {g['user_id'] for g in groups if g['user_id']}
+    roles = {g['role'] for g in groups if not g['user_id']}
+    # email is nullable: > '' leaves out both NULL and blank addresses
+    users = User.objects.filter(Q(pk__in=user_ids) | Q(role__in=roles, is_active=True), email__gt='')
+    return list(users.values('pk', 'email', 'role', 'gender'))
+
+
+def _reaches(group, user):
+    if group['user_id']:
+        return group['user_id'] == user['pk']
+    return group['role'] == user['role'] and (
+        not group['gender'] or normalize_gender(user['gender']) == group['gender']
+    )
+
+
+def send_notification_digests(now=None):
+    """
+    Deliver the pending digests: one Notification (or, for a role, one
+    BroadcastNotification) per recipient and type, one queued email per
+    recipient, then drop the events. Runs in one transaction.
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=SETTLE_SECONDS)
+    with transaction.atomic():
+        groups = digest_groups(cutoff)
+        if not groups:
+            return "0 digest(s) sent"
+
+        personal, broadcasts = [], []
+        for group in groups:
+            message = f"Digest: {summary(group)}."
+            if group['user_id']:
+                personal.append(Notification(
+                    user_id=group['user_id'], notification_type=group['notification_type'], message=message
+                ))
+            else:
+                broadcasts.append(BroadcastNotification(
+                    role=group['role'], gender=group['gender'],
+                    notification_type=group['notification_type'], message=message,
+                ))
+        Notification.objects.bulk_create(personal)
+        BroadcastNotification.objects.bulk_create(broadcasts)
+
+        lines = defaultdict(list)
+        for user in _recipients(groups):
+            for group in groups:
+                if _reaches(group, user):
+                    lines[user['email']].append(summary(group))
+        for email, user_lines in lines.items():
+            enqueue_email(
+                email,
+                'Hostel Gatepass notification digest',
+                "Since the last digest you have:\n\n"
+                + "\n".join(f"- {line}" for line in user_lines)
+                + "\n\nSign in to see the details in your notifications.",
+            )
+
+        DigestEvent.objects.filter(created_at__lt=cutoff).delete()
+
+        def invalidate():
+            invalidate_users(n.user_id for n in personal)
+            invalidate_roles(b.role for b in broadcasts)
+        transaction.on_commit(invalidate)
+    return f"{len(groups)} digest(s) sent, {len(lines)} email(s) queued"
+
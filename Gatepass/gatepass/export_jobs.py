@@ -0,0 +1,199 @@
+"""
+Spreadsheet exports, built once and reused.
+
+An export request looks up (or queues) an ExportJob keyed by a hash of the
+export kind, its normalized filters and ``versions.EXPORT_DATA_VERSION``,
+which is bumped after every committed gatepass, student or user write. So
+wardens asking for the same report share one file, served straight from
+storage (one job lookup, no counting) until the data changes.
+
+By default the web process builds a job itself, in a background thread
+started by the request that queued it: the request waits up to
+EXPORT_INLINE_WAIT_SECONDS and then hands over to the progress page, so a
+large export never runs into the server's request timeout. With
+EXPORT_WORKER, the ``run_export_jobs`` worker builds jobs instead; that
+needs MEDIA_ROOT shared between the web and worker processes, and a job no
+worker has claimed after EXPORT_WORKER_WAIT_SECONDS is still built by the
+web process once a request asks for it.
+"""
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.http import FileResponse
+from django.utils import timezone
+
+from . import versions
+from .exports import XLSX_CONTENT_TYPE, outings_filename, write_outings_workbook, write_students_workbook
+from .models import User, Student, GatePass, ExportJob
+
+logger = logging.getLogger(__name__)
+
+
+def _data_changed(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        # Signing in changes nothing an export shows
+        return
+    transaction.on_commit(lambda: versions.bump(versions.EXPORT_DATA_VERSION))
+
+
+for _model in (GatePass, Student, User):
+    post_save.connect(_data_changed, sender=_model, dispatch_uid=f'export_data_saved_{_model.__name__}')
+    post_delete.connect(_data_changed, sender=_model, dispatch_uid=f'export_data_deleted_{_model.__name__}')
+
+
+def cache_key(kind, params, version):
+    payload = json.dumps([kind, params, version], cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def export_filename(kind, params):
+    if kind == 'outings':
+        return f"{outings_filename(params)}.xlsx"
+    return f"gatepass_export_{timezone.localdate().isoformat()}.xlsx"
+
+
+def request_export(kind, params, user=None):
+    """
+    The job for this export of the current data: an existing one when the
+    same export was already requested, otherwise a new pending job. Failed
+    jobs and jobs whose file has gone missing are queued again.
+    """
+    job, _ = ExportJob.objects.get_or_create(
+        cache_key=cache_key(kind, params, versions.stamp(versions.EXPORT_DATA_VERSION)),
+        defaults={'kind': kind, 'params': params, 'filename': export_filename(kind, params), 'requested_by': user},
+    )
+    lost = job.status == 'done' and not job.file.storage.exists(job.file.name)
+    if job.status == 'failed' or lost:
+        ExportJob.objects.filter(pk=job.pk, status=job.status).update(status='pending', error='', started_at=None)
+        job.refresh_from_db()
+    return job
+
+
+def artifact_response(job):
+    """Stream a finished job's file as an attachment"""
+    return FileResponse(
+        job.file.open('rb'), as_attachment=True, filename=job.filename, content_type=XLSX_CONTENT_TYPE
+    )
+
+
+def claim(job, now):
+    """
+    Claim ``job`` as read with one conditional UPDATE; False when another
+    process changed it first.
+    """
+    claimed = ExportJob.objects.filter(pk=job.pk, status=job.status, started_at=job.started_at).update(
+        status='running', started_at=now
+    )
+    if claimed:
+        job.status, job.started_at = 'running', now
+    return claimed == 1
+
+
+def claim_next_job(now=None):
+    """
+    Claim the oldest pending job (or one whose worker seems to have died);
+    returns it, or None when there is nothing to do.
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT_SECONDS)
+    waiting = ExportJob.objects.filter(Q(status='pending') | Q(status='running', started_at__lt=stale))
+    for job in waiting.order_by('created_at')[:10]:
+        if claim(job, now):
+            return job
+    return None
+
+
+def _build_in_background(job, now):
+    # A new thread has no connection yet: close the one the build opens
+    opened_here = connection.connection is None
+    try:
+        build(job)
+        purge_old_exports(now)
+    finally:
+        if opened_here:
+            connection.close()
+
+
+def build_unclaimed(job, now=None):
+    """
+    Build a pending ``job`` in a thread of this process when no worker will:
+    always without EXPORT_WORKER, otherwise once it has waited
+    EXPORT_WORKER_WAIT_SECONDS. Jobs whose build died with its process are
+    picked up again after EXPORT_JOB_TIMEOUT_SECONDS. Waits up to
+    EXPORT_INLINE_WAIT_SECONDS for the build; returns True when the job is
+    done.
+    """
+    now = now or timezone.now()
+    lost = job.status == 'running' and job.started_at < now - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT_SECONDS)
+    if job.status != 'pending' and not lost:
+        return job.status == 'done'
+    if settings.EXPORT_WORKER and job.created_at > now - timedelta(seconds=settings.EXPORT_WORKER_WAIT_SECONDS):
+        return False
+    if not claim(job, now):
+        job.refresh_from_db()
+        return job.status == 'done'
+    thread = threading.Thread(
+        target=_build_in_background, args=(job, now), name=f'export-job-{job.pk}', daemon=True
+    )
+    thread.start()
+    thread.join(settings.EXPORT_INLINE_WAIT_SECONDS)
+    return job.status == 'done'
+
+
+def build(job):
+    """Write the job's workbook to media storage; returns True on success"""
+    try:
+        with tempfile.TemporaryFile() as out:
+            if job.kind == 'outings':
+                write_outings_workbook(out, job.params)
+            else:
+                write_students_workbook(out)
+            out.seek(0)
+            job.file.save(f"{job.cache_key[:16]}-{job.filename}", File(out, name=job.filename), save=False)
+    except Exception as e:
+        logger.error(f"Export job {job.pk} ({job.filename}) failed: {str(e)}", exc_info=True)
+        job.status = 'failed'
+        job.error = f"{type(e).__name__}: {e}"
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return False
+    job.status = 'done'
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'error', 'finished_at'])
+    return True
+
+
+def run_export_jobs(limit=5):
+    """Build up to ``limit`` waiting jobs; returns (done, failed)"""
+    done = failed = 0
+    for _ in range(limit):
+        job = claim_next_job()
+        if job is None:
+            break
+        if build(job):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+def purge_old_exports(now=None):
+    """Delete jobs (and their files) older than EXPORT_RETENTION_HOURS; returns how many"""
+    cutoff = (now or timezone.now()) - timedelta(hours=settings.EXPORT_RETENTION_HOURS)
+    old = list(ExportJob.objects.filter(created_at__lt=cutoff).exclude(status='running'))
+    for job in old:
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+    return len(old)
@@ -0,0 +1,373 @@
+"""
+Spreadsheet exports.
+
+Workbooks are built in openpyxl's write-only mode: every appended row is
+written straight to a temporary file instead of being kept as cell
+objects, and rows are read with ``values_list(...).iterator()`` so no
+model instances are built either. Memory use therefore stays flat however
+many gatepasses are exported. The export worker (see ``export_jobs``)
+writes them to media storage, from where they are downloaded.
+
+The "Monthly Counts" sheet is summed from the daily outing rollup (see
+``counters``), a few hundred rows per year, rather than from the outings.
+
+CSV and JSONL exports carry the same rows without a workbook: each line is
+produced as its row is read and streamed straight to the client.
+"""
+import csv
+import json
+from datetime import date, time, timedelta
+from itertools import chain, islice
+
+import openpyxl
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.http import StreamingHttpResponse
+from openpyxl.utils import get_column_letter
+
+from .models import User, Student, GatePass, DailyOutingRollup, local_datetime
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Rows fetched from the database per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# Rows looked at to size the columns of a sheet
+WIDTH_SAMPLE_ROWS = 500
+
+# Gatepasses that count as outings in exports
+OUTING_STATUSES = ['security_approved', 'returned', 'completed']
+
+GENDER_NAMES = dict(User.GENDER_CHOICES)
+STATUS_NAMES = dict(GatePass.STATUS_CHOICES)
+
+STUDENT_HEADERS = [
+    "Student Name",
+    "Hall Ticket No",
+    "Room No",
+    "Gender",
+    "Email",
+    "Mobile",
+    "Parent Name",
+    "Parent Mobile",
+    "Approved",
+]
+
+STUDENT_OUT_HEADERS = [
+    "Student Name",
+    "Hall Ticket No",
+    "Outing Date",
+    "Outing Time",
+    "Expected Return Date",
+    "Expected Return Time",
+    "Purpose",
+    "Warden Approved By",
+    "Security Approved By",
+]
+
+OUTING_HEADERS = [
+    "Student Name",
+    "Hall Ticket No",
+    "Outing Date",
+    "Outing Time",
+    "Expected Return Date",
+    "Expected Return Time",
+    "Status",
+    "Purpose",
+    "Warden Approved By",
+    "Security Approved By",
+]
+
+STUDENT_KEYS = [
+    'student_name', 'hall_ticket_no', 'room_no', 'gender', 'email', 'mobile',
+    'parent_name', 'parent_mobile', 'approved',
+]
+
+OUTING_KEYS = [
+    'student_name', 'hall_ticket_no', 'outing_date', 'outing_time',
+    'expected_return_date', 'expected_return_time', 'status', 'purpose',
+    'warden_approved_by', 'security_approved_by',
+]
+
+OUTING_FIELDS = (
+    'student__student_name', 'student__hall_ticket_no',
+    'outing_date', 'outing_time', 'expected_return_date', 'expected_return_time',
+    'status', 'purpose', 'warden_approval__username', 'security_approval__username',
+)
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD query parameter, ignoring empty or malformed values."""
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def filter_outing_window(queryset, from_date=None, to_date=None, year=None, month=None):
+    """
+    Restrict gatepasses to an outing date window.
+
+    Dates, years and months are turned into bounds on the indexed outing_at
+    column, so the database answers with one range scan.
+    """
+    if year and month:
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        queryset = queryset.filter(outing_at__gte=local_datetime(start, time.min), outing_at__lt=local_datetime(end, time.min))
+    elif year:
+        queryset = queryset.filter(
+            outing_at__gte=local_datetime(date(year, 1, 1), time.min),
+            outing_at__lt=local_datetime(date(year + 1, 1, 1), time.min),
+        )
+    elif month:
+        # Same month across every year cannot be a single range
+        queryset = queryset.filter(outing_date__month=month)
+    if from_date:
+        queryset = queryset.filter(outing_at__gte=local_datetime(from_date, time.min))
+    if to_date:
+        queryset = queryset.filter(outing_at__lt=local_datetime(to_date + timedelta(days=1), time.min))
+    return queryset
+
+
+def outing_params(query):
+    """
+    Normalized outing export filters from request parameters: only the valid,
+    non-empty ones, as a JSON-ready dict. Supported (same as the warden filter):
+      - from_date: YYYY-MM-DD
+      - to_date: YYYY-MM-DD
+      - status_filter: pending|warden_approved|security_approved|returned|completed|warden_rejected
+    Backwards-compatible extras:
+      - year: YYYY
+      - month: 1-12
+    """
+    params = {}
+    for name in ('from_date', 'to_date'):
+        value = parse_date(query.get(name))
+        if value:
+            params[name] = value.isoformat()
+    if query.get('status_filter'):
+        params['status_filter'] = query['status_filter']
+    try:
+        year = int(query['year']) if query.get('year') else None
+        month = int(query['month']) if query.get('month') else None
+    except ValueError:
+        year = month = None
+    if year:
+        params['year'] = year
+    if month and 1 <= month <= 12:
+        params['month'] = month
+    return params
+
+
+def outings_queryset(params):
+    """Security approved, returned and completed gatepasses matching ``params``, newest outing first"""
+    queryset = GatePass.objects.filter(status__in=OUTING_STATUSES)
+    queryset = filter_outing_window(
+        queryset, parse_date(params.get('from_date')), parse_date(params.get('to_date')),
+        params.get('year'), params.get('month'),
+    )
+    if params.get('status_filter'):
+        queryset = queryset.filter(status=params['status_filter'])
+    return queryset.order_by('-outing_at')
+
+
+def outing_rollups(params):
+    """Daily rollup rows of the outings matching ``params`` (the same selection as outings_queryset)"""
+    rollups = DailyOutingRollup.objects.filter(status__in=OUTING_STATUSES)
+    year, month = params.get('year'), params.get('month')
+    if year and month:
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        rollups = rollups.filter(day__gte=start, day__lt=end)
+    elif year:
+        rollups = rollups.filter(day__gte=date(year, 1, 1), day__lt=date(year + 1, 1, 1))
+    elif month:
+        rollups = rollups.filter(day__month=month)
+    from_date, to_date = parse_date(params.get('from_date')), parse_date(params.get('to_date'))
+    if from_date:
+        rollups = rollups.filter(day__gte=from_date)
+    if to_date:
+        rollups = rollups.filter(day__lte=to_date)
+    if params.get('status_filter'):
+        rollups = rollups.filter(status=params['status_filter'])
+    return rollups
+
+
+def outings_filename(params):
+    """File name (without extension) describing an outing export"""
+    filename_parts = ["outings"]
+    if params.get('from_date'):
+        filename_parts.append(f"from-{params['from_date']}")
+    if params.get('to_date'):
+        filename_parts.append(f"to-{params['to_date']}")
+    if params.get('status_filter'):
+        filename_parts.append(params['status_filter'])
+    if params.get('year'):
+        filename_parts.append(str(params['year']))
+    if params.get('month'):
+        filename_parts.append(f"{params['month']:02d}")
+    return f"gatepass_{'_'.join(filename_parts)}"
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d') if value else ""
+
+
+def _time(value):
+    return value.strftime('%H:%M') if value else ""
+
+
+def student_rows():
+    """Every student as a row under STUDENT_HEADERS, by name"""
+    students = Student.objects.order_by('student_name').values_list(
+        'student_name', 'hall_ticket_no', 'room_no', 'user__gender', 'user__email',
+        'user__mobile_number', 'parent_name', 'parent_mobile', 'user__is_approved',
+    )
+    for name, hall_ticket, room, gender, email, mobile, parent, parent_mobile, approved in students.iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    ):
+        yield [
+            name, hall_ticket, room,
+            GENDER_NAMES.get(gender, gender) if gender else "",
+            email or "", mobile or "", parent, parent_mobile,
+            "Yes" if approved else "No",
+        ]
+
+
+def outing_rows(queryset):
+    """Gatepasses of ``queryset`` as rows under OUTING_HEADERS"""
+    for (name, hall_ticket, outing_date, outing_time, return_date, return_time,
+         status, purpose, warden, security) in queryset.values_list(*OUTING_FIELDS).iterator(
+            chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            name, hall_ticket,
+            _date(outing_date), _time(outing_time), _date(return_date), _time(return_time),
+            STATUS_NAMES.get(status, status), purpose or "", warden or "", security or "",
+        ]
+
+
+def students_out_rows():
+    """Students currently out (security approved) as rows under STUDENT_OUT_HEADERS"""
+    status_column = OUTING_HEADERS.index("Status")
+    out = GatePass.objects.filter(status='security_approved').order_by('-outing_at')
+    for row in outing_rows(out):
+        del row[status_column]
+        yield row
+
+
+def monthly_count_rows(params):
+    """(month label, outings) per month of the outings matching ``params``, oldest first"""
+    monthly_counts = (
+        outing_rollups(params)
+        .annotate(month=TruncMonth('day'))
+        .values('month')
+        .annotate(total=Sum('count'))
+        .filter(total__gt=0)
+        .order_by('month')
+    )
+    for row in monthly_counts:
+        yield [row['month'].strftime('%Y-%m'), row['total']]
+
+
+class ColumnWidthTracker:
+    """
+    Column widths from the longest value per column among the rows passed to
+    ``add``, padded and kept between ``minimum`` and ``maximum`` characters.
+    """
+
+    def __init__(self, minimum=12, maximum=60, padding=2):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.padding = padding
+        self.lengths = []
+
+    def add(self, row):
+        for index, value in enumerate(row):
+            if index == len(self.lengths):
+                self.lengths.append(0)
+            if value is not None:
+                self.lengths[index] = max(self.lengths[index], len(str(value)))
+
+    def apply(self, ws):
+        for index, length in enumerate(self.lengths, start=1):
+            width = min(max(length + self.padding, self.minimum), self.maximum)
+            ws.column_dimensions[get_column_letter(index)].width = width
+
+
+def write_sheet(wb, title, headers, rows, total_label=None):
+    """
+    Append a write-only sheet of ``headers`` and ``rows``, optionally followed
+    by a "total_label: number of rows" line. Returns the row count.
+
+    Write-only sheets need their column widths before the first row, so the
+    widths come from the headers and the first WIDTH_SAMPLE_ROWS rows, which
+    are held back until the widths are set; the rest stream straight through.
+    """
+    ws = wb.create_sheet(title)
+    rows = iter(rows)
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+    widths = ColumnWidthTracker()
+    for row in chain([headers, [total_label]], sample):
+        widths.add(row)
+    widths.apply(ws)
+
+    ws.append(headers)
+    count = 0
+    for row in chain(sample, rows):
+        ws.append(row)
+        count += 1
+    if total_label:
+        ws.append([])
+        ws.append([total_label, count])
+    return count
+
+
+def write_students_workbook(out):
+    """Students and students currently out, saved as XLSX to ``out``"""
+    wb = openpyxl.Workbook(write_only=True)
+    write_sheet(wb, "Students", STUDENT_HEADERS, student_rows())
+    write_sheet(wb, "Students Out", STUDENT_OUT_HEADERS, students_out_rows(), "Total students currently out")
+    wb.save(out)
+
+
+def write_outings_workbook(out, params):
+    """Outings matching ``params`` and their monthly counts, saved as XLSX to ``out``"""
+    wb = openpyxl.Workbook(write_only=True)
+    write_sheet(wb, "Outings", OUTING_HEADERS, outing_rows(outings_queryset(params)), "Total outings in selection")
+    monthly = list(monthly_count_rows(params))
+    grand_total = sum(total for _, total in monthly)
+    write_sheet(wb, "Monthly Counts", ["Month", "Total Outings"], monthly + [[], ["Grand total outings", grand_total]])
+    wb.save(out)
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer: hands each formatted line back"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(keys, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(keys, row)), ensure_ascii=False) + '\n'
+
+
+def flat_response(fmt, filename, headers, keys, rows):
+    """
+    Stream ``rows`` as CSV (``headers`` as the first line) or, for 'jsonl', as
+    JSON lines (objects keyed by ``keys``), one line per row as it is read.
+    """
+    if fmt == 'csv':
+        response = StreamingHttpResponse(csv_lines(headers, rows), content_type='text/csv; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(jsonl_lines(keys, rows), content_type='application/x-ndjson; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -0,0 +1,63 @@
+"""
+Scheduled background jobs.
+
+Jobs run from management commands (cron, or a ``worker:`` process from the
+Procfile) instead of on the request path. Every run is claimed with a single
+conditional UPDATE on the job's JobRun row, so several workers can share one
+schedule without running the same job twice inside an interval.
+"""
+import logging
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import JobRun
+
+logger = logging.getLogger(__name__)
+
+
+def claim_job(name, interval, force=False):
+    """
+    Claim the next run of a job.
+
+    Returns True if this process may run the job now, False if another worker
+    already started it within the last ``interval`` (a timedelta). With
+    ``force`` the interval is ignored, but a run still in progress (started
+    within the interval) is not: two forced runs never overlap.
+    """
+    now = timezone.now()
+    JobRun.objects.get_or_create(name=name)
+    runs = JobRun.objects.filter(name=name)
+    if force:
+        runs = runs.exclude(last_status='running', last_started_at__gt=now - interval)
+    else:
+        runs = runs.filter(Q(last_started_at__isnull=True) | Q(last_started_at__lte=now - interval))
+    return runs.update(last_started_at=now, last_status='running') == 1
+
+
+def run_job(name, interval, func, force=False):
+    """
+    Run ``func`` if the job is due and record the outcome on its JobRun row.
+
+    ``func`` returns a short result string (e.g. "3 notifications created").
+    Returns that string, or None when the job was not due.
+    """
+    if not claim_job(name, interval, force=force):
+        return None
+    try:
+        result = func() or ''
+    except Exception as e:
+        logger.error(f"Scheduled job {name} failed: {str(e)}", exc_info=True)
+        JobRun.objects.filter(name=name).update(
+            last_finished_at=timezone.now(), last_status='failed', last_result=str(e)
+        )
+        raise
+    JobRun.objects.filter(name=name).update(
+        last_finished_at=timezone.now(), last_status='success', last_result=result
+    )
+    return result
+
+
+def last_run(name):
+    """Return the JobRun row for a job, or None if it has never been scheduled."""
+    return JobRun.objects.filter(name=name).first()
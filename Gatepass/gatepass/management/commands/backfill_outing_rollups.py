@@ -0,0 +1,68 @@
+"""
+Management command to (re)build the daily outing rollup from the GatePass
+table and report any drift.
+
+The rollup is maintained on every write and filled by the migration that
+creates it, so this is only needed after raw SQL or queryset.update() calls
+that bypass GatePass.save(), or to check a range of days. Limit it with
+--from / --to to rebuild one period without touching the rest.
+
+Usage:
+    python manage.py backfill_outing_rollups                                  # every day
+    python manage.py backfill_outing_rollups --from 2026-01-01 --to 2026-01-31
+    python manage.py backfill_outing_rollups --dry-run                        # report only
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gatepass.counters import rebuild_rollups
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date {value!r}; use YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily outing rollup from gatepasses and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='start',
+            help='First outing date to rebuild (YYYY-MM-DD; default: the earliest)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='end',
+            help='Last outing date to rebuild (YYYY-MM-DD; default: the latest)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drift, do not rewrite the rollup',
+        )
+
+    def handle(self, *args, **options):
+        start = _date(options['start']) if options['start'] else None
+        end = _date(options['end']) if options['end'] else None
+        if start and end and start > end:
+            raise CommandError('--from must not be after --to.')
+
+        drift = rebuild_rollups(start, end, dry_run=options['dry_run'])
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Daily outing rollup is in sync.'))
+            return
+
+        for (day, gender, status), stored, expected in drift:
+            self.stdout.write(self.style.WARNING(
+                f'  {day} {gender or "-"} {status}: stored {stored}, actual {expected}'
+            ))
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} rollup row(s) drifted (dry run, not fixed).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{len(drift)} drifted rollup row(s) rebuilt.'))
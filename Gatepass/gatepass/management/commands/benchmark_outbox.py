@@ -0,0 +1,139 @@
+"""
+Management command to measure outbox email throughput against a local SMTP
+sink, comparing SMTP connection batch sizes.
+
+The sink runs in-process on 127.0.0.1, accepts every message and discards
+it; --connect-delay adds a pause to every new connection to stand in for
+the TCP and TLS handshake of a real mail server. Each run queues its
+messages in a transaction that is rolled back afterwards, so nothing is
+left behind. Refuses to run while real messages are pending, since the
+worker would pick them up too.
+
+Usage:
+    python manage.py benchmark_outbox
+    python manage.py benchmark_outbox --messages 500 --connect-delay 150 --batch-size 1 --batch-size 100
+"""
+import socketserver
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from gatepass.models import OutboxMessage
+from gatepass.outbox import send_due_messages
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept and discard mail"""
+
+    def handle(self):
+        time.sleep(self.server.connect_delay)
+        self.server.count('connections')
+        self.wfile.write(b'220 benchmark sink ESMTP\r\n')
+        for line in self.rfile:
+            command = line.strip().split(b' ', 1)[0].upper()
+            if command in (b'EHLO', b'HELO'):
+                self.wfile.write(b'250 benchmark sink\r\n')
+            elif command == b'DATA':
+                self.wfile.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                for data in self.rfile:
+                    if data == b'.\r\n':
+                        break
+                self.server.count('messages')
+                self.wfile.write(b'250 OK\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                break
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, connect_delay=0.0):
+        super().__init__(('127.0.0.1', 0), _SinkHandler)
+        self.connect_delay = connect_delay
+        self.counts = {'connections': 0, 'messages': 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self.counts = {'connections': 0, 'messages': 0}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark outbox email delivery against a local SMTP sink'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--messages',
+            type=int,
+            default=200,
+            help='Messages to send per run (default: 200)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            action='append',
+            help='SMTP connection batch size to measure; may be repeated '
+                 '(default: 1 and OUTBOX_EMAIL_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--connect-delay',
+            type=int,
+            default=50,
+            help='Milliseconds the sink waits before greeting each new connection (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        if OutboxMessage.objects.filter(status='pending').exists():
+            raise CommandError('Pending outbox messages exist; run the benchmark against an idle database.')
+
+        count = options['messages']
+        batch_sizes = options['batch_size'] or sorted({1, settings.OUTBOX_EMAIL_BATCH_SIZE})
+        sink = SMTPSink(connect_delay=options['connect_delay'] / 1000)
+        thread = threading.Thread(target=sink.serve_forever, daemon=True)
+        thread.start()
+        try:
+            for size in batch_sizes:
+                sink.reset()
+                seconds, sent = self.run(sink, size, count)
+                self.stdout.write(
+                    f'batch size {size:>4}: {sent} sent over {sink.counts["connections"]} connection(s) '
+                    f'in {seconds:.2f}s ({sent / seconds if seconds else 0:.0f} messages/s)'
+                )
+        finally:
+            sink.shutdown()
+            sink.server_close()
+        self.stdout.write(self.style.SUCCESS('Benchmark complete.'))
+
+    def run(self, sink, size, count):
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=sink.server_address[1],
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+            OUTBOX_EMAIL_BATCH_SIZE=size,
+            OUTBOX_EMAILS_PER_MINUTE=0,
+        ), transaction.atomic():
+            OutboxMessage.objects.bulk_create([
+                OutboxMessage(recipient=f'student{i}@example.com', subject='Benchmark', body='Benchmark message')
+                for i in range(count)
+            ])
+            started = time.monotonic()
+            sent, _ = send_due_messages(limit=count)
+            seconds = time.monotonic() - started
+            transaction.set_rollback(True)
+        return seconds, sent
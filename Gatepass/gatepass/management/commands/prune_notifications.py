@@ -0,0 +1,109 @@
+"""
+Management command to delete notifications past their retention period,
+optionally archiving them first.
+
+Retention is set per notification type in NOTIFICATION_RETENTION_DAYS
+('default' covers the other types). Rows go in primary-key batches, each in
+its own short transaction, so the command can run next to live traffic; run
+it nightly from cron.
+
+Usage:
+    python manage.py prune_notifications                           # apply NOTIFICATION_RETENTION_DAYS
+    python manage.py prune_notifications --dry-run                 # only count what would go
+    python manage.py prune_notifications --days 90 --type overdue_return=14
+    python manage.py prune_notifications --archive /var/backups/notifications
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gatepass.models import Notification
+from gatepass.retention import DEFAULT_POLICY, prune_notifications
+
+
+class Command(BaseCommand):
+    help = 'Delete (and optionally archive) notifications older than their retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Retention in days for types without their own policy (default: NOTIFICATION_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--type',
+            action='append',
+            default=[],
+            metavar='TYPE=DAYS',
+            help='Retention for one notification type; may be repeated',
+        )
+        parser.add_argument(
+            '--archive',
+            metavar='DIR',
+            help='Append removed rows to gzip-compressed JSONL files in DIR before deleting them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to sleep between batches to leave room for other writers',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be removed',
+        )
+
+    def policy(self, options):
+        policy = dict(settings.NOTIFICATION_RETENTION_DAYS)
+        if options['days'] is not None:
+            policy[DEFAULT_POLICY] = options['days']
+        known_types = {t for t, _ in Notification.NOTIFICATION_TYPES}
+        for item in options['type']:
+            notification_type, _, days = item.partition('=')
+            if notification_type not in known_types or not days.isdigit():
+                raise CommandError(f'Invalid --type {item!r}; expected TYPE=DAYS with TYPE one of {sorted(known_types)}')
+            policy[notification_type] = int(days)
+        return policy
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['archive'] and not options['dry_run']:
+            os.makedirs(options['archive'], exist_ok=True)
+
+        policy = self.policy(options)
+        self.stdout.write('Retention (days): ' + ', '.join(f'{t}={d}' for t, d in sorted(policy.items())))
+
+        results = prune_notifications(
+            policy,
+            batch_size=options['batch_size'],
+            archive_dir=None if options['dry_run'] else options['archive'],
+            dry_run=options['dry_run'],
+            pause=options['pause'],
+        )
+
+        for result in results:
+            name = result.model._meta.verbose_name_plural
+            if options['dry_run']:
+                self.stdout.write(f'  {name}: {result.rows} row(s) would be removed')
+                continue
+            self.stdout.write(
+                f'  {name}: {result.rows} row(s) in {result.batches} batch(es), '
+                f'{result.seconds:.1f}s ({result.rows_per_second:.0f} rows/s)'
+            )
+            if result.archive_path:
+                self.stdout.write(f'    archived to {result.archive_path}')
+
+        total = sum(result.rows for result in results)
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{total} notification(s) past retention (dry run, nothing removed).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{total} notification(s) pruned.'))
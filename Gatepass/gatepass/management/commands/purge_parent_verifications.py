@@ -0,0 +1,61 @@
+"""
+Management command to delete parent verification codes that expired
+without being used.
+
+Codes stop working at their expires_at; rows are kept for
+PARENT_VERIFICATION_PURGE_AFTER_DAYS longer (so a late parent still sees
+"expired" rather than "not found") and then deleted in primary-key batches,
+each in its own short transaction. Verified rows are never removed. Run it
+nightly from cron.
+
+Usage:
+    python manage.py purge_parent_verifications
+    python manage.py purge_parent_verifications --dry-run
+    python manage.py purge_parent_verifications --days 0 --batch-size 500
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gatepass.verification import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete unverified parent verification codes that expired long enough ago'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Days a code stays after expiring (default: PARENT_VERIFICATION_PURGE_AFTER_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be removed',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days cannot be negative')
+
+        grace = timedelta(days=options['days']) if options['days'] is not None else None
+        result = purge_expired(grace, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'{result.rows} expired verification code(s) would be removed (dry run, nothing removed).'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'{result.rows} expired verification code(s) removed in {result.batches} batch(es), '
+                f'{result.seconds:.1f}s ({result.rows_per_second:.0f} rows/s).'
+            ))
@@ -0,0 +1,56 @@
+"""
+Management command to build queued spreadsheet exports.
+
+Only useful with EXPORT_WORKER set and MEDIA_ROOT shared with the web
+process (same machine or a shared volume); otherwise the web process builds
+exports itself. Several copies may run at once: each job is claimed by exactly one of them
+(see gatepass.export_jobs). Each pass also deletes exports older than
+EXPORT_RETENTION_HOURS.
+
+Usage:
+    python manage.py run_export_jobs              # build what is queued now and exit
+    python manage.py run_export_jobs --loop       # keep running (worker process)
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gatepass.export_jobs import purge_old_exports, run_export_jobs
+
+
+class Command(BaseCommand):
+    help = 'Build queued spreadsheet exports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=5,
+            help='Maximum exports to build per pass (default: 5)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.EXPORT_POLL_SECONDS,
+            help='Seconds between passes with --loop (default: EXPORT_POLL_SECONDS)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and check for exports once per interval',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done, failed = run_export_jobs(limit=options['limit'])
+            purged = purge_old_exports()
+            if done or failed or purged or not options['loop']:
+                style = self.style.WARNING if failed else self.style.SUCCESS
+                self.stdout.write(style(f'Exports: {done} built, {failed} failed, {purged} expired removed.'))
+
+            # A full pass may have left more jobs waiting; go again at once
+            if not options['loop']:
+                break
+            if done + failed < options['limit']:
+                time.sleep(options['interval'])
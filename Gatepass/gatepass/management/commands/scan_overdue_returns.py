@@ -0,0 +1,67 @@
+"""
+Management command to scan for overdue returns and notify wardens, the
+superadmin and the student.
+
+Safe to run from several workers or cron entries at once: each interval is
+claimed by exactly one run (see gatepass.jobs).
+
+Usage:
+    python manage.py scan_overdue_returns              # run once if due
+    python manage.py scan_overdue_returns --force      # run now regardless of interval
+    python manage.py scan_overdue_returns --loop       # keep running (Procfile worker)
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gatepass import jobs
+from gatepass.overdue import OVERDUE_SCAN_JOB, scan_overdue_returns
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Scan for overdue gatepass returns and create overdue notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=getattr(settings, 'OVERDUE_SCAN_INTERVAL_MINUTES', 15),
+            help='Minimum minutes between two scans (default: OVERDUE_SCAN_INTERVAL_MINUTES)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Run the scan even if the interval has not elapsed',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and scan once per interval',
+        )
+
+    def handle(self, *args, **options):
+        interval = timedelta(minutes=options['interval'])
+
+        while True:
+            try:
+                result = jobs.run_job(OVERDUE_SCAN_JOB, interval, scan_overdue_returns, force=options['force'])
+            except Exception:
+                if not options['loop']:
+                    raise
+                # One failed pass (e.g. a dropped database connection) must
+                # not stop the worker; the next interval tries again
+                logger.error("Overdue scan failed; retrying next interval", exc_info=True)
+            else:
+                if result is None:
+                    self.stdout.write('Overdue scan not due yet; skipped.')
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'Overdue scan complete: {result}'))
+
+            if not options['loop']:
+                break
+            time.sleep(interval.total_seconds())
@@ -0,0 +1,58 @@
+"""
+Management command to deliver notification digests.
+
+Notification types listed in NOTIFICATION_DIGEST_TYPES are held back when
+they happen; each run turns them into one summary notification per
+recipient and type and queues one email per recipient (sent by
+``send_outbox``). Safe to run from several workers or cron entries at once:
+each interval is claimed by exactly one run (see gatepass.jobs).
+
+Usage:
+    python manage.py send_notification_digests              # run once if due
+    python manage.py send_notification_digests --force      # send now regardless of interval
+    python manage.py send_notification_digests --loop       # keep running
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gatepass import jobs
+from gatepass.digests import DIGEST_JOB, send_notification_digests
+
+
+class Command(BaseCommand):
+    help = 'Send the pending notification digests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.NOTIFICATION_DIGEST_INTERVAL_MINUTES,
+            help='Minutes covered by one digest (default: NOTIFICATION_DIGEST_INTERVAL_MINUTES)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Send the digests even if the interval has not elapsed',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and send once per interval',
+        )
+
+    def handle(self, *args, **options):
+        interval = timedelta(minutes=options['interval'])
+
+        while True:
+            result = jobs.run_job(DIGEST_JOB, interval, send_notification_digests, force=options['force'])
+            if result is None:
+                self.stdout.write('Notification digests not due yet; skipped.')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'Notification digests complete: {result}'))
+
+            if not options['loop']:
+                break
+            time.sleep(interval.total_seconds())
@@ -0,0 +1,53 @@
+"""
+Management command to deliver queued outbox messages (registration emails).
+
+Several copies may run at once: each message is claimed by exactly one of
+them (see gatepass.outbox). Failed sends are retried with exponential
+backoff up to OUTBOX_MAX_ATTEMPTS.
+
+Usage:
+    python manage.py send_outbox              # deliver what is due now and exit
+    python manage.py send_outbox --loop       # keep running (Procfile worker)
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gatepass.outbox import send_due_messages
+
+
+class Command(BaseCommand):
+    help = 'Deliver due messages from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Maximum messages to deliver per pass (default: 100)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=getattr(settings, 'OUTBOX_POLL_SECONDS', 10),
+            help='Seconds between passes with --loop (default: OUTBOX_POLL_SECONDS)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and deliver once per interval',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_due_messages(limit=options['limit'])
+            if sent or failed or not options['loop']:
+                style = self.style.WARNING if failed else self.style.SUCCESS
+                self.stdout.write(style(f'Outbox: {sent} sent, {failed} failed.'))
+
+            # A full pass may have left more due messages; go again at once
+            if not options['loop']:
+                break
+            if sent + failed < options['limit']:
+                time.sleep(options['interval'])
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0006_gatepass_security_exit_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status', models.CharField(blank=True, choices=[('running', 'Running'), ('success', 'Success'), ('failed', 'Failed')], max_length=20)),
+                ('last_result', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('gatepass_request', 'Gate Pass Request'), ('warden_approval', 'Warden Approval'), ('warden_rejection', 'Warden Rejection'), ('security_approval', 'Security Approval'), ('return_recorded', 'Return Recorded'), ('overdue_return', 'Overdue Return'), ('gatepass_approved', 'Gatepass Approved'), ('gatepass_rejected', 'Gatepass Rejected')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:54
+
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_timestamps(apps, schema_editor):
+    GatePass = apps.get_model('gatepass', 'GatePass')
+    batch = []
+    for gatepass in GatePass.objects.only(
+        'outing_date', 'outing_time', 'expected_return_date', 'expected_return_time'
+    ).iterator(chunk_size=1000):
+        gatepass.outing_at = timezone.make_aware(datetime.combine(gatepass.outing_date, gatepass.outing_time))
+        gatepass.expected_return_at = timezone.make_aware(
+            datetime.combine(gatepass.expected_return_date, gatepass.expected_return_time)
+        )
+        batch.append(gatepass)
+        if len(batch) >= 1000:
+            GatePass.objects.bulk_update(batch, ['outing_at', 'expected_return_at'])
+            batch = []
+    if batch:
+        GatePass.objects.bulk_update(batch, ['outing_at', 'expected_return_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0007_jobrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gatepass',
+            name='expected_return_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='gatepass',
+            name='outing_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_timestamps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0008_gatepass_outing_at_expected_return_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gatepass',
+            index=models.Index(fields=['status', '-created_at'], name='gatepass_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gatepass',
+            index=models.Index(fields=['student', 'status'], name='gatepass_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gatepass',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'warden_approved', 'security_approved'])), fields=['-created_at'], name='gatepass_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gatepass',
+            index=models.Index(condition=models.Q(('status', 'security_approved')), fields=['expected_return_at'], name='gatepass_out_return_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['gatepass', 'notification_type', 'created_at'], name='notif_gp_type_created_idx'),
+        ),
+    ]
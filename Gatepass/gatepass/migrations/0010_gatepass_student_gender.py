@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:56
+
+from django.db import migrations, models
+
+
+def backfill_student_gender(apps, schema_editor):
+    GatePass = apps.get_model('gatepass', 'GatePass')
+    for gender in ('M', 'F'):
+        GatePass.objects.filter(student__user__gender__iexact=gender).update(student_gender=gender)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0009_gatepass_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gatepass',
+            name='student_gender',
+            field=models.CharField(blank=True, choices=[('M', 'Male'), ('F', 'Female')], editable=False, max_length=1, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='gatepass',
+            index=models.Index(fields=['student_gender', 'status', '-created_at'], name='gatepass_gender_status_idx'),
+        ),
+        migrations.RunPython(backfill_student_gender, migrations.RunPython.noop),
+    ]
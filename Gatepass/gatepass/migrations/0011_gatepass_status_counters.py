@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    GatePass = apps.get_model('gatepass', 'GatePass')
+    GatePassStatusCounter = apps.get_model('gatepass', 'GatePassStatusCounter')
+    StudentStatusCounter = apps.get_model('gatepass', 'StudentStatusCounter')
+    rows = GatePass.objects.order_by().values('student_gender', 'status').annotate(n=Count('id'))
+    GatePassStatusCounter.objects.bulk_create(
+        GatePassStatusCounter(gender=row['student_gender'] or '', status=row['status'], count=row['n'])
+        for row in rows
+    )
+    rows = GatePass.objects.order_by().values('student_id', 'status').annotate(n=Count('id'))
+    StudentStatusCounter.objects.bulk_create(
+        StudentStatusCounter(student_id=row['student_id'], status=row['status'], count=row['n'])
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0010_gatepass_student_gender'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GatePassStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gender', models.CharField(blank=True, max_length=1)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('warden_approved', 'Warden Approved'), ('warden_rejected', 'Warden Rejected'), ('security_approved', 'Security Approved'), ('returned', 'Returned'), ('completed', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StudentStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('warden_approved', 'Warden Approved'), ('warden_rejected', 'Warden Rejected'), ('security_approved', 'Security Approved'), ('returned', 'Returned'), ('completed', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_counters', to='gatepass.student')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='gatepassstatuscounter',
+            constraint=models.UniqueConstraint(fields=('gender', 'status'), name='unique_gender_status_counter'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentstatuscounter',
+            constraint=models.UniqueConstraint(fields=('student', 'status'), name='unique_student_status_counter'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0011_gatepass_status_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='gatepass',
+            name='gatepass_status_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='gatepass',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='gatepass_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:04
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+
+def backfill_search_text(apps, schema_editor):
+    Student = apps.get_model('gatepass', 'Student')
+    GatePass = apps.get_model('gatepass', 'GatePass')
+    for student in Student.objects.iterator():
+        prefix = '\n'.join([student.student_name, student.hall_ticket_no, student.room_no, '']).lower()
+        GatePass.objects.filter(student=student).update(search_text=Concat(
+            Value(prefix), Coalesce(Lower('purpose'), Value('')), output_field=models.TextField()
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0012_gatepass_status_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gatepass',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+    ]
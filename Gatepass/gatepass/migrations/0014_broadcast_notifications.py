@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0013_gatepass_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationReadCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_broadcast_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='notification_cursor', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BroadcastNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('superadmin', 'Super Admin'), ('warden', 'Warden'), ('security', 'Security'), ('student', 'Student')], max_length=20)),
+                ('gender', models.CharField(blank=True, choices=[('M', 'Male'), ('F', 'Female')], max_length=1, null=True)),
+                ('notification_type', models.CharField(choices=[('gatepass_request', 'Gate Pass Request'), ('warden_approval', 'Warden Approval'), ('warden_rejection', 'Warden Rejection'), ('security_approval', 'Security Approval'), ('return_recorded', 'Return Recorded'), ('overdue_return', 'Overdue Return'), ('gatepass_approved', 'Gatepass Approved'), ('gatepass_rejected', 'Gatepass Rejected')], max_length=20)),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('gatepass', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcasts', to='gatepass.gatepass')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['role', '-created_at'], name='broadcast_role_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0014_broadcast_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastRead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', 'id'], name='notif_user_unread_idx'),
+        ),
+        migrations.AddField(
+            model_name='broadcastread',
+            name='broadcast',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reads', to='gatepass.broadcastnotification'),
+        ),
+        migrations.AddField(
+            model_name='broadcastread',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_reads', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='broadcastread',
+            constraint=models.UniqueConstraint(fields=('user', 'broadcast'), name='unique_broadcast_read'),
+        ),
+    ]
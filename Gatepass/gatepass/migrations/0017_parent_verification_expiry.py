@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:12
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_expires_at(apps, schema_editor):
+    ParentVerification = apps.get_model('gatepass', 'ParentVerification')
+    ParentVerification.objects.filter(expires_at__isnull=True).update(
+        expires_at=F('created_at') + timedelta(minutes=settings.PARENT_VERIFICATION_TTL_MINUTES)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0016_outbox_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parentverification',
+            name='expires_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='parentverification',
+            name='expires_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='parentverification',
+            index=models.Index(condition=models.Q(('is_verified', False)), fields=['expires_at'], name='parent_verif_expiry_idx'),
+        ),
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='channel',
+            field=models.CharField(choices=[('email', 'Email'), ('sms', 'SMS')], default='email', max_length=10),
+        ),
+    ]
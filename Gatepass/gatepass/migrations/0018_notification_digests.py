@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0017_parent_verification_expiry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='broadcastnotification',
+            name='gatepass',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='broadcasts', to='gatepass.gatepass'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='gatepass',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='gatepass.gatepass'),
+        ),
+        migrations.CreateModel(
+            name='DigestEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(blank=True, choices=[('superadmin', 'Super Admin'), ('warden', 'Warden'), ('security', 'Security'), ('student', 'Student')], max_length=20)),
+                ('gender', models.CharField(blank=True, choices=[('M', 'Male'), ('F', 'Female')], max_length=1, null=True)),
+                ('notification_type', models.CharField(choices=[('gatepass_request', 'Gate Pass Request'), ('warden_approval', 'Warden Approval'), ('warden_rejection', 'Warden Rejection'), ('security_approval', 'Security Approval'), ('return_recorded', 'Return Recorded'), ('overdue_return', 'Overdue Return'), ('gatepass_approved', 'Gatepass Approved'), ('gatepass_rejected', 'Gatepass Rejected')], max_length=20)),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('gatepass', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_events', to='gatepass.gatepass')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='digest_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='digest_event_created_idx')],
+            },
+        ),
+    ]
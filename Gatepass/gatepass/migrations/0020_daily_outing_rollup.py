@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:50
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rollups(apps, schema_editor):
+    GatePass = apps.get_model('gatepass', 'GatePass')
+    DailyOutingRollup = apps.get_model('gatepass', 'DailyOutingRollup')
+    rows = GatePass.objects.order_by().values('outing_date', 'student_gender', 'status').annotate(n=Count('id'))
+    DailyOutingRollup.objects.bulk_create(
+        (
+            DailyOutingRollup(day=row['outing_date'], gender=row['student_gender'] or '', status=row['status'], count=row['n'])
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0019_export_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOutingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('gender', models.CharField(blank=True, max_length=1)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('warden_approved', 'Warden Approved'), ('warden_rejected', 'Warden Rejected'), ('security_approved', 'Security Approved'), ('returned', 'Returned'), ('completed', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailyoutingrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'gender', 'status'), name='unique_daily_outing_rollup'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0020_daily_outing_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parentverification',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='parentverification',
+            name='reissues',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
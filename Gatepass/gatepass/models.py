@@ -1,9 +1,37 @@
+from datetime import datetime
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Concat, Lower
 from django.core.validators import RegexValidator
 from django.utils import timezone
 
 
+def normalize_gender(value):
+    """Return 'M' or 'F' for a stored gender value, or None if missing/invalid"""
+    value = str(value or '').strip().upper()
+    return value if value in ('M', 'F') else None
+
+
+# Fields are joined with a newline so a search can never match across two fields
+SEARCH_SEPARATOR = '\n'
+
+
+def search_document(student, purpose):
+    """Lowercased text the dashboard search boxes match a gatepass against"""
+    return SEARCH_SEPARATOR.join([
+        student.student_name, student.hall_ticket_no, student.room_no, purpose or ''
+    ]).lower()
+
+
+def local_datetime(day, at):
+    """Combine a date and a time into an aware datetime in the current timezone"""
+    if day is None or at is None:
+        return None
+    return timezone.make_aware(datetime.combine(day, at))
+
+
 class User(AbstractUser):
     """Custom User model with role-based authentication"""
     
@@ -36,6 +64,20 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
+    def save(self, *args, **kwargs):
+        from . import counters
+
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if self.role == 'student' and (update_fields is None or 'gender' in update_fields):
+            # Keep the gender copied onto this student's gatepasses (and the
+            # per-gender status counters) current
+            gender = normalize_gender(self.gender)
+            counters.move_gender(
+                GatePass.objects.filter(student__user=self).exclude(student_gender=gender),
+                gender,
+            )
+
 
 class Student(models.Model):
     """Student profile model"""
@@ -54,6 +96,16 @@ class Student(models.Model):
     
     def __str__(self):
         return f"{self.student_name} ({self.hall_ticket_no})"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'student_name', 'hall_ticket_no', 'room_no'} & set(update_fields):
+            # Refresh the search text of this student's gatepasses in one UPDATE
+            prefix = search_document(self, '')
+            GatePass.objects.filter(student=self).update(search_text=Concat(
+                Value(prefix), Coalesce(Lower('purpose'), Value('')), output_field=models.TextField()
+            ))
     
     @property
     def username_format(self):
@@ -87,6 +139,10 @@ class Security(models.Model):
         return f"{self.name} (Security)"
 
 
+# A student may hold only one request in these statuses at a time
+ACTIVE_GATEPASS_STATUSES = ['pending', 'warden_approved', 'security_approved']
+
+
 class GatePass(models.Model):
     """Gate pass request model"""
     
@@ -104,6 +160,17 @@ class GatePass(models.Model):
     outing_time = models.TimeField()
     expected_return_date = models.DateField()
     expected_return_time = models.TimeField()
+    # Denormalized date + time pairs so overdue checks and date-range reports
+    # can use a single indexed range scan. Kept in sync by save().
+    outing_at = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
+    expected_return_at = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
+    # Student gender normalized to 'M'/'F' and copied here at creation, so
+    # warden lists are a single-table indexed lookup instead of a double join
+    student_gender = models.CharField(max_length=1, choices=User.GENDER_CHOICES, null=True, blank=True, editable=False)
+    # Student name, hall ticket, room and purpose in one lowercased column,
+    # indexed for substring search (see gatepass.search). Kept in sync by
+    # save() and Student.save().
+    search_text = models.TextField(blank=True, default='', editable=False)
     purpose = models.TextField(max_length=500, null=True, blank=True)
     photo = models.ImageField(upload_to='gatepass_photos/', null=True, blank=True, help_text='Upload your photo for gatepass verification')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -141,12 +208,87 @@ class GatePass(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Dashboards: filter by status, newest first (id breaks ties for
+            # keyset pagination)
+            models.Index(fields=['status', '-created_at', '-id'], name='gatepass_status_created_idx'),
+            # Warden dashboards: students of one gender, by status, newest first
+            models.Index(fields=['student_gender', 'status', '-created_at'], name='gatepass_gender_status_idx'),
+            # create_gatepass: "one active request at a time" check
+            models.Index(fields=['student', 'status'], name='gatepass_student_status_idx'),
+            # Active requests only; stays small while history grows
+            models.Index(
+                fields=['-created_at'], name='gatepass_active_created_idx',
+                condition=models.Q(status__in=ACTIVE_GATEPASS_STATUSES),
+            ),
+            # Overdue scan: students currently out, by expected return
+            models.Index(
+                fields=['expected_return_at'], name='gatepass_out_return_idx',
+                condition=models.Q(status='security_approved'),
+            ),
+        ]
+
     def __str__(self):
         return f"GatePass for {self.student.student_name} - {self.outing_date}"
+
+    def sync_timestamps(self):
+        """Refresh outing_at / expected_return_at from the separate date and time fields"""
+        self.outing_at = local_datetime(self.outing_date, self.outing_time)
+        self.expected_return_at = local_datetime(self.expected_return_date, self.expected_return_time)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'purpose' in instance.__dict__:
+            instance._indexed_purpose = instance.purpose
+        return instance
+
+    # Fields behind each part of counter_key(), in order
+    COUNTER_KEY_FIELDS = ({'student_gender'}, {'student', 'student_id'}, {'status'}, {'outing_date'})
+
+    def counter_key(self):
+        """(gender, student id, status, outing date) bucket this gatepass is counted in"""
+        return (self.student_gender or '', self.student_id, self.status, self.outing_date)
+
+    def saved_counter_key(self, stored_key, update_fields):
+        """
+        Bucket of the row after a save that wrote only ``update_fields``:
+        parts whose fields were not written keep their ``stored_key`` value.
+        """
+        if stored_key is None or update_fields is None:
+            return self.counter_key()
+        return tuple(
+            new if names & update_fields else old
+            for names, new, old in zip(self.COUNTER_KEY_FIELDS, self.counter_key(), stored_key)
+        )
+
+    def save(self, *args, **kwargs):
+        from . import counters
+
+        self.sync_timestamps()
+        if self._state.adding and self.student_gender is None and self.student_id:
+            self.student_gender = normalize_gender(self.student.user.gender)
+        if self.student_id and (self._state.adding or getattr(self, '_indexed_purpose', None) != self.purpose):
+            self.search_text = search_document(self.student, self.purpose)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = kwargs['update_fields'] = (
+                set(update_fields) | {'outing_at', 'expected_return_at', 'search_text'}
+            )
+        # A save that writes none of the counted fields cannot move the row
+        counted = update_fields is None or any(names & update_fields for names in self.COUNTER_KEY_FIELDS)
+        with transaction.atomic():
+            # Locks the stored row, so concurrent saves move it one at a time
+            old_key = None if self._state.adding or not counted else counters.stored_key(self)
+            super().save(*args, **kwargs)
+            if counted:
+                counters.record_change(old_key, self.saved_counter_key(old_key, update_fields))
+        self._indexed_purpose = self.purpose
     
     def get_appropriate_warden(self):
         """Get warden based on student's gender"""
-        gender = (self.student.user.gender or '').strip().upper()
+        gender = normalize_gender(self.student.user.gender)
         if gender == 'M':
             return User.objects.filter(role='warden', gender__iexact='M').first()
         elif gender == 'F':
@@ -163,7 +305,21 @@ class ParentVerification(models.Model):
     is_verified = models.BooleanField(default=False)
     verified_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    
+    # Codes are rejected after this; purge_parent_verifications removes
+    # unverified rows some time later
+    expires_at = models.DateTimeField()
+    # Codes submitted against the current code, which stops accepting any
+    # after PARENT_VERIFICATION_MAX_ATTEMPTS
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Times an expired code was replaced, at most PARENT_VERIFICATION_MAX_REISSUES
+    reissues = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Expiry sweep: only unverified rows are ever purged
+            models.Index(fields=['expires_at'], condition=models.Q(is_verified=False), name='parent_verif_expiry_idx'),
+        ]
+
     def __str__(self):
         return f"Parent verification for {self.gatepass.student.student_name}"
 
@@ -182,12 +338,271 @@ class Notification(models.Model):
         ('gatepass_rejected', 'Gatepass Rejected'),
     ]
 
+    # Tells personal and broadcast items apart in the merged inbox
+    kind = 'notification'
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
-    gatepass = models.ForeignKey(GatePass, on_delete=models.CASCADE, related_name='notifications')
+    # None for digest summaries, which cover several gatepasses
+    gatepass = models.ForeignKey(
+        GatePass, on_delete=models.CASCADE, related_name='notifications', null=True, blank=True
+    )
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Bell menu and dashboards: a user's latest notifications
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+            # Overdue scan: "already notified today" anti-join
+            models.Index(fields=['gatepass', 'notification_type', 'created_at'], name='notif_gp_type_created_idx'),
+            # Unread count and mark-all-read: only unread rows are indexed, so
+            # both stay small however long a user's history grows
+            models.Index(
+                fields=['user', 'id'], condition=models.Q(is_read=False), name='notif_user_unread_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"{self.get_notification_type_display()} - {self.user.username}"
+
+
+class BroadcastNotification(models.Model):
+    """Notification addressed to every user of a role (optionally of one gender), stored once"""
+
+    kind = 'broadcast'
+
+    role = models.CharField(max_length=20, choices=User.ROLE_CHOICES)
+    # None reaches the whole role; 'M'/'F' only users of that gender
+    gender = models.CharField(max_length=1, choices=User.GENDER_CHOICES, null=True, blank=True)
+    # None for digest summaries, which cover several gatepasses
+    gatepass = models.ForeignKey(
+        GatePass, on_delete=models.CASCADE, related_name='broadcasts', null=True, blank=True
+    )
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Bell menu and dashboards: a role's latest broadcasts
+            models.Index(fields=['role', '-created_at'], name='broadcast_role_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_notification_type_display()} - all {self.role}"
+
+
+class DigestEvent(models.Model):
+    """
+    A notification held back for the recipient's next digest.
+
+    Addressed like a Notification (``user``) or like a BroadcastNotification
+    (``role`` and ``gender``); ``send_notification_digests`` turns the events
+    of each window into one summary per recipient and type.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='digest_events', null=True, blank=True)
+    role = models.CharField(max_length=20, choices=User.ROLE_CHOICES, blank=True)
+    gender = models.CharField(max_length=1, choices=User.GENDER_CHOICES, null=True, blank=True)
+    gatepass = models.ForeignKey(GatePass, on_delete=models.CASCADE, related_name='digest_events')
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Digest job: every event of the window
+            models.Index(fields=['created_at'], name='digest_event_created_idx'),
+        ]
+
+    def __str__(self):
+        recipient = self.user.username if self.user_id else f"all {self.role}"
+        return f"{self.get_notification_type_display()} for {recipient} (pending digest)"
+
+
+class NotificationReadCursor(models.Model):
+    """Newest broadcast a user has read; older broadcasts count as read"""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_cursor')
+    last_read_broadcast_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} read up to broadcast {self.last_read_broadcast_id}"
+
+
+class BroadcastRead(models.Model):
+    """A broadcast read on its own, newer than the user's read cursor"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='broadcast_reads')
+    broadcast = models.ForeignKey(BroadcastNotification, on_delete=models.CASCADE, related_name='reads')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'broadcast'], name='unique_broadcast_read'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} read broadcast {self.broadcast_id}"
+
+
+class JobRun(models.Model):
+    """Bookkeeping for a scheduled background job (one row per job name)"""
+
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=50, unique=True)
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=20, choices=STATUS_CHOICES, blank=True)
+    last_result = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.last_status or 'never run'})"
+
+
+class OutboxMessage(models.Model):
+    """
+    A message waiting to be delivered by the ``send_outbox`` worker.
+
+    Written in the same transaction as the change it reports, so nothing is
+    sent for rolled-back work and a slow mail server never delays a request.
+    """
+
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, default='email')
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=200, blank=True)
+    # Cleared once sent: registration mails carry the initial password
+    body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # When the message is next due; a worker that claims it moves this past
+    # its lease, so a crashed worker's message becomes due again by itself
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Worker: due pending messages, oldest first
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} to {self.recipient} ({self.status})"
+
+
+class ExportJob(models.Model):
+    """
+    A spreadsheet export built by the ``run_export_jobs`` worker.
+
+    ``cache_key`` hashes the export kind, its normalized filters and the
+    version of the data they select, so identical requests share one job
+    and its file until the underlying rows change.
+    """
+
+    KIND_CHOICES = [
+        ('outings', 'Outings'),
+        ('students', 'Students'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    cache_key = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    filename = models.CharField(max_length=200)
+    file = models.FileField(upload_to='exports/', blank=True)
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, related_name='export_jobs', null=True, blank=True
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Worker: oldest job waiting to be built
+            models.Index(fields=['status', 'created_at'], name='export_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+
+class GatePassStatusCounter(models.Model):
+    """Number of gatepasses per student gender and status, maintained on write"""
+
+    # '' for students without a valid gender
+    gender = models.CharField(max_length=1, blank=True)
+    status = models.CharField(max_length=20, choices=GatePass.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['gender', 'status'], name='unique_gender_status_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.gender or '-'} / {self.status}: {self.count}"
+
+
+class StudentStatusCounter(models.Model):
+    """Number of gatepasses per student and status, maintained on write"""
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='status_counters')
+    status = models.CharField(max_length=20, choices=GatePass.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'status'], name='unique_student_status_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} / {self.status}: {self.count}"
+
+
+class DailyOutingRollup(models.Model):
+    """Number of gatepasses per outing date, student gender and status, maintained on write"""
+
+    day = models.DateField()
+    # '' for students without a valid gender
+    gender = models.CharField(max_length=1, blank=True)
+    status = models.CharField(max_length=20, choices=GatePass.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index behind day range reports
+            models.UniqueConstraint(fields=['day', 'gender', 'status'], name='unique_daily_outing_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} / {self.gender or '-'} / {self.status}: {self.count}"
@@ -0,0 +1,328 @@
+"""
+Notification service.
+
+Every flow that tells users about a gatepass goes through here. Personal
+notifications resolve their recipients with one query and are written with
+a single bulk_create. Notifications for a whole role (every guard, every
+warden of one gender) are stored once as a BroadcastNotification and merged
+into each user's list when it is read, so the table grows with gatepasses
+rather than with gatepasses x staff. Types in a role's
+NOTIFICATION_DIGEST_TYPES are staged as DigestEvent rows instead and reach
+the role as one summary per digest window (see ``digests``).
+
+The bell menu reads a per-user cache entry (latest notifications plus unread
+count). Entries are stamped with a per-user and a per-role version; writes
+and mark-read bump the version once they commit, so no entry outlives a
+change and none is rebuilt from rows that are not visible yet. The same
+versions, plus the gatepass status version for staff, make up the token
+the live update stream compares to notice changes without a query.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Case, Exists, Max, OuterRef, Q, QuerySet, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from . import versions
+from .counters import counted_status_counts
+from .models import (
+    User, Notification, BroadcastNotification, BroadcastRead, DigestEvent, NotificationReadCursor, normalize_gender,
+)
+from .pagination import merged_keyset_page
+from .serializers import NotificationItemSerializer
+
+INBOX_PAGE_SIZE = 20
+
+
+def _user_ids(users):
+    if isinstance(users, QuerySet):
+        return list(users.values_list('id', flat=True))
+    return [getattr(user, 'pk', user) for user in users]
+
+
+def _user_version_key(user_id):
+    return f'notifications:v:user:{user_id}'
+
+
+def _role_version_key(role):
+    return f'notifications:v:role:{role}'
+
+
+def _bell_key(user_id):
+    return f'notifications:bell:{user_id}'
+
+
+def invalidate_users(user_ids):
+    """Drop the cached bell of these users"""
+    for user_id in set(user_ids):
+        versions.bump(_user_version_key(user_id))
+
+
+def invalidate_roles(roles):
+    """Drop the cached bell of every user of these roles"""
+    for role in set(roles):
+        versions.bump(_role_version_key(role))
+
+
+def digested_types(role):
+    """Notification types ``role`` receives in digests rather than one by one"""
+    return settings.NOTIFICATION_DIGEST_TYPES.get(role, ())
+
+
+def _stage_digested(notifications):
+    """
+    Store the notifications whose recipient takes their type in digests as
+    DigestEvent rows; returns the ones to deliver now. Costs one query for
+    the recipients' roles, and none when no digest is configured.
+    """
+    digest_types = {t for types in settings.NOTIFICATION_DIGEST_TYPES.values() for t in types}
+    user_ids = {n.user_id for n in notifications if n.notification_type in digest_types}
+    if not user_ids:
+        return notifications
+    roles = dict(User.objects.filter(pk__in=user_ids).values_list('pk', 'role'))
+    immediate, events = [], []
+    for n in notifications:
+        if n.notification_type in digested_types(roles.get(n.user_id)):
+            events.append(DigestEvent(
+                user_id=n.user_id, gatepass_id=n.gatepass_id,
+                notification_type=n.notification_type, message=n.message,
+            ))
+        else:
+            immediate.append(n)
+    DigestEvent.objects.bulk_create(events)
+    return immediate
+
+
+def create_notifications(notifications):
+    """
+    bulk_create personal notifications and invalidate their recipients'
+    bells; notifications taken in digests are staged instead.
+    """
+    created = Notification.objects.bulk_create(_stage_digested(list(notifications)))
+    user_ids = [n.user_id for n in created]
+    transaction.on_commit(lambda: invalidate_users(user_ids))
+    return created
+
+
+def notify_users(users, gatepass, notification_type, message):
+    """
+    Notify every user in ``users`` (a User queryset, or users / user ids).
+
+    Returns the created notifications.
+    """
+    return create_notifications([
+        Notification(user_id=user_id, gatepass=gatepass, notification_type=notification_type, message=message)
+        for user_id in _user_ids(users)
+    ])
+
+
+def notify_role(role, gatepass, notification_type, message, gender=None):
+    """
+    Notify every user with ``role`` (only those of ``gender`` when given)
+    with one broadcast row, or one DigestEvent if the role takes this type
+    in digests.
+    """
+    if notification_type in digested_types(role):
+        return DigestEvent.objects.create(
+            role=role, gender=gender, gatepass=gatepass, notification_type=notification_type, message=message
+        )
+    broadcast = BroadcastNotification.objects.create(
+        role=role, gender=gender, gatepass=gatepass, notification_type=notification_type, message=message
+    )
+    transaction.on_commit(lambda: invalidate_roles([role]))
+    return broadcast
+
+
+def notify_student(gatepass, notification_type, message):
+    """Notify the student who owns the gatepass"""
+    return notify_users([gatepass.student.user_id], gatepass, notification_type, message)
+
+
+def notify_status_change(gatepass):
+    """
+    Send the standard notifications for the gatepass's current status.
+
+    Used where status is changed outside the dashboard views (the API approve
+    endpoints and the admin), so those changes reach the same people.
+    """
+    student_name = gatepass.student.student_name
+    if gatepass.status == 'warden_approved':
+        notify_role('security', gatepass, 'warden_approval', f"Gatepass approved by warden for {student_name}")
+        notify_student(gatepass, 'warden_approval', "Your gatepass request has been approved by the warden.")
+    elif gatepass.status == 'warden_rejected':
+        reason = gatepass.warden_rejection_reason or 'Not specified'
+        notify_student(gatepass, 'warden_rejection', f"Your gatepass request has been rejected. Reason: {reason}")
+    elif gatepass.status == 'security_approved':
+        notify_student(
+            gatepass, 'security_approval',
+            "Your gatepass has been approved by security. You can now leave the campus."
+        )
+    elif gatepass.status == 'returned':
+        notify_student(gatepass, 'return_recorded', "Your return has been recorded.")
+
+
+def _last_read_broadcast(user):
+    return Coalesce(
+        Subquery(NotificationReadCursor.objects.filter(user=user).values('last_read_broadcast_id')[:1]),
+        Value(0),
+    )
+
+
+def _read_on_its_own(user):
+    return Exists(BroadcastRead.objects.filter(user=user, broadcast=OuterRef('pk')))
+
+
+def broadcasts_for(user):
+    """
+    Broadcasts addressed to ``user``'s role and gender since they joined,
+    annotated with ``is_read`` from their read cursor and single reads.
+    """
+    return BroadcastNotification.objects.filter(
+        Q(gender__isnull=True) | Q(gender=normalize_gender(user.gender)),
+        role=user.role,
+        created_at__gte=user.date_joined,
+    ).annotate(
+        is_read=Case(
+            When(Q(id__lte=_last_read_broadcast(user)) | _read_on_its_own(user), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+    )
+
+
+def _merge_latest(personal, broadcasts, limit):
+    """Newest ``limit`` items of two querysets, each fetched with one LIMIT query"""
+    items = list(personal.order_by('-created_at')[:limit]) + list(broadcasts.order_by('-created_at')[:limit])
+    items.sort(key=lambda item: item.created_at, reverse=True)
+    return items[:limit]
+
+
+def notifications_for(user, limit=12):
+    """A user's latest personal and broadcast notifications, newest first (two queries)"""
+    return _merge_latest(Notification.objects.filter(user=user), broadcasts_for(user), limit)
+
+
+def unread_count(user):
+    """Number of unread personal and broadcast notifications (two COUNT queries)"""
+    return (
+        Notification.objects.filter(user=user, is_read=False).count()
+        + broadcasts_for(user).filter(id__gt=_last_read_broadcast(user)).exclude(_read_on_its_own(user)).count()
+    )
+
+
+def bell(user):
+    """
+    Bell menu data for ``user``: {'latest': [...], 'unread': n}.
+
+    Served from the cache while neither the user's nor their role's version
+    has changed; a miss costs four queries.
+    """
+    keys = [_user_version_key(user.pk), _role_version_key(user.role), _bell_key(user.pk)]
+    cached = cache.get_many(keys)
+    version = (cached.get(keys[0], 0), cached.get(keys[1], 0))
+    entry = cached.get(keys[2])
+    if entry is None or entry['version'] != version:
+        entry = {
+            'version': version,
+            'latest': notifications_for(user, settings.NOTIFICATION_BELL_SIZE),
+            'unread': unread_count(user),
+        }
+        cache.set(keys[2], entry, settings.NOTIFICATION_CACHE_SECONDS)
+    return entry
+
+
+def inbox_page(user, cursor=None, size=INBOX_PAGE_SIZE):
+    """
+    One page of ``user``'s whole notification history, newest first:
+    (items, next_cursor). Raises ValueError for a malformed cursor.
+    """
+    return merged_keyset_page([Notification.objects.filter(user=user), broadcasts_for(user)], cursor, size)
+
+
+def read_watermark(user):
+    """
+    What "mark all read" covers right now: the newest unread personal
+    notification id and the newest broadcast id. Clients send it back so
+    notifications that arrive after the page was shown stay unread.
+    """
+    return {
+        'up_to': Notification.objects.filter(user=user, is_read=False).aggregate(newest=Max('id'))['newest'] or 0,
+        'broadcasts_up_to': broadcasts_for(user).order_by('-created_at', '-id').values_list('id', flat=True).first() or 0,
+    }
+
+
+def mark_read(user, kind, pk):
+    """Mark one personal ('notification') or broadcast notification read; False if it is not the user's"""
+    if kind == 'notification':
+        found = Notification.objects.filter(user=user, pk=pk).update(is_read=True) > 0
+    elif kind == 'broadcast':
+        found = broadcasts_for(user).filter(pk=pk).exists()
+        if found:
+            BroadcastRead.objects.get_or_create(user=user, broadcast_id=pk)
+    else:
+        return False
+    transaction.on_commit(lambda: invalidate_users([user.pk]))
+    return found
+
+
+def mark_all_read(user, up_to=None, broadcasts_up_to=None):
+    """
+    Mark the user's notifications read up to a watermark (see read_watermark),
+    or all of them when no watermark is given.
+
+    Personal notifications are marked with one UPDATE over the unread index;
+    broadcasts by moving the user's read cursor, which makes the single reads
+    below it redundant.
+    """
+    personal = Notification.objects.filter(user=user, is_read=False)
+    if up_to is not None:
+        personal = personal.filter(id__lte=up_to)
+    personal.update(is_read=True)
+
+    if broadcasts_up_to is None:
+        broadcasts_up_to = broadcasts_for(user).aggregate(newest=Max('id'))['newest']
+    if broadcasts_up_to:
+        moved = NotificationReadCursor.objects.filter(
+            user=user, last_read_broadcast_id__lt=broadcasts_up_to
+        ).update(last_read_broadcast_id=broadcasts_up_to)
+        if not moved:
+            NotificationReadCursor.objects.get_or_create(
+                user=user, defaults={'last_read_broadcast_id': broadcasts_up_to}
+            )
+        BroadcastRead.objects.filter(user=user, broadcast_id__lte=broadcasts_up_to).delete()
+    transaction.on_commit(lambda: invalidate_users([user.pk]))
+
+
+def _live_keys(user):
+    keys = [_user_version_key(user.pk), _role_version_key(user.role)]
+    if user.role != 'student':
+        # Staff dashboards also follow status changes they are not notified of
+        keys.append(versions.GATEPASS_STATUS_VERSION)
+    return keys
+
+
+def live_token(user):
+    """Opaque token that changes whenever ``user``'s bell or dashboard counts may have changed"""
+    return '.'.join(str(version) for version in versions.current(_live_keys(user)))
+
+
+def live_counts(user):
+    """Status counts behind ``user``'s dashboard header, from the counters (None for students)"""
+    if user.role == 'warden':
+        gender = normalize_gender(user.gender)
+        return counted_status_counts(gender=gender) if gender else None
+    if user.role in ('security', 'superadmin'):
+        return counted_status_counts()
+    return None
+
+
+def live_update(user):
+    """What the live stream sends: the token, the bell and the dashboard counts"""
+    token = live_token(user)
+    entry = bell(user)
+    return {
+        'token': token,
+        'unread': entry['unread'],
+        'notifications': NotificationItemSerializer(entry['latest'], many=True).data,
+        'counts': live_counts(user),
+    }
@@ -0,0 +1,224 @@
+"""
+Transactional outbox for outgoing messages.
+
+Request handlers only insert an OutboxMessage row, inside the transaction
+that produced it; the ``send_outbox`` worker delivers due messages. A worker
+claims a message with one conditional UPDATE that pushes its next attempt
+past a lease, so several workers can drain the table side by side and a
+message held by a crashed worker is retried after the lease. Failures are
+retried with exponential backoff until OUTBOX_MAX_ATTEMPTS.
+
+Emails go out in batches over one SMTP connection each (one handshake per
+batch instead of per message), paced by OUTBOX_EMAILS_PER_MINUTE. Text
+messages ('sms' channel) are handed one by one to the SMS_PROVIDER.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .sms import get_provider
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(recipient, subject, body):
+    """Queue an email; call it inside the transaction that makes it true"""
+    return OutboxMessage.objects.create(channel='email', recipient=recipient, subject=subject, body=body)
+
+
+def enqueue_sms(mobile, text):
+    """Queue a text message; call it inside the transaction that makes it true"""
+    return OutboxMessage.objects.create(channel='sms', recipient=mobile, body=text)
+
+
+def _email(message, connection):
+    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@gatepass.local")
+    return EmailMessage(message.subject, message.body, from_email, [message.recipient], connection=connection)
+
+
+class RateLimit:
+    """Spaces calls to wait() so at most ``per_minute`` pass per minute (0: no limit)"""
+
+    def __init__(self, per_minute):
+        self.interval = 60 / per_minute if per_minute else 0
+        self.next_at = 0
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+def email_batch_size():
+    """
+    Messages sent per SMTP connection (OUTBOX_EMAIL_BATCH_SIZE), reduced when
+    the rate cap would make a batch outlive the claim lease.
+    """
+    size = settings.OUTBOX_EMAIL_BATCH_SIZE
+    per_minute = settings.OUTBOX_EMAILS_PER_MINUTE
+    if per_minute:
+        size = min(size, max(1, per_minute * settings.OUTBOX_LEASE_SECONDS // 120))
+    return size
+
+
+def send_email_batch(messages, rate_limit):
+    """
+    Send claimed email messages over one connection; yields (message, error).
+
+    One message failing (e.g. a refused recipient) does not fail the rest:
+    the connection is reopened and the batch carries on.
+    """
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for message in messages:
+            yield message, e
+        return
+    try:
+        for message in messages:
+            rate_limit.wait()
+            try:
+                if not connection.send_messages([_email(message, connection)]):
+                    raise RuntimeError('The mail backend did not send the message')
+            except Exception as e:
+                yield message, e
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    # send_messages() opens it again (or fails) for the next message
+                    pass
+            else:
+                yield message, None
+    finally:
+        connection.close()
+
+
+def send_sms_batch(messages, rate_limit):
+    """Send claimed text messages through the SMS provider; yields (message, error)"""
+    try:
+        provider = get_provider()
+    except Exception as e:
+        for message in messages:
+            yield message, e
+        return
+    for message in messages:
+        rate_limit.wait()
+        try:
+            provider.send(message.recipient, message.body)
+        except Exception as e:
+            yield message, e
+        else:
+            yield message, None
+
+
+SMS_BATCH_SIZE = 20
+
+
+def _unknown_channel_batch(messages, rate_limit):
+    for message in messages:
+        yield message, ValueError(f"Unknown outbox channel {message.channel!r}")
+
+
+def channel_sender(channel):
+    """(batch sender, batch size, per minute cap) for ``channel``"""
+    if channel == 'email':
+        return send_email_batch, email_batch_size(), settings.OUTBOX_EMAILS_PER_MINUTE
+    if channel == 'sms':
+        return send_sms_batch, SMS_BATCH_SIZE, 0
+    return _unknown_channel_batch, SMS_BATCH_SIZE, 0
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt after ``attempts`` failed ones"""
+    seconds = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.OUTBOX_RETRY_MAX_SECONDS))
+
+
+def due_messages(now=None, limit=100):
+    """Pending messages whose next attempt is due, oldest first"""
+    now = now or timezone.now()
+    return list(
+        OutboxMessage.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')[:limit]
+    )
+
+
+def claim(message, now=None):
+    """
+    Claim ``message`` for one delivery attempt.
+
+    Returns False when another worker claimed it first (its next attempt
+    time no longer matches what this worker read).
+    """
+    now = now or timezone.now()
+    lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    claimed = OutboxMessage.objects.filter(
+        pk=message.pk, status='pending', next_attempt_at=message.next_attempt_at
+    ).update(next_attempt_at=lease_until, attempts=F('attempts') + 1)
+    if claimed:
+        message.next_attempt_at = lease_until
+        message.attempts += 1
+    return claimed == 1
+
+
+def record_outcome(message, error):
+    """Store the result of one delivery attempt; returns True if the message was sent"""
+    if error is not None:
+        now = timezone.now()
+        message.last_error = f"{type(error).__name__}: {error}"
+        if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status = 'failed'
+            # Never delivered: drop the body (registration emails carry the
+            # initial password); the recipient and subject say what was lost
+            message.body = ''
+            logger.error(f"Giving up on outbox message {message.pk} to {message.recipient}: {message.last_error}")
+        else:
+            message.next_attempt_at = now + retry_delay(message.attempts)
+            logger.warning(f"Outbox message {message.pk} failed (attempt {message.attempts}): {message.last_error}")
+        message.save(update_fields=['status', 'next_attempt_at', 'body', 'last_error'])
+        return False
+
+    message.status = 'sent'
+    message.sent_at = timezone.now()
+    message.body = ''
+    message.last_error = ''
+    message.save(update_fields=['status', 'sent_at', 'body', 'last_error'])
+    return True
+
+
+def send_due_messages(limit=100):
+    """
+    Deliver up to ``limit`` due messages; returns (sent, failed).
+
+    Due messages are split by channel. Each channel's messages are claimed
+    one batch at a time, right before the batch is sent, so a rate cap
+    never keeps a claimed message waiting past its lease.
+    """
+    sent = failed = 0
+    by_channel = {}
+    for message in due_messages(limit=limit):
+        by_channel.setdefault(message.channel, []).append(message)
+    for channel, due in by_channel.items():
+        send_batch, size, per_minute = channel_sender(channel)
+        rate_limit = RateLimit(per_minute)
+        for start in range(0, len(due), size):
+            claimed = [message for message in due[start:start + size] if claim(message)]
+            if not claimed:
+                continue
+            for message, error in send_batch(claimed, rate_limit):
+                if record_outcome(message, error):
+                    sent += 1
+                else:
+                    failed += 1
+    return sent, failed
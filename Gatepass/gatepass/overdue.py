@@ -0,0 +1,86 @@
+"""
+Overdue return scanner.
+
+Runs from the ``scan_overdue_returns`` management command on a fixed
+interval; dashboards only read the overdue list and the last scan time.
+"""
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import User, GatePass, Notification
+from . import jobs
+from .notifications import create_notifications
+
+OVERDUE_SCAN_JOB = 'overdue_scan'
+
+
+def overdue_condition():
+    """Q for security approved gatepasses whose expected return date and time have passed"""
+    return Q(status='security_approved', expected_return_at__lt=timezone.now())
+
+
+def overdue_gatepasses():
+    """Security approved gatepasses whose expected return date and time have passed"""
+    return GatePass.objects.filter(overdue_condition())
+
+
+def scan_overdue_returns():
+    """
+    Create today's overdue notifications for students who have not returned.
+
+    Set-based: one anti-join finds every overdue gatepass without today's
+    overdue_return notification, and all warden, superadmin and student rows
+    are written with a single bulk_create. The query count does not depend on
+    how many students are late.
+    """
+    today = timezone.localdate()
+    notified_today = Notification.objects.filter(
+        gatepass=OuterRef('pk'),
+        notification_type='overdue_return',
+        created_at__date=today
+    )
+    pending = list(
+        overdue_gatepasses()
+        .filter(~Exists(notified_today))
+        .select_related('student')
+    )
+    if not pending:
+        return "0 notification(s) created"
+
+    superadmin = User.objects.filter(role='superadmin').first()
+
+    notifications = []
+    for gatepass in pending:
+        student = gatepass.student
+        expected = timezone.localtime(gatepass.expected_return_at).strftime('%Y-%m-%d %H:%M')
+        # Notification for warden
+        if gatepass.warden_approval_id:
+            notifications.append(Notification(
+                user_id=gatepass.warden_approval_id,
+                gatepass=gatepass,
+                notification_type='overdue_return',
+                message=f"URGENT: Student {student.student_name} has not returned after expected return {expected}. Parent contact: {student.parent_mobile}"
+            ))
+        # Notification for superadmin
+        if superadmin:
+            notifications.append(Notification(
+                user=superadmin,
+                gatepass=gatepass,
+                notification_type='overdue_return',
+                message=f"URGENT: Student {student.student_name} (Hall Ticket: {student.hall_ticket_no}) has not returned after expected return {expected}. Parent contact: {student.parent_mobile}"
+            ))
+        # Notification for student
+        notifications.append(Notification(
+            user_id=student.user_id,
+            gatepass=gatepass,
+            notification_type='overdue_return',
+            message=f"URGENT: You have not returned to the hostel after your expected return time {expected}. Please contact the hostel immediately."
+        ))
+
+    create_notifications(notifications)
+    return f"{len(notifications)} notification(s) created"
+
+
+def last_overdue_scan():
+    """JobRun row of the most recent overdue scan (None if it never ran)"""
+    return jobs.last_run(OVERDUE_SCAN_JOB)
@@ -0,0 +1,83 @@
+"""
+Keyset (cursor) pagination for long gatepass lists.
+
+Pages are ordered newest first on (created_at, id) and the next page starts
+strictly after the last row of the previous one, so fetching page N costs the
+same as page 1 (no OFFSET scan) and rows inserted meanwhile do not shift the
+pages. Cursors are opaque url-safe strings. ``merged_keyset_page`` pages
+through several querysets (e.g. personal and broadcast notifications) as one
+feed with the same guarantees.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def _encode(created_at, *numbers):
+    raw = '|'.join([created_at.isoformat()] + [str(n) for n in numbers]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode(cursor, count):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, *numbers = raw.split('|')
+        if len(numbers) != count:
+            raise ValueError(cursor)
+        return (datetime.fromisoformat(created_at), *[int(n) for n in numbers])
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def encode_cursor(obj):
+    """Cursor pointing just after ``obj`` in (-created_at, -id) order"""
+    return _encode(obj.created_at, obj.pk)
+
+
+def decode_cursor(cursor):
+    """Return (created_at, pk) for a cursor; raises ValueError if it is malformed"""
+    return _decode(cursor, 1)
+
+
+def keyset_page(queryset, cursor=None, size=25):
+    """
+    Return (items, next_cursor) for one page of ``queryset``, newest first.
+
+    ``next_cursor`` is None on the last page.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    items = list(queryset[:size + 1])
+    next_cursor = encode_cursor(items[size - 1]) if len(items) > size else None
+    return items[:size], next_cursor
+
+
+def merged_keyset_page(querysets, cursor=None, size=25):
+    """
+    Return (items, next_cursor) for one page of several querysets merged
+    newest first.
+
+    Rows with the same created_at are ordered by the position of their
+    queryset, then by -id. Each page costs one LIMIT query per queryset.
+    """
+    rows = []
+    for rank, queryset in enumerate(querysets):
+        queryset = queryset.order_by('-created_at', '-id')
+        if cursor:
+            created_at, last_rank, pk = _decode(cursor, 2)
+            if rank < last_rank:
+                queryset = queryset.filter(created_at__lt=created_at)
+            elif rank == last_rank:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+            else:
+                queryset = queryset.filter(created_at__lte=created_at)
+        rows.extend((item.created_at, -rank, item.pk, item) for item in queryset[:size + 1])
+    rows.sort(key=lambda row: row[:3], reverse=True)
+    next_cursor = None
+    if len(rows) > size:
+        created_at, rank, pk, _ = rows[size - 1]
+        next_cursor = _encode(created_at, -rank, pk)
+    return [row[3] for row in rows[:size]], next_cursor
@@ -0,0 +1,137 @@
+"""
+Notification retention.
+
+``prune_notifications`` removes personal and broadcast notifications older
+than their type's retention period (NOTIFICATION_RETENTION_DAYS). Rows are
+deleted in primary-key batches of bounded size, each in its own short
+transaction, and are never loaded as model instances; the optional archive
+reads each batch as plain dicts and appends it to a gzip-compressed JSONL
+file before the batch is deleted.
+"""
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification, BroadcastNotification, BroadcastRead
+from .notifications import invalidate_roles, invalidate_users
+
+DEFAULT_POLICY = 'default'
+
+
+def retention_condition(policy, now=None):
+    """
+    Q matching rows past retention under ``policy``, a {notification type:
+    days} dict whose 'default' entry covers every type not listed.
+    """
+    now = now or timezone.now()
+    listed = [t for t in policy if t != DEFAULT_POLICY]
+    condition = Q(pk__in=[])
+    for notification_type in listed:
+        condition |= Q(
+            notification_type=notification_type,
+            created_at__lt=now - timedelta(days=policy[notification_type]),
+        )
+    if policy.get(DEFAULT_POLICY) is not None:
+        condition |= Q(created_at__lt=now - timedelta(days=policy[DEFAULT_POLICY])) & ~Q(notification_type__in=listed)
+    return condition
+
+
+def _delete_broadcasts(pks):
+    roles = set(BroadcastNotification.objects.filter(pk__in=pks).values_list('role', flat=True))
+    # Raw DELETE: queryset.delete() would load every broadcast to cascade to
+    # its reads, which are removed explicitly first
+    BroadcastRead.objects.filter(broadcast_id__in=pks).delete()
+    opts = BroadcastNotification._meta
+    table, pk = connection.ops.quote_name(opts.db_table), connection.ops.quote_name(opts.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({", ".join(["%s"] * len(pks))})', pks)
+    transaction.on_commit(lambda: invalidate_roles(roles))
+
+
+def _delete_notifications(pks):
+    user_ids = set(Notification.objects.filter(pk__in=pks).values_list('user_id', flat=True))
+    # Nothing references Notification, so this is a single DELETE
+    Notification.objects.filter(pk__in=pks).delete()
+    transaction.on_commit(lambda: invalidate_users(user_ids))
+
+
+PRUNABLE = [
+    (Notification, _delete_notifications),
+    (BroadcastNotification, _delete_broadcasts),
+]
+
+
+class PruneResult:
+    """Rows removed from one table and how long it took"""
+
+    def __init__(self, model):
+        self.model = model
+        self.rows = 0
+        self.batches = 0
+        self.seconds = 0.0
+        self.archive_path = None
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _archive_path(directory, model, started):
+    return os.path.join(directory, f"{model._meta.model_name}-{started:%Y%m%dT%H%M%S}.jsonl.gz")
+
+
+def prune_table(model, delete, condition, batch_size=1000, archive_dir=None, dry_run=False, pause=0):
+    """
+    Delete (and optionally archive) the rows of ``model`` matching ``condition``.
+
+    Batches walk the primary key upwards, so retained rows are skipped once
+    instead of being re-read by every batch. Returns a PruneResult.
+    """
+    result = PruneResult(model)
+    started = time.monotonic()
+    candidates = model.objects.filter(condition).order_by('pk')
+    if dry_run:
+        result.rows = candidates.count()
+        result.seconds = time.monotonic() - started
+        return result
+
+    archive = None
+    if archive_dir:
+        result.archive_path = _archive_path(archive_dir, model, timezone.now())
+        archive = gzip.open(result.archive_path, 'wt', encoding='utf-8')
+    try:
+        last_pk = 0
+        while True:
+            pks = list(candidates.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            if archive:
+                for row in model.objects.filter(pk__in=pks).order_by('pk').values():
+                    archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                archive.flush()
+            with transaction.atomic():
+                delete(pks)
+            last_pk = pks[-1]
+            result.rows += len(pks)
+            result.batches += 1
+            if pause:
+                time.sleep(pause)
+    finally:
+        if archive:
+            archive.close()
+    result.seconds = time.monotonic() - started
+    return result
+
+
+def prune_notifications(policy=None, **options):
+    """Apply ``policy`` (default NOTIFICATION_RETENTION_DAYS) to every notification table"""
+    condition = retention_condition(policy or settings.NOTIFICATION_RETENTION_DAYS)
+    return [prune_table(model, delete, condition, **options) for model, delete in PRUNABLE]
@@ -0,0 +1,109 @@
+"""
+Indexed search for the dashboard search boxes.
+
+Every gatepass carries ``search_text`` (student name, hall ticket, room and
+purpose, lowercased). It is indexed per database:
+
+* SQLite: an external-content FTS5 table with the trigram tokenizer, kept
+  current by triggers on gatepass_gatepass.
+* PostgreSQL: a pg_trgm GIN index, which serves ``LIKE '%term%'`` directly.
+
+Other databases, and queries shorter than a trigram, fall back to a
+substring match on ``search_text`` (still a single-table query, no joins).
+
+SQLite drops a table's triggers whenever Django rebuilds it during a
+migration, so ensure_search_index() runs after every ``migrate`` and
+recreates whatever is missing.
+"""
+import logging
+
+from django.db import DatabaseError, connections
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'gatepass_search_fts'
+TRIGRAM_INDEX = 'gatepass_search_trgm_idx'
+
+SQLITE_TRIGGERS = {
+    'gatepass_search_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS gatepass_search_ai AFTER INSERT ON gatepass_gatepass BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+        END""",
+    'gatepass_search_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS gatepass_search_ad AFTER DELETE ON gatepass_gatepass BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        END""",
+    'gatepass_search_au': f"""
+        CREATE TRIGGER IF NOT EXISTS gatepass_search_au AFTER UPDATE OF search_text ON gatepass_gatepass BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+            INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+        END""",
+}
+
+# Databases (by alias) on which the FTS5 table exists, checked once per process
+_fts_ready = {}
+
+
+def _sqlite_objects(cursor):
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND name LIKE 'gatepass_search_%%')",
+        [FTS_TABLE],
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def ensure_search_index(using='default'):
+    """Create the search index and its triggers if missing; returns True if usable"""
+    connection = connections[using]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                existing = _sqlite_objects(cursor)
+                if existing >= {FTS_TABLE, *SQLITE_TRIGGERS}:
+                    return True
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    f"search_text, content='gatepass_gatepass', content_rowid='id', tokenize='trigram')"
+                )
+                for sql in SQLITE_TRIGGERS.values():
+                    cursor.execute(sql)
+                # Triggers were missing, so rows may have changed unseen
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+                _fts_ready.pop(using, None)
+                return True
+            if connection.vendor == 'postgresql':
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON gatepass_gatepass "
+                    f"USING gin (search_text gin_trgm_ops)"
+                )
+                return True
+    except DatabaseError as e:
+        logger.warning(f"Search index unavailable, falling back to substring search: {str(e)}")
+    return False
+
+
+def _has_fts(using):
+    if using not in _fts_ready:
+        with connections[using].cursor() as cursor:
+            _fts_ready[using] = FTS_TABLE in _sqlite_objects(cursor)
+    return _fts_ready[using]
+
+
+def search_gatepasses(queryset, query):
+    """
+    Filter a GatePass queryset to rows whose student name, hall ticket, room
+    number or purpose contains ``query`` (case-insensitive).
+    """
+    query = (query or '').strip().lower()
+    if not query:
+        return queryset
+    using = queryset.db
+    if connections[using].vendor == 'sqlite' and len(query) >= 3 and _has_fts(using):
+        # A quoted FTS5 phrase over trigrams is a substring match
+        phrase = '"' + query.replace('"', '""') + '"'
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [phrase]
+        ))
+    return queryset.filter(search_text__contains=query)
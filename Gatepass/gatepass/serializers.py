@@ -33,3 +33,20 @@ class ParentVerificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = ParentVerification
         fields = ['id', 'gatepass', 'parent_mobile', 'verification_code', 'is_verified']
+
+
+class NotificationItemSerializer(serializers.Serializer):
+    """A personal or broadcast notification as shown in the bell and the inbox"""
+    id = serializers.IntegerField()
+    kind = serializers.CharField()
+    gatepass = serializers.IntegerField(source='gatepass_id', allow_null=True)
+    notification_type = serializers.CharField()
+    message = serializers.CharField()
+    is_read = serializers.BooleanField()
+    created_at = serializers.DateTimeField()
+
+
+class MarkAllReadSerializer(serializers.Serializer):
+    """Optional watermark for "mark all read" (see notifications.read_watermark)"""
+    up_to = serializers.IntegerField(required=False, min_value=0)
+    broadcasts_up_to = serializers.IntegerField(required=False, min_value=0)
@@ -0,0 +1,73 @@
+"""
+Text message providers.
+
+SMS_PROVIDER is the dotted path of the class that delivers outbox messages
+on the 'sms' channel (parent verification codes). HTTPSMSProvider posts
+them to an HTTP gateway; the two stubs keep messages local. Any other
+gateway only needs a class with the same ``send`` method, added to settings
+without touching the callers.
+"""
+import json
+import logging
+import sys
+import urllib.request
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class SMSProvider:
+    """Interface: deliver ``text`` to ``mobile`` or raise to have the outbox retry"""
+
+    def send(self, mobile, text):
+        raise NotImplementedError
+
+
+class ConsoleSMSProvider(SMSProvider):
+    """Writes messages to stdout (development and demos)"""
+
+    def send(self, mobile, text):
+        if not settings.DEBUG:
+            logger.warning("SMS_PROVIDER is the console stub: the text to %s was only printed", mobile)
+        sys.stdout.write(f"SMS to {mobile}: {text}\n")
+        sys.stdout.flush()
+
+
+class FileSMSProvider(SMSProvider):
+    """Appends messages as JSON lines to SMS_FILE_PATH (staging, tests)"""
+
+    def send(self, mobile, text):
+        with open(settings.SMS_FILE_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'to': mobile, 'text': text, 'at': timezone.now().isoformat()}) + '\n')
+
+
+class HTTPSMSProvider(SMSProvider):
+    """
+    Posts ``{"to": mobile, "text": text}`` as JSON to SMS_GATEWAY_URL, with
+    SMS_GATEWAY_TOKEN as a bearer token when set. Any non-2xx answer raises,
+    so the outbox retries the message.
+    """
+
+    def send(self, mobile, text):
+        if not settings.SMS_GATEWAY_URL:
+            raise RuntimeError("SMS_GATEWAY_URL is not set")
+        headers = {'Content-Type': 'application/json'}
+        if settings.SMS_GATEWAY_TOKEN:
+            headers['Authorization'] = f"Bearer {settings.SMS_GATEWAY_TOKEN}"
+        request = urllib.request.Request(
+            settings.SMS_GATEWAY_URL,
+            data=json.dumps({'to': mobile, 'text': text}).encode(),
+            headers=headers,
+            method='POST',
+        )
+        # urlopen raises HTTPError for 4xx/5xx answers
+        with urllib.request.urlopen(request, timeout=settings.SMS_GATEWAY_TIMEOUT_SECONDS):
+            pass
+
+
+def get_provider():
+    """An instance of the configured SMS_PROVIDER"""
+    return import_string(settings.SMS_PROVIDER)()
@@ -0,0 +1,31 @@
+"""
+Dashboard statistics.
+
+Every status bucket of a queryset is counted in one aggregate() round-trip
+with conditional COUNTs, instead of one COUNT query per bucket.
+"""
+from django.db.models import Count, Q
+
+from .models import User, GatePass
+
+
+def status_counts(queryset, **extra_buckets):
+    """
+    Count a GatePass queryset by status in a single query.
+
+    Returns a dict with 'total', one key per GatePass status and one key per
+    extra bucket, e.g. ``status_counts(qs, approved=Q(status__in=[...]))``.
+    """
+    aggregates = {'total': Count('id')}
+    for status, _ in GatePass.STATUS_CHOICES:
+        aggregates[status] = Count('id', filter=Q(status=status))
+    for name, condition in extra_buckets.items():
+        aggregates[name] = Count('id', filter=condition)
+    return queryset.order_by().aggregate(**aggregates)
+
+
+def role_counts():
+    """Count users per role in a single query"""
+    return User.objects.aggregate(**{
+        role: Count('id', filter=Q(role=role)) for role, _ in User.ROLE_CHOICES
+    })
@@ -0,0 +1,217 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .counters import counted_status_counts, counted_student_status_counts, daily_outing_trends, expected_rollups
+from .exports import monthly_count_rows
+from .models import User, GatePass, GatePassStatusCounter, DailyOutingRollup
+from .stats import status_counts
+from .test_helpers import make_student, make_gatepass
+
+
+class StatusCounterTest(TestCase):
+
+    def assertCountersMatch(self):
+        for gender in ('M', 'F'):
+            self.assertEqual(
+                counted_status_counts(gender=gender),
+                status_counts(GatePass.objects.filter(student_gender=gender)),
+            )
+        self.assertEqual(counted_status_counts(), status_counts(GatePass.objects.all()))
+
+    def test_create_status_change_and_delete(self):
+        student = make_student(1)
+        first = make_gatepass(student, status='pending')
+        make_gatepass(make_student(2, gender='F'), status='pending')
+        self.assertCountersMatch()
+
+        first.status = 'warden_approved'
+        first.save()
+        first.status = 'security_approved'
+        first.save(update_fields=['status'])
+        self.assertCountersMatch()
+        self.assertEqual(counted_student_status_counts(student)['security_approved'], 1)
+
+        GatePass.objects.get(pk=first.pk).delete()
+        self.assertCountersMatch()
+        self.assertEqual(counted_student_status_counts(student)['total'], 0)
+
+    def test_saves_of_stale_copies_move_the_stored_row(self):
+        gatepass = make_gatepass(make_student(1), status='pending')
+        first, second = GatePass.objects.get(pk=gatepass.pk), GatePass.objects.get(pk=gatepass.pk)
+
+        first.status = 'warden_approved'
+        first.save()
+        second.status = 'warden_rejected'
+        second.save()
+
+        self.assertCountersMatch()
+        self.assertEqual(counted_status_counts()['pending'], 0)
+        self.assertEqual(counted_status_counts()['warden_approved'], 0)
+
+        first.delete()
+        self.assertCountersMatch()
+        # Deleting a copy of a row that is already gone changes nothing
+        second.delete()
+        self.assertCountersMatch()
+
+    def test_partial_save_of_a_stale_copy_keeps_the_stored_bucket(self):
+        gatepass = make_gatepass(make_student(1), status='pending')
+        stale = GatePass.objects.get(pk=gatepass.pk)
+        gatepass.status = 'warden_approved'
+        gatepass.save()
+
+        stale.purpose = 'Medical'
+        stale.save(update_fields=['purpose'])
+        self.assertCountersMatch()
+        self.assertEqual(counted_status_counts()['warden_approved'], 1)
+
+        # Written fields move the row; the others keep their stored values
+        stale.status = 'warden_rejected'
+        stale.outing_date -= timedelta(days=1)
+        stale.save(update_fields=['status'])
+        self.assertCountersMatch()
+        self.assertEqual(counted_status_counts()['warden_rejected'], 1)
+
+    def test_queryset_delete_and_student_delete(self):
+        make_gatepass(make_student(1), status='returned')
+        student = make_student(2)
+        make_gatepass(student, status='pending')
+
+        GatePass.objects.filter(status='returned').delete()
+        student.user.delete()
+
+        self.assertCountersMatch()
+        self.assertEqual(counted_status_counts()['total'], 0)
+
+    def test_gender_change_moves_counts(self):
+        student = make_student(1, gender='M')
+        make_gatepass(student, status='pending')
+
+        student.user.gender = 'F'
+        student.user.save()
+
+        self.assertCountersMatch()
+        self.assertEqual(counted_status_counts(gender='F')['pending'], 1)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        make_gatepass(make_student(1), status='pending')
+        # Bypass save(), as a raw bulk fix would
+        GatePass.objects.update(status='returned')
+
+        call_command('reconcile_gatepass_counters', '--dry-run', stdout=StringIO())
+        self.assertEqual(counted_status_counts()['pending'], 1)
+
+        call_command('reconcile_gatepass_counters', stdout=StringIO())
+        self.assertCountersMatch()
+        self.assertFalse(GatePassStatusCounter.objects.filter(status='pending', count__gt=0).exists())
+
+
+class DailyOutingRollupTest(TestCase):
+
+    def assertRollupMatches(self):
+        stored = {
+            (r.day, r.gender, r.status): r.count for r in DailyOutingRollup.objects.exclude(count=0)
+        }
+        self.assertEqual(stored, expected_rollups())
+
+    def test_status_date_gender_change_and_delete(self):
+        student = make_student(1)
+        gatepass = make_gatepass(student, status='pending')
+        make_gatepass(make_student(2, gender='F'), status='returned', days_ago=5)
+        self.assertRollupMatches()
+
+        gatepass.status = 'security_approved'
+        gatepass.save(update_fields=['status'])
+        gatepass = GatePass.objects.get(pk=gatepass.pk)
+        gatepass.outing_date -= timedelta(days=1)
+        gatepass.save()
+        self.assertRollupMatches()
+
+        student.user.gender = 'F'
+        student.user.save()
+        self.assertRollupMatches()
+
+        student.user.delete()
+        self.assertRollupMatches()
+        self.assertEqual(sum(DailyOutingRollup.objects.values_list('count', flat=True)), 1)
+
+    def test_daily_trends(self):
+        today = date.today()
+        make_gatepass(make_student(1), status='pending', days_ago=-1)
+        make_gatepass(make_student(2, gender='F'), status='returned', days_ago=-1)
+        make_gatepass(make_student(3), status='returned', days_ago=40)
+
+        with self.assertNumQueries(1):
+            trends = daily_outing_trends(days=7, today=today)
+
+        self.assertEqual([row['day'] for row in trends], [today - timedelta(days=n) for n in range(6, -1, -1)])
+        self.assertEqual(
+            {key: trends[-1][key] for key in ('total', 'pending', 'returned', 'M', 'F')},
+            {'total': 2, 'pending': 1, 'returned': 1, 'M': 1, 'F': 1},
+        )
+        self.assertEqual(sum(row['total'] for row in trends), 2)
+
+    def test_monthly_counts_from_rollup(self):
+        make_gatepass(make_student(1), status='returned', outing_date=date(2026, 1, 5))
+        make_gatepass(make_student(2), status='completed', outing_date=date(2026, 1, 20))
+        make_gatepass(make_student(3), status='security_approved', outing_date=date(2026, 3, 1))
+        make_gatepass(make_student(4), status='pending', outing_date=date(2026, 3, 2))
+
+        with self.assertNumQueries(1):
+            rows = list(monthly_count_rows({'year': 2026}))
+        self.assertEqual(rows, [['2026-01', 2], ['2026-03', 1]])
+        self.assertEqual(list(monthly_count_rows({'status_filter': 'returned'})), [['2026-01', 1]])
+        self.assertEqual(list(monthly_count_rows({'from_date': '2026-01-10', 'to_date': '2026-02-28'})), [['2026-01', 1]])
+
+    def test_backfill_reports_and_fixes_drift(self):
+        make_gatepass(make_student(1), status='pending', outing_date=date(2026, 1, 5))
+        make_gatepass(make_student(2), status='pending', outing_date=date(2026, 2, 5))
+        # Bypass save(), as a raw bulk fix would
+        GatePass.objects.update(status='returned')
+
+        out = StringIO()
+        call_command('backfill_outing_rollups', '--dry-run', stdout=out)
+        self.assertIn('4 rollup row(s) drifted', out.getvalue())
+        self.assertEqual(DailyOutingRollup.objects.get(day=date(2026, 1, 5), status='pending').count, 1)
+
+        call_command('backfill_outing_rollups', '--from', '2026-01-01', '--to', '2026-01-31', stdout=StringIO())
+        self.assertFalse(DailyOutingRollup.objects.filter(day=date(2026, 1, 5), status='pending').exists())
+        self.assertEqual(DailyOutingRollup.objects.get(day=date(2026, 2, 5), status='pending').count, 1)
+
+        call_command('backfill_outing_rollups', stdout=StringIO())
+        self.assertRollupMatches()
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class DashboardCounterTest(TestCase):
+
+    def test_superadmin_header_reads_counters(self):
+        admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='superadmin', is_approved=True
+        )
+        make_gatepass(make_student(1), status='pending')
+        make_gatepass(make_student(2), status='returned')
+        self.client.force_login(admin)
+
+        response = self.client.get('/superadmin/dashboard/')
+
+        self.assertEqual(response.context['total_gatepasses'], 2)
+        self.assertEqual(response.context['pending_gatepasses'], 1)
+
+    def test_superadmin_outing_trends(self):
+        admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='superadmin', is_approved=True
+        )
+        make_gatepass(make_student(1), status='returned', days_ago=1)
+        make_gatepass(make_student(2, gender='F'), status='returned', days_ago=1)
+        self.client.force_login(admin)
+
+        response = self.client.get('/superadmin/dashboard/')
+
+        [row] = response.context['outing_trends']
+        self.assertEqual((row['day'], row['M'], row['F'], row['returned']), (date.today() - timedelta(days=2), 1, 1, 2))
+        self.assertEqual(response.context['trend_totals']['total'], 2)
+        self.assertContains(response, 'Outing Trends')
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .digests import send_notification_digests
+from .models import User, Notification, BroadcastNotification, DigestEvent, OutboxMessage
+from .notifications import notify_role
+from .overdue import scan_overdue_returns
+from .test_helpers import make_student, make_gatepass
+
+LATER = timedelta(minutes=5)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    NOTIFICATION_DIGEST_TYPES={'superadmin': ['overdue_return'], 'warden': ['gatepass_request']},
+)
+class NotificationDigestTest(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='superadmin'
+        )
+        self.warden = User.objects.create_user(
+            username='warden', email='warden@example.com', password='x', role='warden', gender='M'
+        )
+        self.warden_f = User.objects.create_user(
+            username='wardenf', email='wardenf@example.com', password='x', role='warden', gender='F'
+        )
+
+    def test_overdue_notifications_for_the_superadmin_are_held_back(self):
+        for i in range(3):
+            make_gatepass(make_student(i), warden_approval=self.warden)
+
+        scan_overdue_returns()
+
+        self.assertFalse(Notification.objects.filter(user=self.admin).exists())
+        self.assertEqual(DigestEvent.objects.filter(user=self.admin).count(), 3)
+        # Wardens and students are not on a digest for this type
+        self.assertEqual(Notification.objects.filter(user=self.warden).count(), 3)
+        self.assertEqual(Notification.objects.filter(user__role='student').count(), 3)
+
+    def test_digest_sends_one_summary_and_one_email_per_recipient(self):
+        for i in range(3):
+            make_gatepass(make_student(i), warden_approval=self.warden)
+        scan_overdue_returns()
+
+        result = send_notification_digests(now=timezone.now() + LATER)
+
+        self.assertEqual(result, '1 digest(s) sent, 1 email(s) queued')
+        summary = Notification.objects.get(user=self.admin)
+        self.assertEqual(summary.notification_type, 'overdue_return')
+        self.assertIsNone(summary.gatepass_id)
+        self.assertIn('3 overdue return notifications', summary.message)
+        email = OutboxMessage.objects.get()
+        self.assertEqual(email.recipient, 'admin@example.com')
+        self.assertIn('3 overdue return notifications', email.body)
+        self.assertFalse(DigestEvent.objects.exists())
+
+    def test_role_digest_is_one_broadcast_per_gender(self):
+        for i, gender in enumerate(['M', 'M', 'F']):
+            gatepass = make_gatepass(make_student(i, gender=gender), status='pending', days_ago=-2)
+            notify_role('warden', gatepass, 'gatepass_request', 'New request', gender=gender)
+        self.assertFalse(BroadcastNotification.objects.exists())
+
+        send_notification_digests(now=timezone.now() + LATER)
+
+        digests = dict(BroadcastNotification.objects.values_list('gender', 'message'))
+        self.assertIn('2 gate pass request notifications', digests['M'])
+        self.assertIn('1 gate pass request notification ', digests['F'])
+        emails = dict(OutboxMessage.objects.values_list('recipient', 'body'))
+        self.assertIn('2 gate pass request', emails['warden@example.com'])
+        self.assertIn('1 gate pass request', emails['wardenf@example.com'])
+
+    def test_recipients_without_an_email_get_only_the_summary(self):
+        # create_user() would store '' for a missing address
+        nomail = User.objects.create_user(username='nomail', password='x', role='warden', gender='M')
+        User.objects.filter(pk=nomail.pk).update(email=None)
+        gatepass = make_gatepass(make_student(1), status='pending', days_ago=-2)
+        notify_role('warden', gatepass, 'gatepass_request', 'New request', gender='M')
+
+        result = send_notification_digests(now=timezone.now() + LATER)
+
+        self.assertEqual(result, '1 digest(s) sent, 1 email(s) queued')
+        self.assertEqual(OutboxMessage.objects.get().recipient, 'warden@example.com')
+        self.assertTrue(BroadcastNotification.objects.filter(role='warden', gender='M').exists())
+        self.assertFalse(DigestEvent.objects.exists())
+
+    def test_events_of_the_last_minute_wait_for_the_next_digest(self):
+        gatepass = make_gatepass(make_student(1), status='pending', days_ago=-2)
+        notify_role('warden', gatepass, 'gatepass_request', 'New request', gender='M')
+
+        self.assertEqual(send_notification_digests(), '0 digest(s) sent')
+        self.assertEqual(DigestEvent.objects.count(), 1)
+
+    @override_settings(NOTIFICATION_DIGEST_TYPES={})
+    def test_digests_off_by_default(self):
+        make_gatepass(make_student(1), warden_approval=self.warden)
+
+        with self.assertNumQueries(3):
+            scan_overdue_returns()
+
+        self.assertTrue(Notification.objects.filter(user=self.admin).exists())
+        self.assertFalse(DigestEvent.objects.exists())
+
+    def test_command_runs_once_per_interval(self):
+        out = StringIO()
+        call_command('send_notification_digests', stdout=out)
+        call_command('send_notification_digests', stdout=out)
+        self.assertIn('Notification digests complete: 0 digest(s) sent', out.getvalue())
+        self.assertIn('not due yet', out.getvalue())
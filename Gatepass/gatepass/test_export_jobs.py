@@ -0,0 +1,192 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .export_jobs import claim_next_job, purge_old_exports, request_export, run_export_jobs
+from .models import User, ExportJob
+from .test_helpers import InlineThread, make_student, make_gatepass
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    EXPORT_JOB_TIMEOUT_SECONDS=900,
+    EXPORT_RETENTION_HOURS=24,
+    EXPORT_WORKER=True,
+    EXPORT_WORKER_WAIT_SECONDS=30,
+    EXPORT_INLINE_WAIT_SECONDS=5,
+)
+class ExportJobTest(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media.name))
+        self.enterContext(mock.patch('gatepass.export_jobs.threading.Thread', InlineThread))
+        self.warden = User.objects.create_user(
+            username='warden', email='warden@example.com', password='x', role='warden', gender='M'
+        )
+        self.client.force_login(self.warden)
+        make_gatepass(make_student(1), status='returned', days_ago=3)
+
+    def test_identical_requests_share_one_job(self):
+        other = User.objects.create_user(
+            username='warden2', email='warden2@example.com', password='x', role='warden', gender='F'
+        )
+        first = self.client.get('/export/outings/', {'status_filter': 'returned', 'month': 'x'})
+        job = ExportJob.objects.get()
+        self.assertRedirects(first, f'/export/jobs/{job.pk}/', fetch_redirect_response=False)
+
+        self.client.force_login(other)
+        second = self.client.get('/export/outings/', {'month': '', 'status_filter': 'returned'})
+
+        self.assertRedirects(second, f'/export/jobs/{job.pk}/', fetch_redirect_response=False)
+        self.assertEqual(ExportJob.objects.count(), 1)
+        self.assertEqual(job.params, {'status_filter': 'returned'})
+
+    def test_finished_export_is_served_from_storage(self):
+        self.client.get('/export/outings/')
+        self.assertEqual(run_export_jobs(), (1, 0))
+        job = ExportJob.objects.get()
+        self.assertTrue(os.path.exists(job.file.path))
+
+        # Session, user, job lookup: nothing is counted and the export is not rerun
+        with self.assertNumQueries(3):
+            response = self.client.get('/export/outings/')
+            content = b''.join(response.streaming_content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('filename="gatepass_outings.xlsx"', response['Content-Disposition'])
+        with open(job.file.path, 'rb') as f:
+            self.assertEqual(content, f.read())
+
+    def test_writes_get_a_new_export(self):
+        self.client.get('/export/outings/')
+        run_export_jobs()
+
+        # Signing in changes nothing exported: the cached file stays valid
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.warden)
+        self.assertEqual(self.client.get('/export/outings/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_gatepass(make_student(3), status='returned', days_ago=1)
+        response = self.client.get('/export/outings/')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ExportJob.objects.count(), 2)
+
+    def test_unclaimed_job_is_built_by_the_web_process(self):
+        self.client.get('/export/students/')
+        job = ExportJob.objects.get()
+        ExportJob.objects.update(created_at=timezone.now() - timedelta(seconds=31))
+
+        status = self.client.get(f'/export/jobs/{job.pk}/', {'format': 'json'}).json()
+
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(run_export_jobs(), (0, 0))
+
+    @override_settings(EXPORT_WORKER=False)
+    def test_without_a_worker_the_request_builds_the_export(self):
+        response = self.client.get('/export/outings/')
+
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
+        job = ExportJob.objects.get()
+        self.assertEqual(job.status, 'done')
+
+        # A file missing from this process's storage is rebuilt, not handed back to a worker
+        os.remove(job.file.path)
+        response = self.client.get('/export/outings/')
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
+        self.assertTrue(os.path.exists(ExportJob.objects.get().file.path))
+
+    @override_settings(EXPORT_WORKER=False)
+    def test_slow_build_continues_after_the_request(self):
+        threads = []
+
+        class Slow(InlineThread):
+            def start(self):
+                threads.append(self)
+
+        with mock.patch('gatepass.export_jobs.threading.Thread', Slow):
+            response = self.client.get('/export/students/')
+        job = ExportJob.objects.get()
+        self.assertRedirects(response, f'/export/jobs/{job.pk}/', fetch_redirect_response=False)
+        self.assertEqual(job.status, 'running')
+        # Polling does not start a second build
+        self.assertEqual(self.client.get(f'/export/jobs/{job.pk}/', {'format': 'json'}).json()['status'], 'running')
+        self.assertEqual(len(threads), 1)
+
+        threads[0].run()
+        self.assertEqual(self.client.get(f'/export/jobs/{job.pk}/', {'format': 'json'}).json()['status'], 'done')
+
+    @override_settings(EXPORT_WORKER=False)
+    def test_build_lost_with_its_process_is_started_again(self):
+        job = request_export('students', {})
+        ExportJob.objects.update(status='running', started_at=timezone.now() - timedelta(seconds=901))
+
+        status = self.client.get(f'/export/jobs/{job.pk}/', {'format': 'json'}).json()
+
+        self.assertEqual(status['status'], 'done')
+
+    def test_status_page_and_json(self):
+        self.client.get('/export/students/')
+        job = ExportJob.objects.get()
+
+        self.assertContains(self.client.get(f'/export/jobs/{job.pk}/'), job.filename)
+        pending = self.client.get(f'/export/jobs/{job.pk}/', {'format': 'json'}).json()
+        self.assertEqual((pending['status'], pending['download_url']), ('pending', None))
+        self.assertEqual(self.client.get(f'/export/jobs/{job.pk}/download/').status_code, 404)
+
+        run_export_jobs()
+
+        done = self.client.get(f'/export/jobs/{job.pk}/', {'format': 'json'}).json()
+        self.assertEqual((done['status'], done['download_url']), ('done', f'/export/jobs/{job.pk}/download/'))
+        self.assertEqual(self.client.get(done['download_url']).status_code, 200)
+
+    def test_failed_export_is_queued_again(self):
+        self.client.get('/export/outings/')
+        with mock.patch('gatepass.export_jobs.write_outings_workbook', side_effect=OSError('disk full')), \
+                self.assertLogs('gatepass.export_jobs', 'ERROR'):
+            self.assertEqual(run_export_jobs(), (0, 1))
+        job = ExportJob.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('disk full', job.error)
+
+        self.client.get('/export/outings/')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('pending', ''))
+
+    def test_abandoned_job_is_picked_up_again(self):
+        job = request_export('students', {})
+        self.assertEqual(claim_next_job().pk, job.pk)
+        self.assertIsNone(claim_next_job())
+
+        self.assertEqual(claim_next_job(now=timezone.now() + timedelta(seconds=901)).pk, job.pk)
+
+    def test_old_exports_are_deleted(self):
+        self.client.get('/export/outings/')
+        out = StringIO()
+        call_command('run_export_jobs', stdout=out)
+        self.assertIn('1 built', out.getvalue())
+        path = ExportJob.objects.get().file.path
+
+        self.assertEqual(purge_old_exports(), 0)
+        self.assertEqual(purge_old_exports(now=timezone.now() + timedelta(hours=25)), 1)
+
+        self.assertFalse(ExportJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_students_cannot_export(self):
+        self.client.force_login(make_student(9).user)
+
+        self.assertRedirects(self.client.get('/export/students/'), '/', fetch_redirect_response=False)
+        self.assertFalse(ExportJob.objects.exists())
@@ -0,0 +1,185 @@
+import csv
+import gzip
+import json
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+import openpyxl
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .export_jobs import run_export_jobs
+from .exports import WIDTH_SAMPLE_ROWS, write_sheet
+from .models import User
+from .test_helpers import InlineThread, make_student, make_gatepass
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ExcelExportTest(TestCase):
+
+    def setUp(self):
+        self.warden = User.objects.create_user(
+            username='warden', email='warden@example.com', password='x', role='warden', gender='M'
+        )
+        self.client.force_login(self.warden)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media.name))
+        self.enterContext(mock.patch('gatepass.export_jobs.threading.Thread', InlineThread))
+
+    def export(self, url, params=None):
+        """Request an export, let the worker build it, and download it"""
+        response = self.client.get(url, params)
+        if response.status_code == 302 and '/export/jobs/' in response.url:
+            run_export_jobs()
+            response = self.client.get(url, params)
+        return response
+
+    def workbook(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        return openpyxl.load_workbook(BytesIO(b''.join(response.streaming_content)))
+
+    def test_outings_export(self):
+        student = make_student(1)
+        make_gatepass(student, status='returned', days_ago=40, warden_approval=self.warden)
+        make_gatepass(student, status='security_approved', days_ago=2, purpose='Medical')
+        make_gatepass(make_student(2), status='pending', days_ago=1)
+
+        response = self.export('/export/outings/')
+
+        self.assertIn('attachment; filename="gatepass_outings.xlsx"', response['Content-Disposition'])
+        wb = self.workbook(response)
+        rows = list(wb['Outings'].values)
+        self.assertEqual(rows[0][:3], ('Student Name', 'Hall Ticket No', 'Outing Date'))
+        self.assertEqual([row[6] for row in rows[1:3]], ['Security Approved', 'Returned'])
+        self.assertEqual(rows[1][7], 'Medical')
+        self.assertEqual(rows[2][8], 'warden')
+        self.assertEqual(rows[-1][:2], ('Total outings in selection', 2))
+        monthly = list(wb['Monthly Counts'].values)
+        self.assertEqual(monthly[-1], ('Grand total outings', 2))
+
+    def test_outings_export_filters(self):
+        make_gatepass(make_student(1), status='returned', days_ago=2)
+        make_gatepass(make_student(2), status='security_approved', days_ago=2)
+
+        wb = self.workbook(self.export('/export/outings/', {'status_filter': 'returned'}))
+
+        self.assertEqual(list(wb['Outings'].values)[-1][:2], ('Total outings in selection', 1))
+
+    def test_students_export(self):
+        out = make_student(1, gender='F')
+        make_student(2)
+        make_gatepass(out, status='security_approved', days_ago=1)
+
+        wb = self.workbook(self.export('/export/students/'))
+
+        students = list(wb['Students'].values)
+        self.assertEqual(students[1][:4], ('Student 1', '22BH1A0001', '101', 'Female'))
+        self.assertEqual(len(students), 3)
+        self.assertEqual(list(wb['Students Out'].values)[-1][:2], ('Total students currently out', 1))
+
+    @override_settings(EXPORT_WORKER=True)
+    def test_query_count_does_not_grow_with_rows(self):
+        def queries():
+            self.client.get('/export/outings/')
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(run_export_jobs(), (1, 0))
+            return len(captured)
+
+        make_gatepass(make_student(0), status='returned', days_ago=3)
+        few = queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(1, 20):
+                make_gatepass(make_student(i), status='returned', days_ago=3)
+        self.assertEqual(queries(), few)
+
+    def test_students_cannot_export(self):
+        self.client.force_login(make_student(1).user)
+        self.assertRedirects(self.client.get('/export/outings/'), '/', fetch_redirect_response=False)
+
+
+class ColumnWidthTest(TestCase):
+
+    def test_widths_come_from_the_longest_sampled_value(self):
+        wb = openpyxl.Workbook(write_only=True)
+        rows = [['Ann', 'x' * 30], ['A much longer student name', 'y' * 500], ['Bo', None]]
+        write_sheet(wb, 'Sheet', ['Name', 'Purpose'], rows, 'Total')
+        out = BytesIO()
+        wb.save(out)
+
+        ws = openpyxl.load_workbook(out)['Sheet']
+        self.assertEqual(ws.column_dimensions['A'].width, len('A much longer student name') + 2)
+        self.assertEqual(ws.column_dimensions['B'].width, 60)
+        self.assertEqual(ws.max_row, 6)
+
+    def test_only_the_sample_is_measured(self):
+        wb = openpyxl.Workbook(write_only=True)
+        rows = [['short']] * WIDTH_SAMPLE_ROWS + [['a value past the sample']]
+        self.assertEqual(write_sheet(wb, 'Sheet', ['Name'], rows), WIDTH_SAMPLE_ROWS + 1)
+        out = BytesIO()
+        wb.save(out)
+
+        self.assertEqual(openpyxl.load_workbook(out)['Sheet'].column_dimensions['A'].width, 12)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class FlatExportTest(TestCase):
+
+    def setUp(self):
+        self.warden = User.objects.create_user(
+            username='warden', email='warden@example.com', password='x', role='warden', gender='M'
+        )
+        self.client.force_login(self.warden)
+        make_gatepass(make_student(1), status='returned', days_ago=2, purpose='Home, then "clinic"')
+        make_gatepass(make_student(2), status='security_approved', days_ago=1)
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_outings_csv(self):
+        response = self.client.get('/export/outings.csv', {'status_filter': 'returned'})
+
+        self.assertIn('filename="gatepass_outings_returned.csv"', response['Content-Disposition'])
+        rows = list(csv.reader(self.content(response).splitlines()))
+        self.assertEqual(rows[0][:2], ['Student Name', 'Hall Ticket No'])
+        self.assertEqual(len(rows), 2)
+        self.assertEqual((rows[1][0], rows[1][6], rows[1][7]), ('Student 1', 'Returned', 'Home, then "clinic"'))
+
+    def test_outings_jsonl(self):
+        lines = self.content(self.client.get('/export/outings.jsonl')).splitlines()
+
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([r['student_name'] for r in records], ['Student 2', 'Student 1'])
+        self.assertEqual(records[0]['status'], 'Security Approved')
+
+    def test_students_csv_and_jsonl(self):
+        rows = list(csv.reader(self.content(self.client.get('/export/students.csv')).splitlines()))
+        self.assertEqual([row[1] for row in rows[1:]], ['22BH1A0001', '22BH1A0002'])
+
+        records = [json.loads(line) for line in self.content(self.client.get('/export/students.jsonl')).splitlines()]
+        self.assertEqual(records[0]['hall_ticket_no'], '22BH1A0001')
+
+    def test_gzip_when_accepted(self):
+        response = self.client.get('/export/outings.csv', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        text = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        self.assertIn('Student 1', text)
+
+    def test_students_cannot_export(self):
+        self.client.force_login(make_student(3).user)
+        self.assertEqual(self.client.get('/export/students.csv').status_code, 302)
@@ -0,0 +1,52 @@
+"""Model factories and stand-ins shared by the test modules"""
+from datetime import date, time, timedelta
+
+from .models import User, Student, GatePass
+
+
+def make_student(index, gender='M'):
+    user = User.objects.create_user(
+        username=f'student{index}', email=f'student{index}@example.com', password='Password@123',
+        role='student', gender=gender, is_approved=True,
+    )
+    return Student.objects.create(
+        user=user,
+        hall_ticket_no=f'22BH1A{index:04d}',
+        student_name=f'Student {index}',
+        room_no=f'{100 + index}',
+        parent_name=f'Parent {index}',
+        parent_mobile=f'9{index:09d}',
+    )
+
+
+def make_gatepass(student, status='security_approved', days_ago=2, **extra):
+    outing = date.today() - timedelta(days=days_ago + 1)
+    fields = {
+        'outing_date': outing,
+        'outing_time': time(9, 0),
+        'expected_return_date': date.today() - timedelta(days=days_ago),
+        'expected_return_time': time(18, 0),
+        'purpose': 'Home visit',
+    }
+    fields.update(extra)
+    return GatePass.objects.create(student=student, status=status, **fields)
+
+
+class InlineThread:
+    """
+    Stand-in for threading.Thread whose target runs in the calling thread,
+    inside the test's transaction: patch it over a module's threading.Thread.
+    Subclasses can override start() to hold the target back until run().
+    """
+
+    def __init__(self, target, args=(), kwargs=None, **options):
+        self.target, self.args, self.kwargs = target, args, kwargs or {}
+
+    def start(self):
+        self.run()
+
+    def run(self):
+        self.target(*self.args, **self.kwargs)
+
+    def join(self, timeout=None):
+        pass
@@ -0,0 +1,44 @@
+from django.db.models import Q
+from django.test import TestCase
+
+from .models import GatePass
+from .stats import status_counts
+from .test_helpers import make_gatepass, make_student
+
+
+class GatePassDenormalizationTest(TestCase):
+
+    def test_student_gender_copied_and_normalized(self):
+        student = make_student(1, gender='f')
+        gatepass = make_gatepass(student)
+        self.assertEqual(gatepass.student_gender, 'F')
+
+    def test_student_gender_follows_user_changes(self):
+        student = make_student(1, gender='M')
+        gatepass = make_gatepass(student)
+
+        student.user.gender = 'F'
+        student.user.save(update_fields=['gender'])
+        gatepass.refresh_from_db()
+        self.assertEqual(gatepass.student_gender, 'F')
+
+        student.user.gender = None
+        student.user.save()
+        self.assertFalse(GatePass.objects.filter(student_gender__isnull=False).exists())
+
+
+class StatusCountsTest(TestCase):
+
+    def test_all_buckets_in_one_query(self):
+        for index, status in enumerate(['pending', 'pending', 'returned', 'security_approved'], start=1):
+            make_gatepass(make_student(index), status=status)
+
+        with self.assertNumQueries(1):
+            counts = status_counts(GatePass.objects.all(), active=Q(status__in=['pending', 'security_approved']))
+
+        self.assertEqual(counts['total'], 4)
+        self.assertEqual(counts['pending'], 2)
+        self.assertEqual(counts['returned'], 1)
+        self.assertEqual(counts['warden_rejected'], 0)
+        self.assertEqual(counts['active'], 3)
+        self.assertEqual(status_counts(GatePass.objects.none())['total'], 0)
@@ -0,0 +1,349 @@
+from datetime import timedelta
+from time import monotonic
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import User, Warden, Notification, BroadcastNotification, BroadcastRead
+from .notifications import (
+    bell, inbox_page, live_token, mark_all_read, mark_read, notifications_for, notify_role, notify_student,
+    notify_status_change, read_watermark,
+)
+from .test_helpers import make_student, make_gatepass
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class NotificationFanOutTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.warden = User.objects.create_user(
+            username='warden', email='warden@example.com', password='x',
+            role='warden', gender='M', is_approved=True,
+        )
+        Warden.objects.create(user=self.warden, name='Warden')
+        self.student = make_student(1)
+        self.gatepass = make_gatepass(self.student, status='pending')
+
+    def add_guards(self, start, count):
+        for index in range(start, start + count):
+            User.objects.create_user(
+                username=f'guard{index}', email=f'guard{index}@example.com', password='x',
+                role='security', is_approved=True,
+            )
+
+    def messages_for(self, username):
+        return [n.message for n in notifications_for(User.objects.get(username=username))]
+
+    def test_role_notification_is_one_row_for_any_number_of_recipients(self):
+        self.add_guards(1, 30)
+        with self.assertNumQueries(1):
+            notify_role('security', self.gatepass, 'warden_approval', 'Approved')
+
+        self.assertEqual(BroadcastNotification.objects.count(), 1)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(self.messages_for('guard1'), ['Approved'])
+        self.assertEqual(self.messages_for('guard30'), ['Approved'])
+        self.assertEqual(self.messages_for('warden'), [])
+
+    def test_gender_broadcast_reaches_only_matching_wardens(self):
+        User.objects.create_user(
+            username='warden_f', email='warden_f@example.com', password='x', role='warden', gender='F'
+        )
+        notify_role('warden', self.gatepass, 'gatepass_request', 'New request', gender='M')
+
+        self.assertEqual(self.messages_for('warden'), ['New request'])
+        self.assertEqual(self.messages_for('warden_f'), [])
+
+    def test_personal_and_broadcast_merge_newest_first(self):
+        self.add_guards(1, 1)
+        guard = User.objects.get(username='guard1')
+        older = Notification.objects.create(
+            user=guard, gatepass=self.gatepass, notification_type='gatepass_request', message='Personal'
+        )
+        Notification.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        notify_role('security', self.gatepass, 'warden_approval', 'Broadcast')
+
+        with self.assertNumQueries(2):
+            merged = notifications_for(guard)
+        self.assertEqual([n.message for n in merged], ['Broadcast', 'Personal'])
+
+    def test_read_cursor(self):
+        self.add_guards(1, 1)
+        guard = User.objects.get(username='guard1')
+        notify_role('security', self.gatepass, 'warden_approval', 'First')
+
+        mark_all_read(guard)
+        notify_role('security', self.gatepass, 'warden_approval', 'Second')
+
+        self.assertEqual(
+            [(n.message, n.is_read) for n in notifications_for(guard)],
+            [('Second', False), ('First', True)],
+        )
+
+    def test_users_do_not_see_broadcasts_from_before_they_joined(self):
+        notify_role('security', self.gatepass, 'warden_approval', 'Old news')
+        BroadcastNotification.objects.update(created_at=timezone.now() - timedelta(days=1))
+        self.add_guards(1, 1)
+
+        self.assertEqual(self.messages_for('guard1'), [])
+
+    def test_warden_approval_notifies_every_guard_and_the_student(self):
+        self.add_guards(1, 5)
+        self.client.force_login(self.warden)
+
+        self.client.post(
+            f'/warden/gatepass/{self.gatepass.pk}/approve/', {'action': 'approve', 'parent_verification': 'on'}
+        )
+
+        self.assertEqual(self.messages_for('guard5'), ['Gatepass approved by warden for Student 1'])
+        self.assertEqual(
+            self.messages_for('student1'), ['Your gatepass request has been approved by the warden.']
+        )
+
+    def test_api_approvals_notify(self):
+        self.add_guards(1, 3)
+        client = APIClient()
+        client.force_authenticate(self.warden)
+
+        response = client.post(f'/api/gatepasses/{self.gatepass.pk}/warden-approve/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.messages_for('guard3')), 1)
+
+        client.force_authenticate(User.objects.get(username='guard1'))
+        client.post(f'/api/gatepasses/{self.gatepass.pk}/security-approve/')
+        self.assertTrue(Notification.objects.filter(
+            user=self.student.user, notification_type='security_approval'
+        ).exists())
+
+    def test_status_change_outside_views(self):
+        self.gatepass.status = 'returned'
+        self.gatepass.save()
+
+        notify_status_change(self.gatepass)
+
+        self.assertEqual(
+            list(Notification.objects.values_list('user__username', 'notification_type')),
+            [('student1', 'return_recorded')],
+        )
+
+
+class NotificationBellCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = make_student(1)
+        self.user = self.student.user
+        self.gatepass = make_gatepass(self.student, status='pending')
+
+    def test_bell_is_cached_until_a_notification_or_read(self):
+        self.assertEqual(bell(self.user)['unread'], 0)
+        with self.assertNumQueries(0):
+            bell(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_student(self.gatepass, 'warden_approval', 'Approved')
+            # Invalidated on commit, so the old entry is still served
+            self.assertEqual(bell(self.user)['unread'], 0)
+        self.assertEqual(bell(self.user)['unread'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_role('student', self.gatepass, 'warden_approval', 'To all students')
+        entry = bell(self.user)
+        self.assertEqual(entry['unread'], 2)
+        self.assertEqual(entry['latest'][0].message, 'To all students')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_all_read(self.user)
+        self.assertEqual(bell(self.user)['unread'], 0)
+        with self.assertNumQueries(0):
+            bell(self.user)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    LIVE_POLL_WAIT_SECONDS=0,
+    LIVE_STREAM_SECONDS=0,
+)
+class LiveUpdatesTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.guard = User.objects.create_user(
+            username='guard', email='guard@example.com', password='x', role='security', is_approved=True,
+        )
+        self.student = make_student(1)
+        self.gatepass = make_gatepass(self.student, status='warden_approved')
+        self.client.force_login(self.guard)
+        self.async_client.force_login(self.guard)
+
+    def test_token_follows_notifications_and_status_changes(self):
+        student_token, guard_token = live_token(self.student.user), live_token(self.guard)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_student(self.gatepass, 'warden_approval', 'Approved')
+        self.assertNotEqual(live_token(self.student.user), student_token)
+        self.assertEqual(live_token(self.guard), guard_token)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gatepass.status = 'security_approved'
+            self.gatepass.save()
+        self.assertNotEqual(live_token(self.guard), guard_token)
+
+    def test_poll_answers_only_when_the_token_is_stale(self):
+        response = self.client.get('/notifications/poll/')
+        self.assertEqual(response.status_code, 200)
+        token = response.json()['token']
+        self.assertEqual(self.client.get('/notifications/poll/', {'since': token}).status_code, 204)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_role('security', self.gatepass, 'warden_approval', 'Ready for exit')
+        data = self.client.get('/notifications/poll/', {'since': token}).json()
+
+        self.assertNotEqual(data['token'], token)
+        self.assertEqual(data['unread'], 1)
+        self.assertEqual(data['notifications'][0]['message'], 'Ready for exit')
+        self.assertEqual(data['counts']['warden_approved'], 1)
+        self.assertIn('Ready for exit', data['bell_html'])
+
+    @override_settings(LIVE_UPDATES_TRANSPORT='poll', LIVE_POLL_WAIT_SECONDS=25)
+    def test_plain_polling_never_waits(self):
+        token = self.client.get('/notifications/poll/').json()['token']
+        started = monotonic()
+        self.assertEqual(self.client.get('/notifications/poll/', {'since': token}).status_code, 204)
+        self.assertLess(monotonic() - started, 5)
+
+    def test_only_live_dashboards_start_updates(self):
+        self.assertContains(self.client.get('/security/dashboard/'), 'id="liveUpdates"')
+
+        self.client.force_login(self.student.user)
+        self.assertNotContains(self.client.get('/student/dashboard/'), 'id="liveUpdates"')
+
+    @override_settings(LIVE_STREAM_SECONDS=1)
+    async def test_stream_sends_an_update_event(self):
+        response = await self.async_client.get('/notifications/stream/', {'since': 'stale'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+        self.assertTrue(body.startswith('retry: 3000\n\nid: '))
+        self.assertIn('event: update\ndata: {"token": ', body)
+
+    def test_stream_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/notifications/stream/').status_code, 401)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class NotificationInboxTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.guard = User.objects.create_user(
+            username='guard', email='guard@example.com', password='x', role='security', is_approved=True,
+        )
+        self.student = make_student(1)
+        self.gatepass = make_gatepass(self.student, status='warden_approved')
+
+    def personal(self, message):
+        return Notification.objects.create(
+            user=self.guard, gatepass=self.gatepass, notification_type='gatepass_request', message=message
+        )
+
+    def broadcast(self, message):
+        return notify_role('security', self.gatepass, 'warden_approval', message)
+
+    def test_pages_merge_both_kinds_without_gaps(self):
+        for index in range(7):
+            (self.personal if index % 2 else self.broadcast)(f'n{index}')
+        # Same timestamp on every row: order falls back to kind, then id
+        now = timezone.now()
+        Notification.objects.update(created_at=now)
+        BroadcastNotification.objects.update(created_at=now)
+
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(2):
+                items, cursor = inbox_page(self.guard, cursor, size=3)
+            seen += [item.message for item in items]
+            if not cursor:
+                break
+        self.assertEqual(seen, ['n5', 'n3', 'n1', 'n6', 'n4', 'n2', 'n0'])
+
+    def test_mark_all_read_stops_at_the_watermark(self):
+        self.personal('old personal')
+        self.broadcast('old broadcast')
+        watermark = read_watermark(self.guard)
+        self.personal('new personal')
+        self.broadcast('new broadcast')
+
+        mark_all_read(self.guard, **watermark)
+
+        self.assertEqual(
+            [(n.message, n.is_read) for n in notifications_for(self.guard)],
+            [('new broadcast', False), ('new personal', False), ('old broadcast', True), ('old personal', True)],
+        )
+        self.assertEqual(bell(self.guard)['unread'], 2)
+
+    def test_single_reads(self):
+        note = self.personal('personal')
+        broadcast = self.broadcast('broadcast')
+        other = make_gatepass(make_student(2))
+        foreign = Notification.objects.create(
+            user=self.student.user, gatepass=other, notification_type='return_recorded', message='x'
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(mark_read(self.guard, 'broadcast', broadcast.pk))
+        self.assertEqual(bell(self.guard)['unread'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(mark_read(self.guard, 'notification', note.pk))
+        self.assertEqual(bell(self.guard)['unread'], 0)
+        self.assertFalse(mark_read(self.guard, 'notification', foreign.pk))
+        Notification.objects.get(pk=foreign.pk, is_read=False)
+
+        # The cursor passing a single read makes its row redundant
+        mark_all_read(self.guard)
+        self.assertFalse(BroadcastRead.objects.exists())
+        self.assertTrue(all(n.is_read for n in notifications_for(self.guard)))
+
+    def test_api(self):
+        self.personal('personal')
+        broadcast = self.broadcast('broadcast')
+        client = APIClient()
+        client.force_authenticate(self.guard)
+
+        data = client.get('/api/notifications/').json()
+        self.assertEqual([(n['kind'], n['message']) for n in data['results']],
+                         [('broadcast', 'broadcast'), ('notification', 'personal')])
+        self.assertEqual(data['unread'], 2)
+        self.assertIsNone(data['next_cursor'])
+
+        response = client.post(f'/api/notifications/broadcast/{broadcast.pk}/read/')
+        self.assertEqual(response.json(), {'unread': 1})
+        self.assertEqual(client.post('/api/notifications/notification/999/read/').status_code, 404)
+        self.assertEqual(client.get('/api/notifications/', {'cursor': 'bad'}).status_code, 400)
+
+        response = client.post('/api/notifications/read-all/', data['watermark'], format='json')
+        self.assertEqual(response.json(), {'unread': 0})
+
+    def test_inbox_page(self):
+        self.personal('personal')
+        self.client.force_login(self.guard)
+
+        response = self.client.get('/notifications/')
+        self.assertContains(response, 'personal')
+        self.assertContains(response, 'Mark all read')
+
+        watermark = response.context['watermark']
+        self.client.post('/notifications/read-all/', watermark)
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
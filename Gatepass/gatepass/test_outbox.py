@@ -0,0 +1,139 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import User, OutboxMessage
+from .outbox import RateLimit, claim, due_messages, email_batch_size, enqueue_email, retry_delay, send_due_messages
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP server unreachable')
+
+
+class CountingBackend(LocmemBackend):
+    """locmem backend that counts opened connections and refuses one address"""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, email_messages):
+        if any('refused@' in to for message in email_messages for to in message.to):
+            raise ValueError('Recipient refused')
+        return super().send_messages(email_messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    OUTBOX_MAX_ATTEMPTS=3,
+)
+class OutboxTest(TestCase):
+
+    def test_registration_queues_instead_of_sending(self):
+        response = self.client.post('/register/warden/', {
+            'username': 'newwarden', 'email': 'newwarden@example.com', 'mobile_number': '9876543210',
+            'gender': 'M', 'first_name': 'New', 'last_name': 'Warden',
+            'password1': 'Str0ng!12345', 'password2': 'Str0ng!12345',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(User.objects.filter(username='newwarden').exists())
+        self.assertEqual(mail.outbox, [])
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.recipient, message.status), ('newwarden@example.com', 'pending'))
+        self.assertIn('Password: Str0ng!12345', message.body)
+
+    def test_nothing_is_queued_for_a_rolled_back_transaction(self):
+        try:
+            with transaction.atomic():
+                enqueue_email('a@example.com', 'Subject', 'Body')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_worker_sends_and_clears_the_body(self):
+        enqueue_email('a@example.com', 'Subject', 'Secret body')
+
+        out = StringIO()
+        call_command('send_outbox', stdout=out)
+
+        self.assertIn('1 sent, 0 failed', out.getvalue())
+        self.assertEqual([(m.to, m.body) for m in mail.outbox], [(['a@example.com'], 'Secret body')])
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.body, message.attempts), ('sent', '', 1))
+        self.assertIsNotNone(message.sent_at)
+
+    @override_settings(EMAIL_BACKEND='gatepass.test_outbox.FailingBackend')
+    def test_retries_with_backoff_then_gives_up(self):
+        message = enqueue_email('a@example.com', 'Subject', 'Body')
+
+        self.assertEqual(send_due_messages(), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertIn('SMTP server unreachable', message.last_error)
+        self.assertGreater(message.next_attempt_at, timezone.now() + retry_delay(1) - timedelta(seconds=5))
+        # Not due again until the backoff has passed
+        self.assertEqual(send_due_messages(), (0, 0))
+
+        for _ in range(2):
+            OutboxMessage.objects.update(next_attempt_at=timezone.now())
+            send_due_messages()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.body), ('failed', 3, ''))
+        self.assertEqual(retry_delay(2), 2 * retry_delay(1))
+
+    def test_a_message_is_claimed_by_one_worker(self):
+        enqueue_email('a@example.com', 'Subject', 'Body')
+        first, second = due_messages()[0], due_messages()[0]
+
+        self.assertTrue(claim(first))
+        self.assertFalse(claim(second))
+        self.assertEqual(due_messages(), [])
+
+    @override_settings(EMAIL_BACKEND='gatepass.test_outbox.CountingBackend', OUTBOX_EMAIL_BATCH_SIZE=4)
+    def test_one_connection_per_batch(self):
+        CountingBackend.opened = 0
+        for index in range(10):
+            enqueue_email('refused@example.com' if index == 2 else f's{index}@example.com', 'Subject', 'Body')
+
+        self.assertEqual(send_due_messages(), (9, 1))
+
+        # Three batches of at most four, plus one reopen after the refused recipient
+        self.assertEqual(CountingBackend.opened, 4)
+        self.assertEqual(len(mail.outbox), 9)
+
+    @override_settings(OUTBOX_EMAIL_BATCH_SIZE=500, OUTBOX_EMAILS_PER_MINUTE=30, OUTBOX_LEASE_SECONDS=300)
+    def test_rate_cap(self):
+        # A batch must finish well inside the claim lease
+        self.assertEqual(email_batch_size(), 75)
+
+        limit = RateLimit(30)
+        with mock.patch('gatepass.outbox.time') as clock:
+            clock.monotonic.return_value = 100.0
+            limit.wait()
+            limit.wait()
+        clock.sleep.assert_called_once_with(2.0)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            'benchmark_outbox', '--messages', '6', '--batch-size', '1', '--batch-size', '3',
+            '--connect-delay', '0', stdout=out,
+        )
+
+        self.assertIn('batch size    1: 6 sent over 6 connection(s)', out.getvalue())
+        self.assertIn('batch size    3: 6 sent over 2 connection(s)', out.getvalue())
+        self.assertFalse(OutboxMessage.objects.exists())
@@ -0,0 +1,109 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import jobs
+from .models import User, Notification, JobRun
+from .overdue import OVERDUE_SCAN_JOB, overdue_gatepasses, scan_overdue_returns
+from .test_helpers import make_student, make_gatepass
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class OverdueScanTest(TestCase):
+
+    def setUp(self):
+        self.warden = User.objects.create_user(
+            username='warden', email='warden@example.com', password='x', role='warden', gender='M'
+        )
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', role='superadmin'
+        )
+
+    def test_scan_notifies_warden_admin_and_student_once_per_day(self):
+        student = make_student(1)
+        make_gatepass(student, warden_approval=self.warden)
+        make_gatepass(make_student(2), status='returned')
+
+        scan_overdue_returns()
+        scan_overdue_returns()
+
+        overdue = Notification.objects.filter(notification_type='overdue_return')
+        self.assertEqual(overdue.count(), 3)
+        self.assertEqual(
+            set(overdue.values_list('user__username', flat=True)),
+            {'warden', 'admin', 'student1'},
+        )
+
+    def test_job_runs_once_per_interval(self):
+        make_gatepass(make_student(1), warden_approval=self.warden)
+        interval = timedelta(minutes=15)
+
+        first = jobs.run_job(OVERDUE_SCAN_JOB, interval, scan_overdue_returns)
+        second = jobs.run_job(OVERDUE_SCAN_JOB, interval, scan_overdue_returns)
+
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        run = JobRun.objects.get(name=OVERDUE_SCAN_JOB)
+        self.assertEqual(run.last_status, 'success')
+        self.assertIsNotNone(run.last_finished_at)
+
+    def test_forced_run_does_not_overlap_a_running_one(self):
+        interval = timedelta(minutes=15)
+        self.assertTrue(jobs.claim_job(OVERDUE_SCAN_JOB, interval))
+
+        # Still running: even a forced run waits
+        self.assertFalse(jobs.claim_job(OVERDUE_SCAN_JOB, interval, force=True))
+        JobRun.objects.filter(name=OVERDUE_SCAN_JOB).update(last_status='success')
+        self.assertTrue(jobs.claim_job(OVERDUE_SCAN_JOB, interval, force=True))
+
+    def test_loop_survives_a_failed_pass(self):
+        with mock.patch('gatepass.jobs.claim_job', side_effect=[OperationalError('connection lost'), KeyboardInterrupt]), \
+                mock.patch('time.sleep'), self.assertLogs('gatepass.management.commands.scan_overdue_returns', 'ERROR'):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('scan_overdue_returns', '--loop', stdout=StringIO())
+
+    def test_dashboard_does_not_scan(self):
+        make_gatepass(make_student(1), warden_approval=self.warden)
+        self.admin.is_approved = True
+        self.admin.save()
+        self.client.force_login(self.admin)
+
+        response = self.client.get('/superadmin/dashboard/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['overdue_count'], 1)
+        self.assertFalse(Notification.objects.filter(notification_type='overdue_return').exists())
+
+    def test_scan_query_count_is_constant(self):
+        def late_students(start, count):
+            for index in range(start, start + count):
+                make_gatepass(make_student(index), warden_approval=self.warden)
+
+        late_students(1, 2)
+        with self.assertNumQueries(3):
+            scan_overdue_returns()
+
+        Notification.objects.all().delete()
+        late_students(3, 20)
+        with self.assertNumQueries(3):
+            scan_overdue_returns()
+        self.assertEqual(Notification.objects.count(), 22 * 3)
+
+    def test_due_earlier_today_is_overdue(self):
+        now = timezone.localtime()
+        late, on_time = now - timedelta(hours=1), now + timedelta(hours=1)
+        for index, due in ((1, late), (2, on_time)):
+            gatepass = make_gatepass(make_student(index), warden_approval=self.warden)
+            gatepass.expected_return_date = due.date()
+            gatepass.expected_return_time = due.time().replace(microsecond=0)
+            gatepass.save()
+
+        self.assertEqual(
+            list(overdue_gatepasses().values_list('student__user__username', flat=True)),
+            ['student1'],
+        )
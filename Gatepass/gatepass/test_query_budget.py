@@ -0,0 +1,152 @@
+"""
+Query-count budgets for every role's dashboard and approval pages.
+
+Each page is rendered against generated data, then again after the data has
+grown. The query count must stay the same (no N+1 over rows) and within the
+view's budget; a lazy load added to a template fails the build here.
+"""
+from itertools import count
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import User, Warden, Security, Notification
+from .test_helpers import make_student, make_gatepass
+
+# Maximum queries per page (session and user lookups included, notification
+# cache cold)
+BUDGETS = {
+    'student_dashboard': 9,
+    'warden_dashboard': 13,
+    'security_dashboard': 10,
+    'security_request_page': 3,
+    'superadmin_dashboard': 14,
+    'create_gatepass': 8,
+    'warden_approve_gatepass': 7,
+    'security_approve_gatepass': 7,
+    'security_record_return': 7,
+    'superadmin_approve_gatepass': 7,
+    'api_gatepass_list': 2,
+}
+
+STATUSES = ['pending', 'warden_approved', 'warden_rejected', 'security_approved', 'returned']
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class QueryBudgetTest(TestCase):
+
+    def setUp(self):
+        self.numbers = count(1)
+        self.admin = self.make_user('admin', 'superadmin')
+        self.warden = self.make_user('warden', 'warden', gender='M')
+        Warden.objects.create(user=self.warden, name='Warden')
+        self.guard = self.make_user('guard', 'security')
+        Security.objects.create(user=self.guard, name='Guard')
+        self.student = make_student(next(self.numbers))
+        self.gatepass = make_gatepass(self.student, status='warden_approved', warden_approval=self.warden)
+
+    def make_user(self, username, role, **extra):
+        return User.objects.create_user(
+            username=username, email=f'{username}@example.com', password='x',
+            role=role, is_approved=True, **extra
+        )
+
+    def grow(self, per_status):
+        """Add gatepasses in every status, notifications and pending users"""
+        for _ in range(per_status):
+            for status in STATUSES:
+                student = make_student(next(self.numbers), gender='M')
+                gatepass = make_gatepass(
+                    student, status=status, warden_approval=self.warden, security_approval=self.guard
+                )
+                for user in (self.admin, self.warden, self.guard, self.student.user):
+                    Notification.objects.create(
+                        user=user, gatepass=gatepass, notification_type='gatepass_request', message='New request'
+                    )
+            make_gatepass(self.student, status='returned')
+            pending = make_student(next(self.numbers), gender='F')
+            pending.user.is_approved = False
+            pending.user.save()
+
+    def count_queries(self, user, url):
+        # Cold notification cache: the worst case is what the budget covers
+        cache.clear()
+        if url.startswith('/api/'):
+            client = APIClient()
+            # A fresh instance, as token authentication would load per request
+            client.force_authenticate(User.objects.get(pk=user.pk))
+        else:
+            client = self.client
+            client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def assertBudget(self, name, user, url):
+        self.grow(2)
+        small = self.count_queries(user, url)
+        self.grow(6)
+        large = self.count_queries(user, url)
+        self.assertEqual(small, large, f"{name}: query count grows with data ({small} -> {large})")
+        self.assertLessEqual(large, BUDGETS[name], f"{name}: {large} queries, budget {BUDGETS[name]}")
+
+    def test_cached_bell_needs_no_notification_queries(self):
+        self.grow(1)
+        self.client.force_login(self.guard)
+        cache.clear()
+        self.client.get('/security/dashboard/')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/security/dashboard/')
+
+        self.assertFalse([q for q in queries.captured_queries if 'notification' in q['sql']])
+
+    def test_student_dashboard(self):
+        self.assertBudget('student_dashboard', self.student.user, '/student/dashboard/')
+
+    def test_warden_dashboard(self):
+        self.assertBudget('warden_dashboard', self.warden, '/warden/dashboard/')
+
+    def test_security_dashboard(self):
+        self.assertBudget('security_dashboard', self.guard, '/security/dashboard/')
+
+    def test_security_request_page(self):
+        self.assertBudget('security_request_page', self.guard, '/security/requests/returned/')
+
+    def test_superadmin_dashboard(self):
+        self.assertBudget('superadmin_dashboard', self.admin, '/superadmin/dashboard/')
+
+    def test_create_gatepass(self):
+        self.gatepass.status = 'returned'
+        self.gatepass.save()
+        self.assertBudget('create_gatepass', self.student.user, '/student/gatepass/create/')
+
+    def test_warden_approve_gatepass(self):
+        self.gatepass.status = 'pending'
+        self.gatepass.save()
+        self.assertBudget('warden_approve_gatepass', self.warden, f'/warden/gatepass/{self.gatepass.pk}/approve/')
+
+    def test_security_approve_gatepass(self):
+        self.assertBudget('security_approve_gatepass', self.guard, f'/security/gatepass/{self.gatepass.pk}/approve/')
+
+    def test_security_record_return(self):
+        self.gatepass.status = 'security_approved'
+        self.gatepass.save()
+        self.assertBudget('security_record_return', self.guard, f'/security/gatepass/{self.gatepass.pk}/return/')
+
+    def test_superadmin_approve_gatepass(self):
+        self.gatepass.status = 'pending'
+        self.gatepass.save()
+        self.assertBudget(
+            'superadmin_approve_gatepass', self.admin, f'/superadmin/gatepass/{self.gatepass.pk}/approve/'
+        )
+
+    def test_api_gatepass_list(self):
+        self.assertBudget('api_gatepass_list', self.warden, '/api/gatepasses/')
@@ -0,0 +1,98 @@
+"""
+Query plan checks for the hot gatepass and notification queries.
+
+Each query must be answered through an index rather than a full table scan,
+so the pages stay fast as the tables grow into hundreds of thousands of
+rows. Plans are read from SQLite's EXPLAIN QUERY PLAN; on PostgreSQL tiny
+test tables make the planner prefer sequential scans, so these tests only
+run on SQLite.
+"""
+import re
+import unittest
+
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import User, GatePass, Notification, ParentVerification, ACTIVE_GATEPASS_STATUSES
+from .notifications import broadcasts_for
+from .verification import expired_condition
+
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?gatepass_(gatepass|notification|broadcastnotification|parentverification)\b')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Plans are asserted against SQLite EXPLAIN output')
+class QueryPlanTest(TestCase):
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        plan = queryset.explain()
+        self.assertIsNone(FULL_SCAN.search(plan), f"Full table scan:\n{plan}")
+        self.assertRegex(plan, r'USING (COVERING )?INDEX')
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def test_dashboard_status_list(self):
+        self.assertUsesIndex(
+            GatePass.objects.filter(status='pending').order_by('-created_at'),
+            'gatepass_status_created_idx',
+        )
+
+    def test_warden_gender_list(self):
+        self.assertUsesIndex(
+            GatePass.objects.filter(student_gender='F', status='pending').order_by('-created_at'),
+            'gatepass_gender_status_idx',
+        )
+
+    def test_active_request_check(self):
+        self.assertUsesIndex(
+            GatePass.objects.filter(student_id=1, status__in=ACTIVE_GATEPASS_STATUSES),
+            'gatepass_student_status_idx',
+        )
+
+    def test_overdue_scan(self):
+        self.assertUsesIndex(
+            GatePass.objects.filter(status='security_approved', expected_return_at__lt=timezone.now())
+        )
+
+    def test_user_notifications(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(user_id=1).order_by('-created_at')[:12],
+            'notif_user_created_idx',
+        )
+
+    def test_unread_notifications(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(user_id=1, is_read=False, id__lte=100),
+            'notif_user_unread_idx',
+        )
+
+    def test_overdue_notification_lookup(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(
+                gatepass_id=1, notification_type='overdue_return', created_at__date=timezone.localdate()
+            ),
+            'notif_gp_type_created_idx',
+        )
+
+    def test_keyset_page(self):
+        created_at = timezone.now()
+        self.assertUsesIndex(
+            GatePass.objects.filter(status='returned')
+            .filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=10))
+            .order_by('-created_at', '-id')[:26],
+            'gatepass_status_created_idx',
+        )
+
+    def test_role_broadcasts(self):
+        guard = User(pk=1, role='security', gender='M', date_joined=timezone.now())
+        self.assertUsesIndex(
+            broadcasts_for(guard).order_by('-created_at')[:12],
+            'broadcast_role_created_idx',
+        )
+
+    def test_expired_verification_sweep(self):
+        self.assertUsesIndex(
+            ParentVerification.objects.filter(expired_condition()),
+            'parent_verif_expiry_idx',
+        )
@@ -0,0 +1,87 @@
+import gzip
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import User, Notification, BroadcastNotification, BroadcastRead
+from .notifications import notify_role
+from .retention import prune_notifications
+from .test_helpers import make_student, make_gatepass
+
+POLICY = {'default': 180, 'overdue_return': 30}
+
+
+@override_settings(NOTIFICATION_RETENTION_DAYS=POLICY)
+class PruneNotificationsTest(TestCase):
+
+    def setUp(self):
+        self.student = make_student(1)
+        self.gatepass = make_gatepass(self.student)
+        self.guard = User.objects.create_user(
+            username='guard', email='guard@example.com', password='x', role='security'
+        )
+
+    def notification(self, notification_type, days_old, message='x'):
+        note = Notification.objects.create(
+            user=self.student.user, gatepass=self.gatepass, notification_type=notification_type, message=message
+        )
+        Notification.objects.filter(pk=note.pk).update(created_at=timezone.now() - timedelta(days=days_old))
+        return note
+
+    def test_policy_by_type_and_age(self):
+        self.notification('overdue_return', 40, 'old overdue')
+        self.notification('overdue_return', 10, 'new overdue')
+        self.notification('return_recorded', 40, 'kept')
+        self.notification('return_recorded', 200, 'expired')
+        broadcast = notify_role('security', self.gatepass, 'warden_approval', 'old broadcast')
+        BroadcastRead.objects.create(user=self.guard, broadcast=broadcast)
+        BroadcastNotification.objects.update(created_at=timezone.now() - timedelta(days=200))
+
+        results = prune_notifications()
+
+        self.assertEqual([r.rows for r in results], [2, 1])
+        self.assertEqual(
+            sorted(Notification.objects.values_list('message', flat=True)), ['kept', 'new overdue']
+        )
+        self.assertFalse(BroadcastNotification.objects.exists())
+        self.assertFalse(BroadcastRead.objects.exists())
+
+    def test_bounded_batches_and_constant_queries(self):
+        for _ in range(5):
+            self.notification('overdue_return', 40)
+
+        # Per batch: select pks, savepoint, select recipients, delete, release;
+        # then the final empty select and the broadcast table's first select
+        with self.assertNumQueries(3 * 5 + 1 + 1):
+            results = prune_notifications(batch_size=2)
+
+        self.assertEqual((results[0].rows, results[0].batches), (5, 3))
+        self.assertFalse(Notification.objects.exists())
+
+    def test_archive_before_delete(self):
+        note = self.notification('overdue_return', 40, 'archived')
+
+        with tempfile.TemporaryDirectory() as directory:
+            results = prune_notifications(archive_dir=directory)
+            with gzip.open(results[0].archive_path, 'rt') as archive:
+                rows = [json.loads(line) for line in archive]
+
+        self.assertEqual([(row['id'], row['message']) for row in rows], [(note.pk, 'archived')])
+        self.assertFalse(Notification.objects.exists())
+
+    def test_command_dry_run_and_overrides(self):
+        self.notification('return_recorded', 40)
+        out = StringIO()
+
+        call_command('prune_notifications', '--dry-run', '--type', 'return_recorded=7', stdout=out)
+        self.assertIn('1 notification(s) past retention', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 1)
+
+        call_command('prune_notifications', '--days', '30', stdout=out)
+        self.assertIn('1 notification(s) pruned.', out.getvalue())
+        self.assertFalse(Notification.objects.exists())
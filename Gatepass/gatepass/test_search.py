@@ -0,0 +1,69 @@
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+
+from .models import GatePass
+from .search import FTS_TABLE, ensure_search_index, search_gatepasses
+from .test_helpers import make_student, make_gatepass
+
+
+class SearchTest(TestCase):
+
+    def setUp(self):
+        self.alice = make_student(1)
+        self.alice.student_name = 'Alice Sharma'
+        self.alice.room_no = 'B-204'
+        self.alice.save()
+        self.bob = make_student(2)
+        self.alice_pass = make_gatepass(self.alice, status='pending')
+        self.bob_pass = make_gatepass(self.bob, status='pending', purpose='Dentist appointment')
+
+    def search(self, query):
+        return set(search_gatepasses(GatePass.objects.all(), query).values_list('pk', flat=True))
+
+    def test_matches_each_field_case_insensitively(self):
+        self.assertEqual(self.search('SHARMA'), {self.alice_pass.pk})
+        self.assertEqual(self.search(self.bob.hall_ticket_no[-5:]), {self.bob_pass.pk})
+        self.assertEqual(self.search('b-20'), {self.alice_pass.pk})
+        self.assertEqual(self.search('dentist'), {self.bob_pass.pk})
+        self.assertEqual(self.search('nobody'), set())
+        self.assertEqual(self.search(''), {self.alice_pass.pk, self.bob_pass.pk})
+
+    def test_short_query_falls_back_to_substring(self):
+        self.assertEqual(self.search('al'), {self.alice_pass.pk})
+
+    def test_does_not_match_across_fields(self):
+        # Room number followed by purpose must not be treated as one string
+        self.assertEqual(self.search('b-204 home'), set())
+
+    def test_index_follows_student_and_purpose_changes(self):
+        self.alice.student_name = 'Alicia Verma'
+        self.alice.save()
+        self.bob_pass.purpose = 'Medical checkup'
+        self.bob_pass.save()
+
+        self.assertEqual(self.search('verma'), {self.alice_pass.pk})
+        self.assertEqual(self.search('sharma'), set())
+        self.assertEqual(self.search('medical'), {self.bob_pass.pk})
+        self.assertEqual(self.search('dentist'), set())
+
+        self.bob_pass.delete()
+        self.assertEqual(self.search('medical'), set())
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 triggers only exist on SQLite')
+    def test_missing_triggers_are_recreated_and_index_rebuilt(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER gatepass_search_au')
+        GatePass.objects.filter(pk=self.bob_pass.pk).update(search_text='renamed')
+
+        self.assertTrue(ensure_search_index())
+
+        self.assertEqual(self.search('renamed'), {self.bob_pass.pk})
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'Plans are asserted against SQLite EXPLAIN output')
+    def test_search_uses_fts_index(self):
+        plan = search_gatepasses(GatePass.objects.filter(status='pending'), 'sharma').explain()
+        self.assertIn(FTS_TABLE, plan)
+        self.assertIn('VIRTUAL TABLE', plan)
+        self.assertNotRegex(plan, r'\bSCAN (TABLE )?gatepass_gatepass\b')
@@ -0,0 +1,65 @@
+from django.test import TestCase, override_settings
+
+from .models import User, GatePass
+from .pagination import keyset_page
+from .test_helpers import make_student, make_gatepass
+from .views import SECURITY_PAGE_SIZE
+
+
+class KeysetPageTest(TestCase):
+
+    def test_pages_cover_every_row_once_with_tied_timestamps(self):
+        for index in range(1, 8):
+            make_gatepass(make_student(index), status='returned')
+        # Equal created_at values must still page strictly by id
+        GatePass.objects.update(created_at=GatePass.objects.first().created_at)
+
+        seen, cursor = [], None
+        while True:
+            items, cursor = keyset_page(GatePass.objects.all(), cursor, size=3)
+            seen.extend(gp.pk for gp in items)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, sorted(GatePass.objects.values_list('pk', flat=True), reverse=True))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            keyset_page(GatePass.objects.all(), 'not-a-cursor')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class SecurityDashboardPaginationTest(TestCase):
+
+    def setUp(self):
+        self.guard = User.objects.create_user(
+            username='guard', email='guard@example.com', password='x', role='security', is_approved=True
+        )
+        self.client.force_login(self.guard)
+
+    def test_dashboard_renders_first_page_and_defers_history(self):
+        for index in range(1, SECURITY_PAGE_SIZE + 3):
+            make_gatepass(make_student(index), status='warden_approved')
+        make_gatepass(make_student(100), status='returned')
+
+        response = self.client.get('/security/dashboard/')
+
+        self.assertEqual(len(response.context['approved_requests']), SECURITY_PAGE_SIZE)
+        self.assertIsNotNone(response.context['approved_next_url'])
+        self.assertIsNone(response.context['security_approved_next_url'])
+        self.assertNotIn('returned_requests', response.context)
+        self.assertEqual(response.context['total_pending'], SECURITY_PAGE_SIZE + 2)
+
+        more = self.client.get(response.context['approved_next_url']).json()
+        self.assertEqual(more['count'], 2)
+        self.assertIsNone(more['next_url'])
+
+    def test_load_more_endpoint(self):
+        make_gatepass(make_student(1), status='returned')
+
+        data = self.client.get('/security/requests/returned/').json()
+
+        self.assertEqual(data['count'], 1)
+        self.assertIn('Student 1', data['rows'])
+        self.assertEqual(self.client.get('/security/requests/returned/?cursor=bad').status_code, 400)
+        self.assertEqual(self.client.get('/security/requests/other/').status_code, 404)
@@ -0,0 +1,220 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import OutboxMessage, ParentVerification
+from .outbox import send_due_messages
+from .test_helpers import make_student, make_gatepass
+from .verification import issue_code
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    SMS_PROVIDER='gatepass.sms.FileSMSProvider',
+    PARENT_VERIFICATION_TTL_MINUTES=60,
+    PARENT_VERIFICATION_PURGE_AFTER_DAYS=7,
+    OUTBOX_MAX_ATTEMPTS=3,
+)
+class ParentVerificationTest(TestCase):
+
+    def setUp(self):
+        self.student = make_student(1)
+        self.gatepass = make_gatepass(self.student, status='pending', days_ago=-2)
+
+    def test_issued_code_is_queued_for_the_parent(self):
+        verification = issue_code(self.gatepass, self.student)
+
+        self.assertRegex(verification.verification_code, r'^\d{6}$')
+        self.assertAlmostEqual(
+            verification.expires_at, timezone.now() + timedelta(minutes=60), delta=timedelta(seconds=5)
+        )
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.channel, message.recipient), ('sms', self.student.parent_mobile))
+        self.assertIn(verification.verification_code, message.body)
+
+    def test_outbox_delivers_text_messages_through_the_provider(self):
+        verification = issue_code(self.gatepass, self.student)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sms.jsonl')
+            with self.settings(SMS_FILE_PATH=path):
+                self.assertEqual(send_due_messages(), (1, 0))
+            with open(path, encoding='utf-8') as f:
+                sent = [json.loads(line) for line in f]
+
+        self.assertEqual(sent[0]['to'], self.student.parent_mobile)
+        self.assertIn(verification.verification_code, sent[0]['text'])
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.body), ('sent', ''))
+
+    def test_provider_failure_is_retried(self):
+        issue_code(self.gatepass, self.student)
+        with mock.patch('gatepass.sms.FileSMSProvider.send', side_effect=ConnectionError('gateway down')):
+            self.assertEqual(send_due_messages(), (0, 1))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertIn('gateway down', message.last_error)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+
+    def test_wrong_code_is_rejected(self):
+        verification = issue_code(self.gatepass, self.student)
+        wrong = '000000' if verification.verification_code != '000000' else '111111'
+
+        response = self.client.post(f'/parent/verify/{self.gatepass.pk}/', {'verification_code': wrong})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Invalid verification code.')
+        self.assertFalse(ParentVerification.objects.get().is_verified)
+
+    def test_correct_code_verifies(self):
+        verification = issue_code(self.gatepass, self.student)
+
+        response = self.client.post(
+            f'/parent/verify/{self.gatepass.pk}/', {'verification_code': verification.verification_code}
+        )
+
+        self.assertEqual(response.status_code, 302)
+        verification.refresh_from_db()
+        self.assertTrue(verification.is_verified)
+        self.assertIsNotNone(verification.verified_at)
+
+    def test_expired_code_is_rejected(self):
+        verification = issue_code(self.gatepass, self.student)
+        ParentVerification.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        response = self.client.post(
+            f'/parent/verify/{self.gatepass.pk}/', {'verification_code': verification.verification_code}
+        )
+
+        self.assertContains(response, 'This verification code has expired.')
+        self.assertFalse(ParentVerification.objects.get().is_verified)
+
+    def test_expired_code_is_reissued(self):
+        verification = issue_code(self.gatepass, self.student)
+        ParentVerification.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        response = self.client.post(
+            f'/parent/verify/{self.gatepass.pk}/', {'verification_code': verification.verification_code}
+        )
+
+        self.assertContains(response, 'A new code has been sent')
+        reissued = ParentVerification.objects.get()
+        self.assertGreater(reissued.expires_at, timezone.now())
+        message = OutboxMessage.objects.order_by('pk').last()
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+        self.assertIn(reissued.verification_code, message.body)
+
+        response = self.client.post(
+            f'/parent/verify/{self.gatepass.pk}/', {'verification_code': reissued.verification_code}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(ParentVerification.objects.get().is_verified)
+
+    def test_resend_only_replaces_an_expired_code(self):
+        verification = issue_code(self.gatepass, self.student)
+
+        self.client.post(f'/parent/verify/{self.gatepass.pk}/', {'action': 'resend'})
+        self.assertEqual(ParentVerification.objects.get().verification_code, verification.verification_code)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+        ParentVerification.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertContains(self.client.get(f'/parent/verify/{self.gatepass.pk}/'), 'Send a New Code')
+        response = self.client.post(f'/parent/verify/{self.gatepass.pk}/', {'action': 'resend'})
+
+        self.assertRedirects(response, f'/parent/verify/{self.gatepass.pk}/', fetch_redirect_response=False)
+        self.assertGreater(ParentVerification.objects.get().expires_at, timezone.now())
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_codes_are_only_reissued_for_pending_gatepasses(self):
+        verification = issue_code(make_gatepass(self.student, status='returned'), self.student)
+        ParentVerification.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        url = f'/parent/verify/{verification.gatepass_id}/'
+
+        self.assertNotContains(self.client.get(url), 'Send a New Code')
+        response = self.client.post(url, {'action': 'resend'}, follow=True)
+        self.assertContains(response, 'no longer awaiting parent verification')
+        self.client.post(url, {'verification_code': verification.verification_code})
+
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        self.assertEqual(ParentVerification.objects.get().verification_code, verification.verification_code)
+
+    @override_settings(PARENT_VERIFICATION_MAX_REISSUES=1)
+    def test_reissues_are_capped(self):
+        issue_code(self.gatepass, self.student)
+        url = f'/parent/verify/{self.gatepass.pk}/'
+        for _ in range(2):
+            ParentVerification.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+            response = self.client.post(url, {'action': 'resend'}, follow=True)
+
+        self.assertContains(response, 'No more codes can be sent')
+        self.assertNotContains(response, 'Send a New Code')
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+        self.assertEqual(ParentVerification.objects.get().reissues, 1)
+
+    @override_settings(PARENT_VERIFICATION_MAX_ATTEMPTS=2)
+    def test_code_is_locked_after_too_many_attempts(self):
+        verification = issue_code(self.gatepass, self.student)
+        wrong = '000000' if verification.verification_code != '000000' else '111111'
+        url = f'/parent/verify/{self.gatepass.pk}/'
+
+        for _ in range(2):
+            self.assertContains(self.client.post(url, {'verification_code': wrong}), 'Invalid verification code.')
+        response = self.client.post(url, {'verification_code': verification.verification_code})
+
+        self.assertContains(response, 'Too many incorrect codes')
+        self.assertFalse(ParentVerification.objects.get().is_verified)
+
+        # A reissued code starts with fresh attempts
+        ParentVerification.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.client.post(url, {'action': 'resend'})
+        reissued = ParentVerification.objects.get()
+        self.assertEqual(reissued.attempts, 0)
+        self.assertEqual(self.client.post(url, {'verification_code': reissued.verification_code}).status_code, 302)
+
+    @override_settings(
+        SMS_PROVIDER='gatepass.sms.HTTPSMSProvider', SMS_GATEWAY_URL='https://sms.example.com/send',
+        SMS_GATEWAY_TOKEN='secret',
+    )
+    def test_http_provider_posts_to_the_gateway(self):
+        issue_code(self.gatepass, self.student)
+        with mock.patch('gatepass.sms.urllib.request.urlopen') as urlopen:
+            self.assertEqual(send_due_messages(), (1, 0))
+
+        request = urlopen.call_args.args[0]
+        self.assertEqual((request.full_url, request.get_method()), ('https://sms.example.com/send', 'POST'))
+        self.assertEqual(request.get_header('Authorization'), 'Bearer secret')
+        self.assertEqual(json.loads(request.data)['to'], self.student.parent_mobile)
+
+    def test_page_does_not_show_the_code(self):
+        verification = issue_code(self.gatepass, self.student)
+
+        response = self.client.get(f'/parent/verify/{self.gatepass.pk}/')
+
+        self.assertContains(response, self.student.parent_mobile)
+        self.assertNotContains(response, verification.verification_code)
+
+    def test_purge_removes_only_long_expired_unverified_codes(self):
+        long_ago = timezone.now() - timedelta(days=8)
+        old = issue_code(self.gatepass, self.student)
+        recent = issue_code(make_gatepass(self.student, status='rejected'), self.student)
+        verified = issue_code(make_gatepass(self.student, status='returned'), self.student)
+        ParentVerification.objects.filter(pk__in=[old.pk, verified.pk]).update(expires_at=long_ago)
+        ParentVerification.objects.filter(pk=recent.pk).update(expires_at=timezone.now() - timedelta(days=1))
+        ParentVerification.objects.filter(pk=verified.pk).update(is_verified=True)
+
+        out = StringIO()
+        call_command('purge_parent_verifications', '--dry-run', stdout=out)
+        self.assertIn('1 expired verification code(s) would be removed', out.getvalue())
+        self.assertEqual(ParentVerification.objects.count(), 3)
+
+        call_command('purge_parent_verifications', '--batch-size', '1', stdout=StringIO())
+        self.assertQuerySetEqual(
+            ParentVerification.objects.order_by('pk').values_list('pk', flat=True), [recent.pk, verified.pk]
+        )
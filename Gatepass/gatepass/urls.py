@@ -26,10 +26,17 @@ urlpatterns = [
     path('superadmin/dashboard/', views.superadmin_dashboard, name='superadmin_dashboard'),
     path('export/students/', views.export_students_excel, name='export_students_excel'),
     path('export/outings/', views.export_outings_excel, name='export_outings_excel'),
+    path('export/jobs/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('export/jobs/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
+    path('export/outings.csv', views.export_outings_flat, {'fmt': 'csv'}, name='export_outings_csv'),
+    path('export/outings.jsonl', views.export_outings_flat, {'fmt': 'jsonl'}, name='export_outings_jsonl'),
+    path('export/students.csv', views.export_students_flat, {'fmt': 'csv'}, name='export_students_csv'),
+    path('export/students.jsonl', views.export_students_flat, {'fmt': 'jsonl'}, name='export_students_jsonl'),
     
     # Gatepass URLs
     path('student/gatepass/create/', views.create_gatepass, name='create_gatepass'),
     path('warden/gatepass/<int:gatepass_id>/approve/', views.warden_approve_gatepass, name='warden_approve_gatepass'),
+    path('security/requests/<str:tab>/', views.security_request_page, name='security_request_page'),
     path('security/gatepass/<int:gatepass_id>/approve/', views.security_approve_gatepass, name='security_approve_gatepass'),
     path('security/gatepass/<int:gatepass_id>/return/', views.security_record_return, name='security_record_return'),
     
@@ -40,6 +47,15 @@ urlpatterns = [
     # Super Admin Gatepass URLs
     path('superadmin/gatepass/<int:gatepass_id>/approve/', views.superadmin_approve_gatepass, name='superadmin_approve_gatepass'),
     
+    # Notification inbox
+    path('notifications/', views.notification_inbox, name='notification_inbox'),
+    path('notifications/read-all/', views.notification_mark_all_read, name='notification_mark_all_read'),
+    path('notifications/<str:kind>/<int:pk>/read/', views.notification_mark_read, name='notification_mark_read'),
+
+    # Live updates (bell and dashboard counts)
+    path('notifications/poll/', views.notifications_poll, name='notifications_poll'),
+    path('notifications/stream/', views.notifications_stream, name='notifications_stream'),
+    
     # Parent Verification
     path('parent/verify/<int:gatepass_id>/', views.parent_verification, name='parent_verification'),
     
@@ -54,6 +70,10 @@ from . import api_views
 urlpatterns += [
     path('api/login/', api_views.LoginAPIView.as_view(), name='api_login'),
     path('api/gatepasses/', api_views.GatePassListCreateAPIView.as_view(), name='api_gatepass_list_create'),
+    path('api/gatepasses/stats/', api_views.GatePassStatsAPIView.as_view(), name='api_gatepass_stats'),
     path('api/gatepasses/<int:pk>/warden-approve/', api_views.WardenApproveAPIView.as_view(), name='api_warden_approve'),
     path('api/gatepasses/<int:pk>/security-approve/', api_views.SecurityApproveAPIView.as_view(), name='api_security_approve'),
+    path('api/notifications/', api_views.NotificationInboxAPIView.as_view(), name='api_notification_inbox'),
+    path('api/notifications/read-all/', api_views.NotificationReadAllAPIView.as_view(), name='api_notification_read_all'),
+    path('api/notifications/<str:kind>/<int:pk>/read/', api_views.NotificationReadAPIView.as_view(), name='api_notification_read'),
 ]
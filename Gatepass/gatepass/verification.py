@@ -0,0 +1,134 @@
+"""
+Parent verification codes.
+
+A code is issued together with its gatepass and queued for the parent on
+the outbox's 'sms' channel, so requests never wait for the SMS gateway.
+Codes expire after PARENT_VERIFICATION_TTL_MINUTES and can then be
+reissued from the verification page, a limited number of times and only
+while the gatepass is pending. The page needs no login, so each code also
+accepts only PARENT_VERIFICATION_MAX_ATTEMPTS submissions. Expired,
+unverified rows are removed by ``purge_parent_verifications``.
+"""
+import string
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, get_random_string
+
+from .models import ParentVerification
+from .outbox import enqueue_sms
+from .retention import prune_table
+
+
+def _new_code():
+    return get_random_string(6, allowed_chars=string.digits)
+
+
+def _expiry(now):
+    return now + timedelta(minutes=settings.PARENT_VERIFICATION_TTL_MINUTES)
+
+
+def _send_code(gatepass, student, mobile, code):
+    enqueue_sms(
+        mobile,
+        f"{student.student_name} has requested a hostel gatepass for {gatepass.outing_date}. "
+        f"Verification code: {code}. "
+        f"Valid for {settings.PARENT_VERIFICATION_TTL_MINUTES} minutes.",
+    )
+
+
+def issue_code(gatepass, student):
+    """Create the gatepass's verification code and queue it for the parent (call inside the gatepass transaction)"""
+    verification = ParentVerification.objects.create(
+        gatepass=gatepass,
+        parent_mobile=student.parent_mobile,
+        verification_code=_new_code(),
+        expires_at=_expiry(timezone.now()),
+    )
+    _send_code(gatepass, student, verification.parent_mobile, verification.verification_code)
+    return verification
+
+
+def reissue_refusal(verification):
+    """Why ``reissue_code`` would not replace this code right now, or None if it would"""
+    if verification.is_verified:
+        return 'This gatepass has already been verified.'
+    if verification.gatepass.status != 'pending':
+        return 'This gatepass is no longer awaiting parent verification.'
+    if verification.expires_at > timezone.now():
+        return 'The current verification code is still valid.'
+    if verification.reissues >= settings.PARENT_VERIFICATION_MAX_REISSUES:
+        return 'No more codes can be sent for this gatepass.'
+    return None
+
+
+def reissue_code(verification):
+    """
+    Replace an expired, unverified code of a pending gatepass with a new one
+    and queue it for the parent. Returns False, changing nothing, in any case
+    ``reissue_refusal`` describes or when another request reissued it first.
+    """
+    now = timezone.now()
+    code, expires_at = _new_code(), _expiry(now)
+    with transaction.atomic():
+        replaced = ParentVerification.objects.filter(
+            pk=verification.pk, is_verified=False, expires_at__lte=now, gatepass__status='pending',
+            reissues__lt=settings.PARENT_VERIFICATION_MAX_REISSUES,
+        ).update(verification_code=code, expires_at=expires_at, attempts=0, reissues=F('reissues') + 1)
+        if not replaced:
+            return False
+        gatepass = verification.gatepass
+        _send_code(gatepass, gatepass.student, verification.parent_mobile, code)
+    verification.verification_code, verification.expires_at = code, expires_at
+    verification.attempts, verification.reissues = 0, verification.reissues + 1
+    return True
+
+
+def check_code(verification, code):
+    """
+    Compare a submitted code with the stored one.
+
+    Returns 'verified', 'expired', 'locked' (no attempts left) or 'invalid';
+    marks the row verified on success. Each comparison first claims one of
+    the code's attempts with a conditional UPDATE, so concurrent guesses
+    cannot exceed PARENT_VERIFICATION_MAX_ATTEMPTS.
+    """
+    if verification.is_verified:
+        return 'verified'
+    if verification.expires_at <= timezone.now():
+        return 'expired'
+    claimed = ParentVerification.objects.filter(
+        pk=verification.pk, is_verified=False, attempts__lt=settings.PARENT_VERIFICATION_MAX_ATTEMPTS
+    ).update(attempts=F('attempts') + 1)
+    if not claimed:
+        return 'locked'
+    if not constant_time_compare(code, verification.verification_code):
+        return 'invalid'
+    verification.is_verified = True
+    verification.verified_at = timezone.now()
+    verification.save(update_fields=['is_verified', 'verified_at'])
+    return 'verified'
+
+
+def expired_condition(grace=timedelta(0)):
+    """Q for unverified codes that expired more than ``grace`` ago"""
+    return Q(is_verified=False, expires_at__lt=timezone.now() - grace)
+
+
+def _delete_verifications(pks):
+    # Nothing references ParentVerification, so this is a single DELETE
+    ParentVerification.objects.filter(pk__in=pks).delete()
+
+
+def purge_expired(grace=None, **options):
+    """
+    Delete unverified codes expired for longer than ``grace`` (default
+    PARENT_VERIFICATION_PURGE_AFTER_DAYS) in primary-key batches; ``options``
+    go to ``retention.prune_table``. Returns a PruneResult.
+    """
+    if grace is None:
+        grace = timedelta(days=settings.PARENT_VERIFICATION_PURGE_AFTER_DAYS)
+    return prune_table(ParentVerification, _delete_verifications, expired_condition(grace), **options)
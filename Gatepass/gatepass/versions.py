@@ -0,0 +1,49 @@
+"""
+Cache version stamps.
+
+A version is an integer kept in the cache and bumped whenever the data it
+stands for changes. Readers compare the versions they saw last with the
+current ones to tell whether anything changed without touching the
+database; the notification bell cache, the live update stream and the
+export cache all work this way.
+"""
+import time
+
+from django.core.cache import cache
+
+# Bumped after every committed gatepass insert, status change and delete
+GATEPASS_STATUS_VERSION = 'gatepass:v:status'
+
+# Bumped after every committed write to the rows exports are built from
+EXPORT_DATA_VERSION = 'export:v:data'
+
+
+def _initial():
+    # Counting starts from the clock rather than 0, so a version lost with
+    # the cache (restart, eviction) never comes back with old data behind it
+    return time.time_ns()
+
+
+def bump(key):
+    """Increment the version stored under ``key``"""
+    cache.add(key, _initial(), timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); any new value invalidates
+        cache.set(key, _initial(), timeout=None)
+
+
+def stamp(key):
+    """Current version of ``key``, starting one if there is none"""
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _initial(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def current(keys):
+    """Current versions of ``keys`` (0 when never bumped), in order"""
+    values = cache.get_many(keys)
+    return [values.get(key, 0) for key in keys]
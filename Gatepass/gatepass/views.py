@@ -1,25 +1,43 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
 from django.utils import timezone
 from django.db import transaction, IntegrityError
-from django.db.models import Count, Q
-from django.db.models.functions import TruncMonth
+from django.db.models import Q
 from django.contrib.auth.views import LoginView
-from django.core.mail import send_mail
 from django.conf import settings
-import random
-import string
+from asgiref.sync import sync_to_async
+import asyncio
+import json
 import logging
-from datetime import datetime, date, time
-import openpyxl
-from openpyxl.utils import get_column_letter
+from datetime import time
+from time import monotonic, sleep
+from urllib.parse import urlencode
 
 logger = logging.getLogger(__name__)
-from .models import User, Student, Warden, Security, GatePass, ParentVerification, Notification
+from .models import User, Student, Warden, Security, GatePass, ParentVerification, Notification, ExportJob, ACTIVE_GATEPASS_STATUSES, normalize_gender
+from .overdue import overdue_gatepasses, last_overdue_scan
+from .stats import status_counts, role_counts
+from .counters import counted_status_counts, counted_student_status_counts, daily_outing_trends
+from .pagination import keyset_page
+from .exports import (
+    OUTING_HEADERS, OUTING_KEYS, STUDENT_HEADERS, STUDENT_KEYS,
+    filter_outing_window, flat_response, outing_params, outing_rows, outings_filename, outings_queryset,
+    student_rows,
+)
+from .export_jobs import artifact_response, build_unclaimed, request_export
+from .outbox import enqueue_email
+from .verification import issue_code, check_code, reissue_code, reissue_refusal
+from .search import search_gatepasses
+from .notifications import (
+    notify_role, notify_student, live_token, live_update, inbox_page, read_watermark, mark_read, mark_all_read,
+)
 
 
 # Session key and cookie name used by Django's LocaleMiddleware
@@ -27,6 +45,12 @@ LANGUAGE_SESSION_KEY = 'django_language'
 LANGUAGE_COOKIE_NAME = getattr(settings, 'LANGUAGE_COOKIE_NAME', 'django_language')
 
 
+# Gatepass with the related rows the approval and return pages display
+GATEPASS_DETAIL = GatePass.objects.select_related(
+    'student', 'student__user', 'warden_approval', 'security_approval'
+)
+
+
 def set_language_view(request):
     """Set user language (session + cookie) and redirect. Accepts GET or POST so links work without JavaScript."""
     if request.method == 'POST':
@@ -59,54 +83,27 @@ from .forms import (
 )
 
 
-def _send_registration_email(to_email, username, raw_password, role_label):
-    """Send credentials to the registered user's email. Fails silently if email is not configured."""
-    import logging
-    logger = logging.getLogger(__name__)
-    
+def _queue_registration_email(to_email, username, raw_password, role_label):
+    """
+    Queue the credentials email for a newly registered user.
+
+    Call inside the registration transaction: the message is written to the
+    outbox and sent by the ``send_outbox`` worker, so registration never
+    waits for the mail server and nothing is sent if registration fails.
+    """
     if not to_email:
-        logger.warning("Registration email not sent: No email address provided")
+        logger.warning("Registration email not queued: No email address provided")
         return
-    
-    try:
-        # Check if email is properly configured
-        email_backend = getattr(settings, "EMAIL_BACKEND", "")
-        email_host_user = getattr(settings, "EMAIL_HOST_USER", "")
-        email_host_password = getattr(settings, "EMAIL_HOST_PASSWORD", "")
-        
-        # Log email configuration status
-        if "console" in email_backend.lower():
-            logger.info(f"Registration email (console mode - not sent): {to_email} | Username: {username}")
-            return
-        elif not email_host_user or not email_host_password:
-            logger.warning(
-                f"Registration email not sent: SMTP credentials not configured. "
-                f"EMAIL_HOST_USER: {'SET' if email_host_user else 'NOT SET'}, "
-                f"EMAIL_HOST_PASSWORD: {'SET' if email_host_password else 'NOT SET'}"
-            )
-            return
-        
-        subject = "Gatepass Account Details"
-        message = (
-            f"Your {role_label} account has been registered.\n\n"
-            f"Username: {username}\n"
-            f"Password: {raw_password}\n"
-            f"Email: {to_email}\n\n"
-            "Please keep these credentials safe."
-        )
-        from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@gatepass.local")
-        
-        # Send email with fail_silently=True to prevent blocking if email fails
-        # EMAIL_TIMEOUT is set in settings to prevent hanging connections
-        result = send_mail(subject, message, from_email, [to_email], fail_silently=True)
-        if result:
-            logger.info(f"Registration email sent successfully to {to_email}")
-        else:
-            logger.error(f"Registration email failed to send to {to_email} (send_mail returned 0)")
-    except Exception as e:
-        # Log error but don't crash the registration process
-        logger.error(f"Failed to send registration email to {to_email}: {str(e)}", exc_info=True)
-        # Registration continues even if email fails
+
+    subject = "Gatepass Account Details"
+    message = (
+        f"Your {role_label} account has been registered.\n\n"
+        f"Username: {username}\n"
+        f"Password: {raw_password}\n"
+        f"Email: {to_email}\n\n"
+        "Please keep these credentials safe."
+    )
+    enqueue_email(to_email, subject, message)
 
 
 def home(request):
@@ -238,7 +235,7 @@ def register(request):
                         student = form.save(commit=False)
                         student.user = user
                         student.save()
-                        _send_registration_email(user.email, username, raw_password, "student")
+                        _queue_registration_email(user.email, username, raw_password, "student")
                         messages.success(request, f"Registration successful! Your username is {username}. Please wait for admin approval before logging in.")
                         return redirect('login')
                 except IntegrityError as e:
@@ -274,7 +271,7 @@ def register(request):
                             name=f"{data['first_name']} {data['last_name']}",
                             department=data.get('department', '')
                         )
-                        _send_registration_email(user.email, user.username, raw_password, "warden")
+                        _queue_registration_email(user.email, user.username, raw_password, "warden")
                         messages.success(request, 'Registration successful! Please wait for admin approval.')
                         return redirect('login')
                 except IntegrityError as e:
@@ -314,7 +311,7 @@ def register(request):
                             name=f"{data['first_name']} {data['last_name']}",
                             shift=data.get('shift', '')
                         )
-                        _send_registration_email(user.email, user.username, raw_password, "security")
+                        _queue_registration_email(user.email, user.username, raw_password, "security")
                         messages.success(request, 'Registration successful! Please wait for admin approval.')
                         return redirect('login')
                 except IntegrityError as e:
@@ -374,7 +371,7 @@ def register_student(request):
                 student.user = user
                 student.save()
                 
-                _send_registration_email(user.email, username, raw_password, "student")
+                _queue_registration_email(user.email, username, raw_password, "student")
                 
                 messages.success(request, 'Registration successful! Please wait for admin approval.')
                 return redirect('login')
@@ -412,7 +409,7 @@ def register_warden(request):
                     department=warden_data.get('department', '')
                 )
                 
-                _send_registration_email(user.email, user.username, raw_password, "warden")
+                _queue_registration_email(user.email, user.username, raw_password, "warden")
                 
                 messages.success(request, 'Registration successful! Please wait for admin approval.')
                 return redirect('login')
@@ -449,7 +446,7 @@ def register_security(request):
                     shift=security_data.get('shift', '')
                 )
                 
-                _send_registration_email(user.email, user.username, raw_password, "security")
+                _queue_registration_email(user.email, user.username, raw_password, "security")
                 
                 messages.success(request, 'Registration successful! Please wait for admin approval.')
                 return redirect('login')
@@ -466,20 +463,15 @@ def student_dashboard(request):
         messages.error(request, 'Access denied.')
         return redirect('home')
     
-    # Check for overdue returns
-    check_overdue_returns()
-    
     student = get_object_or_404(Student, user=request.user)
     gatepasses = GatePass.objects.filter(student=student).order_by('-created_at')
     
-    # Get statistics
-    total_requests = gatepasses.count()
-    pending_requests = gatepasses.filter(status='pending').count()
-    approved_requests = gatepasses.filter(status__in=['warden_approved', 'security_approved']).count()
-    rejected_requests = gatepasses.filter(status='warden_rejected').count()
-    
-    # Get recent notifications
-    notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:5]
+    # Get statistics (read from the per-student status counters)
+    counts = counted_student_status_counts(student)
+    total_requests = counts['total']
+    pending_requests = counts['pending']
+    approved_requests = counts['warden_approved'] + counts['security_approved']
+    rejected_requests = counts['warden_rejected']
     
     context = {
         'student': student,
@@ -488,7 +480,6 @@ def student_dashboard(request):
         'pending_requests': pending_requests,
         'approved_requests': approved_requests,
         'rejected_requests': rejected_requests,
-        'notifications': notifications,
     }
     return render(request, 'gatepass/student_dashboard.html', context)
 
@@ -511,7 +502,7 @@ def create_gatepass(request):
     # block creating a new request (even if expected return time has passed).
     blocking_gp = (
         GatePass.objects
-        .filter(student=student, status__in=['pending', 'warden_approved', 'security_approved'])
+        .filter(student=student, status__in=ACTIVE_GATEPASS_STATUSES)
         .order_by('-created_at')
         .first()
     )
@@ -559,15 +550,10 @@ def create_gatepass(request):
             gatepass.expected_return_time = time(return_hour, return_minute)
             
             gatepass.student = student
-            gatepass.save()
-
-            # Create parent verification
-            verification_code = ''.join(random.choices(string.digits, k=6))
-            ParentVerification.objects.create(
-                gatepass=gatepass,
-                parent_mobile=student.parent_mobile,
-                verification_code=verification_code
-            )
+            with transaction.atomic():
+                gatepass.save()
+                # Parent verification code, sent to the parent by the outbox worker
+                issue_code(gatepass, student)
             
             # Create notification for appropriate wardens based on student's gender
             # CRITICAL: Gender-based routing ensures:
@@ -581,27 +567,14 @@ def create_gatepass(request):
                 student_gender = str(student_gender).strip().upper()
             
             if student_gender in ['M', 'F']:
-                # CRITICAL: Filter wardens by EXACT gender match - this ensures strict gender separation
-                # Only notify wardens who have the SAME gender as the student
-                # This query ensures: Female students notify ONLY female wardens, Male students notify ONLY male wardens
-                wardens_to_notify = User.objects.filter(
-                    role='warden', 
-                    is_approved=True, 
-                    gender__iexact=student_gender  # Only wardens with EXACT matching gender (case-insensitive)
-                ).exclude(
-                    gender__isnull=True
-                ).exclude(
-                    gender=''
+                # CRITICAL: Address the broadcast to wardens of EXACTLY the student's gender -
+                # this ensures strict gender separation. Female students notify ONLY female
+                # wardens, male students notify ONLY male wardens (matched when read).
+                notify_role(
+                    'warden', gatepass, 'gatepass_request',
+                    f"New gatepass request from {student.student_name}",
+                    gender=student_gender,
                 )
-                
-                # Notify only the matching gender wardens
-                for warden_user in wardens_to_notify:
-                    Notification.objects.create(
-                        user=warden_user,
-                        gatepass=gatepass,
-                        notification_type='gatepass_request',
-                        message=f"New gatepass request from {student.student_name}"
-                    )
             # If student gender is not set or invalid, DO NOT notify any wardens
             # This ensures strict gender separation - no cross-gender notifications
             
@@ -616,12 +589,11 @@ def create_gatepass(request):
     })
 
 
-def _auto_size_columns(ws):
-    """Adjust column widths based on cell contents."""
-    for column_cells in ws.columns:
-        # Calculate the maximum length in the column and add some padding
-        length = max(len(str(cell.value)) if cell.value is not None else 0 for cell in column_cells)
-        ws.column_dimensions[get_column_letter(column_cells[0].column)].width = max(length + 2, 12)
+def _export_job_response(job):
+    """The finished export itself (built here unless a worker does it), or the page that waits for it"""
+    if build_unclaimed(job):
+        return artifact_response(job)
+    return redirect('export_job_status', job_id=job.pk)
 
 
 @login_required
@@ -634,208 +606,83 @@ def export_students_excel(request):
         messages.error(request, 'Access denied.')
         return redirect('home')
 
-    wb = openpyxl.Workbook()
-
-    # Sheet 1: All students
-    ws_students = wb.active
-    ws_students.title = "Students"
-    student_headers = [
-        "Student Name",
-        "Hall Ticket No",
-        "Room No",
-        "Gender",
-        "Email",
-        "Mobile",
-        "Parent Name",
-        "Parent Mobile",
-        "Approved",
-    ]
-    ws_students.append(student_headers)
-
-    students = Student.objects.select_related('user').order_by('student_name')
-    for student in students:
-        ws_students.append([
-            student.student_name,
-            student.hall_ticket_no,
-            student.room_no,
-            student.user.get_gender_display() if student.user.gender else "",
-            student.user.email or "",
-            student.user.mobile_number or "",
-            student.parent_name,
-            student.parent_mobile,
-            "Yes" if student.user.is_approved else "No",
-        ])
-    _auto_size_columns(ws_students)
-
-    # Sheet 2: Students currently out (security approved)
-    ws_out = wb.create_sheet("Students Out")
-    out_headers = [
-        "Student Name",
-        "Hall Ticket No",
-        "Outing Date",
-        "Outing Time",
-        "Expected Return Date",
-        "Expected Return Time",
-        "Purpose",
-        "Warden Approved By",
-        "Security Approved By",
-    ]
-    ws_out.append(out_headers)
-
-    outing_requests = (
-        GatePass.objects
-        .filter(status='security_approved')
-        .select_related('student', 'student__user', 'warden_approval', 'security_approval')
-        .order_by('-outing_date', '-outing_time')
-    )
-    for request_out in outing_requests:
-        ws_out.append([
-            request_out.student.student_name,
-            request_out.student.hall_ticket_no,
-            request_out.outing_date.strftime('%Y-%m-%d'),
-            request_out.outing_time.strftime('%H:%M') if request_out.outing_time else "",
-            request_out.expected_return_date.strftime('%Y-%m-%d'),
-            request_out.expected_return_time.strftime('%H:%M') if request_out.expected_return_time else "",
-            request_out.purpose or "",
-            request_out.warden_approval.username if request_out.warden_approval else "",
-            request_out.security_approval.username if request_out.security_approval else "",
-        ])
-    ws_out.append([])
-    ws_out.append(["Total students currently out", outing_requests.count()])
-    _auto_size_columns(ws_out)
-
-    filename = f"gatepass_export_{timezone.localdate().isoformat()}.xlsx"
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    return response
+    return _export_job_response(request_export('students', {}, request.user))
+
+
+def _outing_export(request):
+    """
+    Outings selected by an export request's filters (see exports.outing_params),
+    and the file name (without extension) describing them.
+    """
+    params = outing_params(request.GET)
+    return outings_queryset(params), outings_filename(params)
 
 
 @login_required
 def export_outings_excel(request):
     """
     Export outing data (respecting the warden filter form) and monthly counts to Excel.
-    Accessible only to wardens and superadmins.
-    Query params supported (same as warden filter):
-      - from_date: YYYY-MM-DD
-      - to_date: YYYY-MM-DD
-      - status_filter: pending|warden_approved|security_approved|returned|completed|warden_rejected
-    Backwards-compatible extras:
-      - year: YYYY
-      - month: 1-12
+    Accessible only to wardens and superadmins. Filters: see exports.outing_params.
+    Identical requests share one workbook (see export_jobs).
     """
     if request.user.role not in ('warden', 'superadmin'):
         messages.error(request, 'Access denied.')
         return redirect('home')
 
-    # Filters from warden dashboard
-    from_date = request.GET.get('from_date')
-    to_date = request.GET.get('to_date')
-    status_filter = request.GET.get('status_filter')
+    return _export_job_response(request_export('outings', outing_params(request.GET), request.user))
 
-    # Legacy filters kept for compatibility
-    year = request.GET.get('year')
-    month = request.GET.get('month')
-    try:
-        year = int(year) if year else None
-        month = int(month) if month else None
-    except ValueError:
-        year = None
-        month = None
-
-    wb = openpyxl.Workbook()
-
-    # Sheet 1: Outing records (filtered)
-    ws_outings = wb.active
-    ws_outings.title = "Outings"
-    ws_outings.append([
-        "Student Name",
-        "Hall Ticket No",
-        "Outing Date",
-        "Outing Time",
-        "Expected Return Date",
-        "Expected Return Time",
-        "Status",
-        "Purpose",
-        "Warden Approved By",
-        "Security Approved By",
-    ])
-
-    outing_qs = GatePass.objects.select_related(
-        'student', 'student__user', 'warden_approval', 'security_approval'
-    ).filter(status__in=['security_approved', 'returned', 'completed'])
-
-    if from_date:
-        outing_qs = outing_qs.filter(outing_date__gte=from_date)
-    if to_date:
-        outing_qs = outing_qs.filter(outing_date__lte=to_date)
-    if status_filter:
-        outing_qs = outing_qs.filter(status=status_filter)
-    if year:
-        outing_qs = outing_qs.filter(outing_date__year=year)
-    if month:
-        outing_qs = outing_qs.filter(outing_date__month=month)
-
-    outing_qs = outing_qs.order_by('-outing_date', '-outing_time')
-
-    for gp in outing_qs:
-        ws_outings.append([
-            gp.student.student_name,
-            gp.student.hall_ticket_no,
-            gp.outing_date.strftime('%Y-%m-%d'),
-            gp.outing_time.strftime('%H:%M') if gp.outing_time else "",
-            gp.expected_return_date.strftime('%Y-%m-%d'),
-            gp.expected_return_time.strftime('%H:%M') if gp.expected_return_time else "",
-            gp.get_status_display(),
-            gp.purpose or "",
-            gp.warden_approval.username if gp.warden_approval else "",
-            gp.security_approval.username if gp.security_approval else "",
-        ])
-    ws_outings.append([])
-    ws_outings.append(["Total outings in selection", outing_qs.count()])
-    _auto_size_columns(ws_outings)
-
-    # Sheet 2: Monthly counts for the same filtered dataset
-    ws_monthly = wb.create_sheet("Monthly Counts")
-    ws_monthly.append(["Month", "Total Outings"])
-
-    monthly_counts = (
-        outing_qs
-        .annotate(month=TruncMonth('outing_date'))
-        .values('month')
-        .annotate(total=Count('id'))
-        .order_by('month')
-    )
-    grand_total = 0
-    for row in monthly_counts:
-        label = row['month'].strftime('%Y-%m') if row['month'] else "Unknown"
-        ws_monthly.append([label, row['total']])
-        grand_total += row['total']
-    ws_monthly.append([])
-    ws_monthly.append(["Grand total outings", grand_total])
-    _auto_size_columns(ws_monthly)
-
-    filename_parts = ["outings"]
-    if from_date:
-        filename_parts.append(f"from-{from_date}")
-    if to_date:
-        filename_parts.append(f"to-{to_date}")
-    if status_filter:
-        filename_parts.append(status_filter)
-    if year:
-        filename_parts.append(str(year))
-    if month:
-        filename_parts.append(f"{month:02d}")
-    filename = f"gatepass_{'_'.join(filename_parts)}.xlsx"
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    return response
+
+@login_required
+def export_job_status(request, job_id):
+    """Progress of an Excel export; JSON with ?format=json (polled by the page)"""
+    if request.user.role not in ('warden', 'superadmin'):
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+
+    job = get_object_or_404(ExportJob, pk=job_id)
+    build_unclaimed(job)
+    download_url = reverse('export_job_download', args=[job.pk]) if job.status == 'done' else None
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'status': job.status, 'error': job.error, 'download_url': download_url})
+    return render(request, 'gatepass/export_job.html', {'job': job, 'download_url': download_url})
+
+
+@login_required
+def export_job_download(request, job_id):
+    """Download a finished Excel export"""
+    if request.user.role not in ('warden', 'superadmin'):
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+
+    return artifact_response(get_object_or_404(ExportJob, pk=job_id, status='done'))
+
+
+@gzip_page
+@login_required
+def export_outings_flat(request, fmt):
+    """
+    Export outing data as CSV or JSON lines, streamed row by row (gzip
+    compressed when the client accepts it). Same filters and access as
+    export_outings_excel.
+    """
+    if request.user.role not in ('warden', 'superadmin'):
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+
+    outing_qs, filename = _outing_export(request)
+    return flat_response(fmt, filename, OUTING_HEADERS, OUTING_KEYS, outing_rows(outing_qs))
+
+
+@gzip_page
+@login_required
+def export_students_flat(request, fmt):
+    """Export the student list as CSV or JSON lines (wardens and superadmins)"""
+    if request.user.role not in ('warden', 'superadmin'):
+        messages.error(request, 'Access denied.')
+        return redirect('home')
+
+    filename = f"gatepass_students_{timezone.localdate().isoformat()}"
+    return flat_response(fmt, filename, STUDENT_HEADERS, STUDENT_KEYS, student_rows())
 
 
 @login_required
@@ -845,14 +692,11 @@ def warden_dashboard(request):
         messages.error(request, 'Access denied.')
         return redirect('home')
 
-    # Check for overdue returns
-    check_overdue_returns()
-
     # Initialize filter form
     filter_form = WardenDateFilterForm(request.GET)
 
-    # Get all gatepass requests for filtering
-    all_requests = GatePass.objects.all().order_by('-created_at')
+    # Get all gatepass requests for filtering (with the rows the lists display)
+    all_requests = GatePass.objects.select_related('student', 'return_verified_by').order_by('-created_at')
 
     # CRITICAL: Gender-based filtering ensures strict separation
     # - Male wardens see ONLY male student requests (NOT female student requests)
@@ -861,28 +705,14 @@ def warden_dashboard(request):
     # - Students without gender set will NOT appear for any warden
 
     # Get and validate warden gender
-    warden_gender = request.user.gender
-    if warden_gender:
-        warden_gender = str(warden_gender).strip().upper()
+    warden_gender = normalize_gender(request.user.gender)
 
     # Apply strict gender filtering - THIS MUST BE APPLIED BEFORE ANY OTHER FILTERS
-    if warden_gender in ['M', 'F']:
+    if warden_gender:
         # CRITICAL: Filter to show ONLY requests from students with EXACT matching gender
-        # This query ensures:
-        # - Male wardens (gender='M') see ONLY students with gender='M'
-        # - Female wardens (gender='F') see ONLY students with gender='F'
-        # - Any request where student gender doesn't match is EXCLUDED
-        # IMPORTANT: We filter by the normalized warden_gender value
-        all_requests = all_requests.filter(
-            student__user__gender__iexact=warden_gender
-        ).exclude(
-            student__user__gender__isnull=True
-        ).exclude(
-            student__user__gender=''
-        )
-
-        # Additional safety check: Ensure we only get matching gender
-        # This is redundant but ensures the filter is absolutely correct
+        # student_gender is the student's normalized gender copied onto the gatepass,
+        # so this is a single-table indexed lookup (no join to Student/User)
+        all_requests = all_requests.filter(student_gender=warden_gender)
     else:
         # If warden gender is not set or invalid, show no requests (safety measure)
         all_requests = GatePass.objects.none()
@@ -890,25 +720,19 @@ def warden_dashboard(request):
     # Apply search filter
     search_query = request.GET.get('search', '').strip()
     if search_query:
-        all_requests = all_requests.filter(
-            Q(student__student_name__icontains=search_query) |
-            Q(student__hall_ticket_no__icontains=search_query) |
-            Q(student__room_no__icontains=search_query) |
-            Q(purpose__icontains=search_query)
-        )
+        all_requests = search_gatepasses(all_requests, search_query)
 
     # Apply date and status filters
+    is_filtered = bool(search_query)
     if filter_form.is_valid():
         from_date = filter_form.cleaned_data.get('from_date')
         to_date = filter_form.cleaned_data.get('to_date')
         status_filter = filter_form.cleaned_data.get('status_filter')
 
-        if from_date:
-            all_requests = all_requests.filter(outing_date__gte=from_date)
-        if to_date:
-            all_requests = all_requests.filter(outing_date__lte=to_date)
+        all_requests = filter_outing_window(all_requests, from_date, to_date)
         if status_filter:
             all_requests = all_requests.filter(status=status_filter)
+        is_filtered = is_filtered or bool(from_date or to_date or status_filter)
 
     # Get pending gatepass requests
     pending_requests = all_requests.filter(status='pending')
@@ -928,18 +752,26 @@ def warden_dashboard(request):
     # Get students currently out
     students_out_requests = all_requests.filter(status='security_approved')[:10]
 
-    # Get statistics (use filtered data for consistency)
-    total_pending = all_requests.filter(status='pending').count()
-    total_approved = all_requests.filter(status='warden_approved').count()
-    total_rejected = all_requests.filter(warden_approval=request.user, status='warden_rejected').count()
-    total_returned = all_requests.filter(status='returned').count()
-    students_out = all_requests.filter(status='security_approved').count()
+    # Get statistics (use filtered data for consistency). Unfiltered views read
+    # the per-gender status counters instead of counting the whole history.
+    if warden_gender and not is_filtered:
+        counts = counted_status_counts(gender=warden_gender)
+        counts['rejected_by_me'] = all_requests.filter(
+            status='warden_rejected', warden_approval=request.user
+        ).count()
+    else:
+        counts = status_counts(
+            all_requests,
+            rejected_by_me=Q(status='warden_rejected', warden_approval=request.user),
+        )
+    total_pending = counts['pending']
+    total_approved = counts['warden_approved']
+    total_rejected = counts['rejected_by_me']
+    total_returned = counts['returned']
+    students_out = counts['security_approved']
 
     # Get filtered counts for display
-    filtered_count = all_requests.count()
-
-    # Get recent notifications
-    notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:5]
+    filtered_count = counts['total']
 
     context = {
         'filter_form': filter_form,
@@ -955,7 +787,9 @@ def warden_dashboard(request):
         'total_returned': total_returned,
         'students_out': students_out,
         'filtered_count': filtered_count,
-        'notifications': notifications,
+        # Header figures follow live updates only when they are the counter values
+        'live_counts': bool(warden_gender and not is_filtered),
+        'live_updates': True,
     }
     return render(request, 'gatepass/warden_dashboard.html', context)
 
@@ -965,7 +799,7 @@ def warden_approve_gatepass(request, gatepass_id):
     if request.user.role != 'warden':
         messages.error(request, 'Access denied.')
         return redirect('home')
-    gatepass = get_object_or_404(GatePass, id=gatepass_id)
+    gatepass = get_object_or_404(GATEPASS_DETAIL, id=gatepass_id)
     
     # CRITICAL: Enforce gender matching - prevent cross-gender approvals
     # Male wardens can ONLY approve male student requests
@@ -1012,31 +846,20 @@ def warden_approve_gatepass(request, gatepass_id):
                 gatepass.warden_approval = request.user
                 gatepass.parent_verification = True
                 gatepass.save()
-                security_users = User.objects.filter(role='security')
-                for security in security_users:
-                    Notification.objects.create(
-                        user=security,
-                        gatepass=gatepass,
-                        notification_type='warden_approval',
-                        message=f"Gatepass approved by warden for {gatepass.student.student_name}"
-                    )
-                Notification.objects.create(
-                    user=gatepass.student.user,
-                    gatepass=gatepass,
-                    notification_type='warden_approval',
-                    message="Your gatepass request has been approved by the warden."
+                notify_role(
+                    'security', gatepass, 'warden_approval',
+                    f"Gatepass approved by warden for {gatepass.student.student_name}"
                 )
+                notify_student(gatepass, 'warden_approval', "Your gatepass request has been approved by the warden.")
                 messages.success(request, 'Gatepass approved successfully!')
             elif action == 'reject':
                 gatepass.status = 'warden_rejected'
                 gatepass.warden_approval = request.user
                 gatepass.warden_rejection_reason = form.cleaned_data['rejection_reason']
                 gatepass.save()
-                Notification.objects.create(
-                    user=gatepass.student.user,
-                    gatepass=gatepass,
-                    notification_type='warden_rejection',
-                    message=f"Your gatepass request has been rejected. Reason: {gatepass.warden_rejection_reason}"
+                notify_student(
+                    gatepass, 'warden_rejection',
+                    f"Your gatepass request has been rejected. Reason: {gatepass.warden_rejection_reason}"
                 )
                 messages.success(request, 'Gatepass rejected.')
             return redirect('warden_dashboard')
@@ -1049,6 +872,32 @@ def warden_approve_gatepass(request, gatepass_id):
     })
 
 
+# Security dashboard tabs: tab name -> (gatepass status, list_type used by the templates)
+SECURITY_TABS = {
+    'exit': ('warden_approved', 'security_pending'),
+    'out': ('security_approved', 'security_return'),
+    'returned': ('returned', 'returned'),
+}
+SECURITY_PAGE_SIZE = 25
+
+
+def _security_page(tab, search_query, cursor=None):
+    """One keyset page of a security tab: (gatepasses, url of the next page or None)"""
+    status, _ = SECURITY_TABS[tab]
+    queryset = GatePass.objects.select_related(
+        'student', 'student__user', 'warden_approval', 'security_approval'
+    ).filter(status=status)
+    queryset = search_gatepasses(queryset, search_query)
+    items, next_cursor = keyset_page(queryset, cursor, SECURITY_PAGE_SIZE)
+    next_url = None
+    if next_cursor:
+        params = {'cursor': next_cursor}
+        if search_query:
+            params['search'] = search_query
+        next_url = f"{reverse('security_request_page', args=[tab])}?{urlencode(params)}"
+    return items, next_url
+
+
 @login_required
 def security_dashboard(request):
     """Security dashboard"""
@@ -1056,57 +905,70 @@ def security_dashboard(request):
         messages.error(request, 'Access denied.')
         return redirect('home')
 
-    # Check for overdue returns
-    check_overdue_returns()
-
-    # Get search query (optional filter; when empty, all records are shown)
+    # Get search query (optional filter; when empty, all records are listed)
     search_query = request.GET.get('search', '').strip()
-    search_filter = Q(
-        Q(student__student_name__icontains=search_query) |
-        Q(student__hall_ticket_no__icontains=search_query) |
-        Q(student__room_no__icontains=search_query) |
-        Q(purpose__icontains=search_query)
-    ) if search_query else Q()
-
-    # Base querysets: all exit/return records, no limit (display even if count > 200)
-    base_select = GatePass.objects.select_related('student', 'student__user', 'warden_approval', 'security_approval')
-
-    # Approved gatepasses waiting for security approval (exit)
-    approved_requests = base_select.filter(status='warden_approved').order_by('-created_at')
-    if search_query:
-        approved_requests = approved_requests.filter(search_filter)
 
-    # Security approved = students currently out (record return tab)
-    security_approved = base_select.filter(status='security_approved').order_by('-created_at')
+    # Active tabs render their first page (newest first); older rows are
+    # fetched with "Load more". The returned history only loads when its tab
+    # is opened.
+    approved_requests, approved_next_url = _security_page('exit', search_query)
+    security_approved, security_approved_next_url = _security_page('out', search_query)
+    returned_url = reverse('security_request_page', args=['returned'])
     if search_query:
-        security_approved = security_approved.filter(search_filter)
-
-    # Returned requests (all return records)
-    returned_requests = base_select.filter(status='returned').order_by('-created_at')
-    if search_query:
-        returned_requests = returned_requests.filter(search_filter)
+        returned_url = f"{returned_url}?{urlencode({'search': search_query})}"
 
     # Get statistics - count all records (not filtered by current user)
-    total_pending = approved_requests.count()
-    total_approved = GatePass.objects.filter(status='security_approved').count()
-    total_returned = GatePass.objects.filter(status='returned').count()
-
-    # Get recent notifications
-    notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:5]
+    counts = counted_status_counts()
+    if search_query:
+        counts['waiting_exit'] = search_gatepasses(
+            GatePass.objects.filter(status='warden_approved'), search_query
+        ).count()
+    else:
+        counts['waiting_exit'] = counts['warden_approved']
+    total_pending = counts['waiting_exit']
+    total_approved = counts['security_approved']
+    total_returned = counts['returned']
 
     context = {
         'search_query': search_query,
         'approved_requests': approved_requests,
+        'approved_next_url': approved_next_url,
         'security_approved': security_approved,
-        'returned_requests': returned_requests,
+        'security_approved_next_url': security_approved_next_url,
+        'returned_url': returned_url,
         'total_pending': total_pending,
         'total_approved': total_approved,
         'total_returned': total_returned,
-        'notifications': notifications,
+        'live_counts': not search_query,
+        'live_updates': True,
     }
     return render(request, 'gatepass/security_dashboard.html', context)
 
 
+@login_required
+def security_request_page(request, tab):
+    """Next page of a security dashboard tab as JSON ("Load more")"""
+    if request.user.role != 'security':
+        return JsonResponse({'detail': 'Access denied.'}, status=403)
+    if tab not in SECURITY_TABS:
+        return JsonResponse({'detail': 'Unknown list.'}, status=404)
+
+    search_query = request.GET.get('search', '').strip()
+    try:
+        items, next_url = _security_page(tab, search_query, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid cursor.'}, status=400)
+
+    list_type = SECURITY_TABS[tab][1]
+    context = {'request_list': items, 'list_type': list_type}
+    return JsonResponse({
+        'rows': render_to_string('gatepass/partials/_security_request_rows.html', context, request=request),
+        'cards': render_to_string('gatepass/partials/_security_request_cards.html', context, request=request),
+        'count': len(items),
+        'next_url': next_url,
+    })
+
+
 @login_required
 def security_approve_gatepass(request, gatepass_id):
     """Security approval for gatepass"""
@@ -1114,7 +976,7 @@ def security_approve_gatepass(request, gatepass_id):
         messages.error(request, 'Access denied.')
         return redirect('home')
     
-    gatepass = get_object_or_404(GatePass, id=gatepass_id)
+    gatepass = get_object_or_404(GATEPASS_DETAIL, id=gatepass_id)
     
     # Check if warden has approved first
     if gatepass.status != 'warden_approved':
@@ -1131,11 +993,9 @@ def security_approve_gatepass(request, gatepass_id):
         gatepass.save()
         
         # Create notification for student
-        Notification.objects.create(
-            user=gatepass.student.user,
-            gatepass=gatepass,
-            notification_type='security_approval',
-            message="Your gatepass has been approved by security. You can now leave the campus."
+        notify_student(
+            gatepass, 'security_approval',
+            "Your gatepass has been approved by security. You can now leave the campus."
         )
         
         messages.success(request, 'Gatepass approved by security!')
@@ -1153,47 +1013,39 @@ def superadmin_dashboard(request):
         messages.error(request, 'Access denied.')
         return redirect('home')
 
-    # Check for overdue returns
-    check_overdue_returns()
-
     # Get search query
     search_query = request.GET.get('search', '').strip()
 
     # Get pending user approvals
-    pending_users = User.objects.filter(is_approved=False).exclude(role='superadmin')
+    pending_users = User.objects.filter(is_approved=False).exclude(role='superadmin').select_related('student_profile')
 
-    # Get overdue returns
-    from datetime import date
-    overdue_returns = GatePass.objects.filter(
-        status='security_approved',
-        expected_return_date__lt=date.today()
-    ).order_by('expected_return_date')
+    # Get overdue returns (notifications are generated by the scheduled overdue scanner)
+    overdue_returns = overdue_gatepasses().select_related('student').order_by('expected_return_at')
 
     # Get all pending gatepass requests for superadmin approval
-    pending_gatepass_approvals = GatePass.objects.filter(status='pending').order_by('-created_at')
+    pending_gatepass_approvals = GatePass.objects.filter(status='pending').select_related('student').order_by('-created_at')
 
     # Apply search filter to pending gatepass approvals
     if search_query:
-        pending_gatepass_approvals = pending_gatepass_approvals.filter(
-            Q(student__student_name__icontains=search_query) |
-            Q(student__hall_ticket_no__icontains=search_query) |
-            Q(student__room_no__icontains=search_query) |
-            Q(purpose__icontains=search_query)
-        )
-
-    # Get statistics
-    total_students = User.objects.filter(role='student').count()
-    total_wardens = User.objects.filter(role='warden').count()
-    total_security = User.objects.filter(role='security').count()
-    total_gatepasses = GatePass.objects.count()
-    pending_gatepasses = GatePass.objects.filter(status='pending').count()
+        pending_gatepass_approvals = search_gatepasses(pending_gatepass_approvals, search_query)
+
+    # Get statistics (one aggregate query for users; gatepass totals come from
+    # the status counters, overdue from the partial index on students out)
+    users_by_role = role_counts()
+    total_students = users_by_role['student']
+    total_wardens = users_by_role['warden']
+    total_security = users_by_role['security']
+    counts = counted_status_counts()
+    total_gatepasses = counts['total']
+    pending_gatepasses = counts['pending']
     overdue_count = overdue_returns.count()
 
     # Get recent gatepass requests
-    recent_gatepasses = GatePass.objects.order_by('-created_at')[:10]
+    recent_gatepasses = GatePass.objects.select_related('student').order_by('-created_at')[:10]
 
-    # Get recent notifications
-    notifications = Notification.objects.order_by('-created_at')[:10]
+    # Per-day, per-gender and per-status trends from the daily outing rollup
+    outing_trends = daily_outing_trends(days=30)
+    trend_totals = {key: sum(row[key] for row in outing_trends) for key in outing_trends[0] if key != 'day'}
 
     context = {
         'search_query': search_query,
@@ -1206,8 +1058,10 @@ def superadmin_dashboard(request):
         'total_gatepasses': total_gatepasses,
         'pending_gatepasses': pending_gatepasses,
         'overdue_count': overdue_count,
+        'last_overdue_scan': last_overdue_scan(),
         'recent_gatepasses': recent_gatepasses,
-        'notifications': notifications,
+        'outing_trends': [row for row in reversed(outing_trends) if row['total']],
+        'trend_totals': trend_totals,
     }
     return render(request, 'gatepass/superadmin_dashboard.html', context)
 
@@ -1243,28 +1097,53 @@ def reject_user(request, user_id):
 
 def parent_verification(request, gatepass_id):
     """Parent verification page"""
-    gatepass = get_object_or_404(GatePass, id=gatepass_id)
-    parent_verification = get_object_or_404(ParentVerification, gatepass=gatepass)
-    
+    parent_verification = get_object_or_404(
+        ParentVerification.objects.select_related('gatepass', 'gatepass__student'),
+        gatepass_id=gatepass_id,
+    )
+    gatepass = parent_verification.gatepass
+
+    if request.method == 'POST' and request.POST.get('action') == 'resend':
+        if reissue_code(parent_verification):
+            messages.success(request, f'A new verification code has been sent to {parent_verification.parent_mobile}.')
+        else:
+            messages.error(request, reissue_refusal(parent_verification) or 'A new code has already been sent.')
+        return redirect('parent_verification', gatepass_id=gatepass_id)
+
     if request.method == 'POST':
-        form = ParentVerificationForm(request.POST, instance=parent_verification)
+        # Unbound from the stored row: a ModelForm copies the submitted code
+        # onto its instance while validating
+        form = ParentVerificationForm(request.POST)
         if form.is_valid():
-            verification_code = form.cleaned_data['verification_code']
-            if verification_code == parent_verification.verification_code:
-                parent_verification.is_verified = True
-                parent_verification.verified_at = timezone.now()
-                parent_verification.save()
+            result = check_code(parent_verification, form.cleaned_data['verification_code'])
+            if result == 'verified':
                 messages.success(request, 'Parent verification completed successfully!')
                 return redirect('home')
+            elif result == 'expired':
+                if reissue_code(parent_verification):
+                    messages.error(
+                        request,
+                        'This verification code has expired. '
+                        f'A new code has been sent to {parent_verification.parent_mobile}.',
+                    )
+                else:
+                    messages.error(request, 'This verification code has expired.')
+            elif result == 'locked':
+                messages.error(
+                    request,
+                    'Too many incorrect codes were entered. A new code can be requested once this one expires.',
+                )
             else:
                 messages.error(request, 'Invalid verification code.')
     else:
-        form = ParentVerificationForm(instance=parent_verification)
-    
+        form = ParentVerificationForm()
+
     return render(request, 'gatepass/parent_verification.html', {
         'form': form,
         'gatepass': gatepass,
-        'parent_verification': parent_verification
+        'parent_verification': parent_verification,
+        'code_expired': not parent_verification.is_verified and parent_verification.expires_at <= timezone.now(),
+        'can_resend': reissue_refusal(parent_verification) is None,
     })
 
 
@@ -1276,7 +1155,7 @@ def security_record_return(request, gatepass_id):
         messages.error(request, 'Access denied.')
         return redirect('home')
     
-    gatepass = get_object_or_404(GatePass, id=gatepass_id)
+    gatepass = get_object_or_404(GATEPASS_DETAIL, id=gatepass_id)
     
     # Only allow recording return for security-approved gatepasses
     if gatepass.status != 'security_approved':
@@ -1294,11 +1173,9 @@ def security_record_return(request, gatepass_id):
         gatepass.save()
         
         # Create notification for student (notification_type must be in Notification.NOTIFICATION_TYPES)
-        Notification.objects.create(
-            user=gatepass.student.user,
-            gatepass=gatepass,
-            notification_type='return_recorded',
-            message=f"Your return has been recorded on {gatepass.actual_return_date} at {gatepass.actual_return_time}"
+        notify_student(
+            gatepass, 'return_recorded',
+            f"Your return has been recorded on {gatepass.actual_return_date} at {gatepass.actual_return_time}"
         )
         
         messages.success(request, f'Return recorded for {gatepass.student.student_name}')
@@ -1311,53 +1188,6 @@ def security_record_return(request, gatepass_id):
     })
 
 
-def check_overdue_returns():
-    """Check for overdue returns and create notifications"""
-    from django.utils import timezone
-    from datetime import datetime, date, time, time
-    
-    # Get all security approved gatepasses that haven't returned
-    overdue_gatepasses = GatePass.objects.filter(
-        status='security_approved',
-        expected_return_date__lt=date.today()
-    )
-    
-    for gatepass in overdue_gatepasses:
-        # Check if notification already exists for today
-        today = date.today()
-        if not Notification.objects.filter(
-            gatepass=gatepass,
-            notification_type='overdue_return',
-            created_at__date=today
-        ).exists():
-            # Create notification for warden
-            if gatepass.warden_approval:
-                Notification.objects.create(
-                    user=gatepass.warden_approval,
-                    gatepass=gatepass,
-                    notification_type='overdue_return',
-                    message=f"URGENT: Student {gatepass.student.student_name} has not returned after expected date {gatepass.expected_return_date}. Parent contact: {gatepass.student.parent_mobile}"
-                )
-            
-            # Create notification for superadmin
-            superadmin = User.objects.filter(role='superadmin').first()
-            if superadmin:
-                Notification.objects.create(
-                    user=superadmin,
-                    gatepass=gatepass,
-                    notification_type='overdue_return',
-                    message=f"URGENT: Student {gatepass.student.student_name} (Hall Ticket: {gatepass.student.hall_ticket_no}) has not returned after expected date {gatepass.expected_return_date}. Parent contact: {gatepass.student.parent_mobile}"
-                )
-            
-            # Create notification for student
-            Notification.objects.create(
-                user=gatepass.student.user,
-                gatepass=gatepass,
-                notification_type='overdue_return',
-                message=f"URGENT: You have not returned to the hostel after your expected return date {gatepass.expected_return_date}. Please contact the hostel immediately."
-            )
-
-
 @login_required
 def superadmin_approve_gatepass(request, gatepass_id):
     """Super admin approval for gatepass"""
@@ -1365,7 +1195,7 @@ def superadmin_approve_gatepass(request, gatepass_id):
         messages.error(request, 'Access denied.')
         return redirect('home')
     
-    gatepass = get_object_or_404(GatePass, id=gatepass_id)
+    gatepass = get_object_or_404(GATEPASS_DETAIL, id=gatepass_id)
     
     if request.method == 'POST':
         action = request.POST.get('action')
@@ -1375,14 +1205,10 @@ def superadmin_approve_gatepass(request, gatepass_id):
             gatepass.save()
             
             # Create notification for security
-            security_users = User.objects.filter(role='security', is_approved=True)
-            for security in security_users:
-                Notification.objects.create(
-                    user=security,
-                    gatepass=gatepass,
-                    notification_type='gatepass_approved',
-                    message=f"Gatepass approved by Super Admin for {gatepass.student.student_name}"
-                )
+            notify_role(
+                'security', gatepass, 'gatepass_approved',
+                f"Gatepass approved by Super Admin for {gatepass.student.student_name}"
+            )
             
             messages.success(request, f'Gatepass approved for {gatepass.student.student_name}')
         elif action == 'reject':
@@ -1393,11 +1219,9 @@ def superadmin_approve_gatepass(request, gatepass_id):
             gatepass.save()
             
             # Create notification for student
-            Notification.objects.create(
-                user=gatepass.student.user,
-                gatepass=gatepass,
-                notification_type='gatepass_rejected',
-                message=f"Your gatepass request has been rejected by Super Admin. Reason: {reason}"
+            notify_student(
+                gatepass, 'gatepass_rejected',
+                f"Your gatepass request has been rejected by Super Admin. Reason: {reason}"
             )
             
             messages.success(request, f'Gatepass rejected for {gatepass.student.student_name}')
@@ -1409,6 +1233,113 @@ def superadmin_approve_gatepass(request, gatepass_id):
     })
 
 
+def _watermark_id(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+@login_required
+def notification_inbox(request):
+    """Full notification history with read state, newest first"""
+    try:
+        items, next_cursor = inbox_page(request.user, request.GET.get('cursor'))
+    except ValueError:
+        return redirect('notification_inbox')
+
+    context = {
+        'items': items,
+        'next_url': f"{reverse('notification_inbox')}?{urlencode({'cursor': next_cursor})}" if next_cursor else None,
+        'is_first_page': not request.GET.get('cursor'),
+        'watermark': read_watermark(request.user),
+    }
+    return render(request, 'gatepass/notification_inbox.html', context)
+
+
+@login_required
+def notification_mark_read(request, kind, pk):
+    """Mark one notification read"""
+    if request.method == 'POST':
+        mark_read(request.user, kind, pk)
+    return redirect('notification_inbox')
+
+
+@login_required
+def notification_mark_all_read(request):
+    """Mark everything read up to the watermark the inbox page was rendered with"""
+    if request.method == 'POST':
+        mark_all_read(
+            request.user,
+            up_to=_watermark_id(request.POST.get('up_to')),
+            broadcasts_up_to=_watermark_id(request.POST.get('broadcasts_up_to')),
+        )
+        messages.success(request, 'All notifications marked as read.')
+    return redirect('notification_inbox')
+
+
+def _live_payload(request):
+    """live_update() plus the bell menu rendered for the navbar"""
+    payload = live_update(request.user)
+    payload['bell_html'] = render_to_string('gatepass/partials/_notification_bell.html', request=request)
+    return payload
+
+
+@login_required
+def notifications_poll(request):
+    """
+    Poll for live updates.
+
+    Answers with the update when the caller's token (``?since=``) is out of
+    date, otherwise with 204 No Content: right away for plain polling, or,
+    with LIVE_UPDATES_TRANSPORT = "longpoll", after up to
+    LIVE_POLL_WAIT_SECONDS without a change (only cache reads happen while
+    waiting).
+    """
+    since = request.GET.get('since', '')
+    wait = settings.LIVE_POLL_WAIT_SECONDS if settings.LIVE_UPDATES_TRANSPORT == 'longpoll' else 0
+    deadline = monotonic() + wait
+    while live_token(request.user) == since:
+        if monotonic() >= deadline:
+            return HttpResponse(status=204)
+        sleep(settings.LIVE_CHECK_INTERVAL_SECONDS)
+    return JsonResponse(_live_payload(request))
+
+
+async def notifications_stream(request):
+    """
+    Server-sent events stream of live updates (needs an ASGI server).
+
+    Sends an ``update`` event whenever the caller's token changes and a
+    comment line every few seconds to keep proxies from closing the
+    connection. The stream ends after LIVE_STREAM_SECONDS; EventSource
+    reconnects with the last token in Last-Event-ID.
+    """
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return JsonResponse({'detail': 'Authentication required.'}, status=401)
+
+    since = request.headers.get('Last-Event-ID') or request.GET.get('since', '')
+
+    async def events():
+        token = since
+        deadline = monotonic() + settings.LIVE_STREAM_SECONDS
+        yield 'retry: 3000\n\n'
+        while monotonic() < deadline:
+            if await sync_to_async(live_token, thread_sensitive=False)(user) != token:
+                payload = await sync_to_async(_live_payload)(request)
+                token = payload['token']
+                yield f"id: {token}\nevent: update\ndata: {json.dumps(payload)}\n\n"
+            else:
+                yield ': keep-alive\n\n'
+            await asyncio.sleep(settings.LIVE_CHECK_INTERVAL_SECONDS)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def warden_debug(request):
     """Debug information for warden dashboard"""
@@ -1421,14 +1352,9 @@ def warden_debug(request):
     
     # Apply gender filter if warden has gender set
     # CRITICAL: Only show requests from students with matching gender
-    if request.user.gender:
-        all_requests = all_requests.filter(
-            student__user__gender=request.user.gender
-        ).exclude(
-            student__user__gender__isnull=True
-        ).exclude(
-            student__user__gender=''
-        )
+    warden_gender = normalize_gender(request.user.gender)
+    if warden_gender:
+        all_requests = all_requests.filter(student_gender=warden_gender)
     else:
         # If warden gender is not set, show no requests
         all_requests = GatePass.objects.none()
@@ -1453,9 +1379,6 @@ def debug_info(request):
         messages.error(request, 'Access denied.')
         return redirect('home')
     
-    # Check for overdue returns
-    check_overdue_returns()
-    
     context = {
         'students': Student.objects.all(),
         'wardens': User.objects.filter(role='warden'),
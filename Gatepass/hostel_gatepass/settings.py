@@ -254,3 +254,125 @@ EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "True").lower() == "true"
 EMAIL_USE_SSL = os.environ.get("EMAIL_USE_SSL", "False").lower() == "true"
 # Timeout settings to prevent hanging connections (in seconds)
 EMAIL_TIMEOUT = int(os.environ.get("EMAIL_TIMEOUT", "10"))
+
+# Background jobs
+# Overdue returns are scanned by `python manage.py scan_overdue_returns`
+# (cron or the `overdue` Procfile process), not on dashboard requests.
+OVERDUE_SCAN_INTERVAL_MINUTES = int(os.environ.get("OVERDUE_SCAN_INTERVAL_MINUTES", "15"))
+
+# Caching
+# Per-process memory by default; set REDIS_URL so the web workers, the cron
+# and the background workers share one cache (render.yaml provisions it).
+# Without it, notifications, status changes and export invalidations made
+# by one process never reach another's bells and live update tokens.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Bell menu: latest notifications and unread count cached per user, dropped
+# whenever a notification for them is written or marked read
+NOTIFICATION_CACHE_SECONDS = int(os.environ.get("NOTIFICATION_CACHE_SECONDS", "300"))
+NOTIFICATION_BELL_SIZE = 12
+
+# Live updates on the warden and security dashboards. "poll" (the default,
+# safe under WSGI) asks /notifications/poll/ every LIVE_POLL_INTERVAL_SECONDS
+# and gets an immediate answer. For ASGI deployments (e.g. `uvicorn
+# hostel_gatepass.asgi:application`) "longpoll" holds each poll open for up
+# to LIVE_POLL_WAIT_SECONDS and "sse" streams /notifications/stream/; under
+# WSGI both would keep a worker thread busy per open dashboard. Changes made
+# by other processes are only seen with a shared cache (REDIS_URL).
+LIVE_UPDATES_TRANSPORT = os.environ.get("LIVE_UPDATES_TRANSPORT", "poll")
+LIVE_POLL_INTERVAL_SECONDS = int(os.environ.get("LIVE_POLL_INTERVAL_SECONDS", "20"))
+LIVE_POLL_WAIT_SECONDS = int(os.environ.get("LIVE_POLL_WAIT_SECONDS", "25"))
+LIVE_STREAM_SECONDS = int(os.environ.get("LIVE_STREAM_SECONDS", "300"))
+LIVE_CHECK_INTERVAL_SECONDS = 1
+
+# Notification retention in days per notification type, applied by
+# `python manage.py prune_notifications`; "default" covers every other type.
+# Overdue reminders repeat daily, so they are kept for a shorter time.
+NOTIFICATION_RETENTION_DAYS = {
+    "default": int(os.environ.get("NOTIFICATION_RETENTION_DAYS", "180")),
+    "overdue_return": int(os.environ.get("OVERDUE_NOTIFICATION_RETENTION_DAYS", "30")),
+}
+
+# Outbox: registration emails are queued in the database and delivered by
+# `python manage.py send_outbox` (the `outbox` Procfile process). Failed
+# sends are retried after 1, 2, 4 ... minutes (at most an hour apart) and
+# given up after OUTBOX_MAX_ATTEMPTS tries.
+OUTBOX_POLL_SECONDS = int(os.environ.get("OUTBOX_POLL_SECONDS", "10"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE_SECONDS = 60
+OUTBOX_RETRY_MAX_SECONDS = 3600
+# How long a claimed message stays hidden from other workers
+OUTBOX_LEASE_SECONDS = 300
+# Emails sent over one SMTP connection, and the most each worker sends per
+# minute (0: no cap) to stay under the mail provider's sending limits
+OUTBOX_EMAIL_BATCH_SIZE = int(os.environ.get("OUTBOX_EMAIL_BATCH_SIZE", "50"))
+OUTBOX_EMAILS_PER_MINUTE = int(os.environ.get("OUTBOX_EMAILS_PER_MINUTE", "0"))
+
+# Parent verification codes are sent to the parent's mobile through the
+# outbox's "sms" channel. SMS_PROVIDER is the dotted path of the class that
+# delivers them: gatepass.sms.HTTPSMSProvider posts them to SMS_GATEWAY_URL,
+# gatepass.sms.ConsoleSMSProvider prints them (development only), and
+# gatepass.sms.FileSMSProvider appends them to SMS_FILE_PATH.
+SMS_PROVIDER = os.environ.get("SMS_PROVIDER") or "gatepass.sms.ConsoleSMSProvider"
+SMS_FILE_PATH = os.environ.get("SMS_FILE_PATH", str(BASE_DIR / "sms_outbox.jsonl"))
+SMS_GATEWAY_URL = os.environ.get("SMS_GATEWAY_URL", "")
+SMS_GATEWAY_TOKEN = os.environ.get("SMS_GATEWAY_TOKEN", "")
+SMS_GATEWAY_TIMEOUT_SECONDS = 10
+# Codes stop working after this; unverified rows are deleted by
+# `python manage.py purge_parent_verifications` once expired for
+# PARENT_VERIFICATION_PURGE_AFTER_DAYS.
+PARENT_VERIFICATION_TTL_MINUTES = int(os.environ.get("PARENT_VERIFICATION_TTL_MINUTES", "60"))
+PARENT_VERIFICATION_PURGE_AFTER_DAYS = int(os.environ.get("PARENT_VERIFICATION_PURGE_AFTER_DAYS", "7"))
+# The verification page needs no login, so each code accepts a limited
+# number of submissions, and an expired code is only reissued while its
+# gatepass is pending, at most PARENT_VERIFICATION_MAX_REISSUES times.
+PARENT_VERIFICATION_MAX_ATTEMPTS = int(os.environ.get("PARENT_VERIFICATION_MAX_ATTEMPTS", "5"))
+PARENT_VERIFICATION_MAX_REISSUES = int(os.environ.get("PARENT_VERIFICATION_MAX_REISSUES", "3"))
+
+# Notification digests: notification types listed for a role are held back
+# and delivered by `python manage.py send_notification_digests` as one
+# summary notification per type, plus one email, per recipient and
+# window (every NOTIFICATION_DIGEST_INTERVAL_MINUTES). Comma separated,
+# e.g. SUPERADMIN_DIGEST_TYPES=overdue_return; empty lists keep every
+# notification immediate.
+NOTIFICATION_DIGEST_TYPES = {
+    "superadmin": [t for t in os.environ.get("SUPERADMIN_DIGEST_TYPES", "").split(",") if t],
+    "warden": [t for t in os.environ.get("WARDEN_DIGEST_TYPES", "").split(",") if t],
+}
+NOTIFICATION_DIGEST_INTERVAL_MINUTES = int(os.environ.get("NOTIFICATION_DIGEST_INTERVAL_MINUTES", "1440"))
+
+# Excel exports are saved under MEDIA_ROOT/exports/ and reused by identical
+# requests until a gatepass, student or user changes; files are deleted
+# after EXPORT_RETENTION_HOURS. The web process builds them in a background
+# thread; the request that starts one waits up to EXPORT_INLINE_WAIT_SECONDS
+# before showing a progress page. With EXPORT_WORKER set, `python manage.py
+# run_export_jobs --loop` builds them instead, which needs MEDIA_ROOT shared
+# with the web process, and the web process still builds a job no worker
+# claimed within EXPORT_WORKER_WAIT_SECONDS. A job running longer than
+# EXPORT_JOB_TIMEOUT_SECONDS is assumed lost and picked up again.
+#
+# "Changes" are tracked by a version stamp in the cache (EXPORT_DATA_VERSION)
+# bumped after every committed save or delete. Processes only share it
+# through REDIS_URL: without it, writes from management commands
+# (clear_gatepass_data, generate_sample_data, check_gender_data --fix) or
+# from the cron and worker services never reach the web process, which may
+# then serve exports of the old data for up to EXPORT_RETENTION_HOURS.
+# queryset.update() and raw SQL bypass the stamp everywhere.
+EXPORT_WORKER = os.environ.get("EXPORT_WORKER", "False").lower() == "true"
+EXPORT_WORKER_WAIT_SECONDS = int(os.environ.get("EXPORT_WORKER_WAIT_SECONDS", "30"))
+EXPORT_INLINE_WAIT_SECONDS = int(os.environ.get("EXPORT_INLINE_WAIT_SECONDS", "5"))
+EXPORT_POLL_SECONDS = int(os.environ.get("EXPORT_POLL_SECONDS", "5"))
+EXPORT_JOB_TIMEOUT_SECONDS = int(os.environ.get("EXPORT_JOB_TIMEOUT_SECONDS", "900"))
+EXPORT_RETENTION_HOURS = int(os.environ.get("EXPORT_RETENTION_HOURS", "24"))